@@ -0,0 +1,46 @@
+"""Add indexes for hot query paths
+
+Revision ID: 007_hot_query_indexes
+Revises: 006_task_metrics
+Create Date: 2024-12-10 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_hot_query_indexes'
+down_revision = '006_task_metrics'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_task_events_task_id_timestamp', 'task_events', ['task_id', 'timestamp']),
+    ('ix_tasks_org_id_created_at', 'tasks', ['org_id', 'created_at']),
+    ('ix_tasks_status', 'tasks', ['status']),
+    ('ix_local_agents_agent_id_status', 'local_agents', ['agent_id', 'status']),
+    ('ix_organization_members_org_id_user_id', 'organization_members', ['org_id', 'user_id']),
+    ('ix_document_chunks_agent_id', 'document_chunks', ['agent_id']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
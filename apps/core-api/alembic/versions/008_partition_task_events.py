@@ -0,0 +1,85 @@
+"""Partition task_events by month and add task_event_rollups
+
+Revision ID: 008_partition_task_events
+Revises: 007_hot_query_indexes
+Create Date: 2024-12-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from phi_utils.partitions import ensure_monthly_partitions
+
+# revision identifiers, used by Alembic.
+revision = '008_partition_task_events'
+down_revision = '007_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # Keep the old table aside while the partitioned one is built
+    op.execute("ALTER TABLE task_events RENAME TO task_events_legacy")
+    op.execute("ALTER TABLE task_events_legacy RENAME CONSTRAINT task_events_pkey TO task_events_legacy_pkey")
+    op.execute("ALTER INDEX IF EXISTS ix_task_events_task_id_timestamp RENAME TO ix_task_events_legacy_task_id_timestamp")
+
+    # The partition key must be part of the primary key
+    op.execute("""
+        CREATE TABLE task_events (
+            id UUID NOT NULL DEFAULT uuid_generate_v4(),
+            task_id UUID NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+            "timestamp" TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            event_type VARCHAR NOT NULL,
+            payload JSONB,
+            PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """)
+    op.execute('CREATE INDEX ix_task_events_task_id_timestamp ON task_events (task_id, "timestamp")')
+    op.execute("CREATE TABLE task_events_default PARTITION OF task_events DEFAULT")
+
+    oldest = conn.execute(sa.text('SELECT min("timestamp") FROM task_events_legacy')).scalar()
+    ensure_monthly_partitions(conn, "task_events", "timestamp", months_ahead=3, since=oldest)
+
+    op.execute("""
+        INSERT INTO task_events (id, task_id, "timestamp", event_type, payload)
+        SELECT id, task_id, COALESCE("timestamp", now()), event_type, payload
+        FROM task_events_legacy
+    """)
+    op.execute("DROP TABLE task_events_legacy")
+
+    # Per-task summaries kept after fine-grained events are dropped by retention
+    op.create_table(
+        'task_event_rollups',
+        sa.Column('task_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('event_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('event_type_counts', postgresql.JSONB(), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column('first_event_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('last_event_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('compacted_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('task_event_rollups')
+
+    op.execute("ALTER TABLE task_events RENAME TO task_events_partitioned")
+    op.execute("ALTER INDEX ix_task_events_task_id_timestamp RENAME TO ix_task_events_partitioned_task_id_timestamp")
+    op.create_table(
+        'task_events',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('uuid_generate_v4()')),
+        sa.Column('task_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('timestamp', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=True),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+    )
+    op.execute("""
+        INSERT INTO task_events (id, task_id, "timestamp", event_type, payload)
+        SELECT id, task_id, "timestamp", event_type, payload FROM task_events_partitioned
+    """)
+    op.execute("DROP TABLE task_events_partitioned CASCADE")
+    op.create_index('ix_task_events_task_id_timestamp', 'task_events', ['task_id', 'timestamp'])
@@ -0,0 +1,57 @@
+"""Indexes for keyset pagination of tasks on (created_at, id)
+
+Revision ID: 009_task_keyset_indexes
+Revises: 008_partition_task_events
+Create Date: 2024-12-13 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_task_keyset_indexes'
+down_revision = '008_partition_task_events'
+branch_labels = None
+depends_on = None
+
+# (index name, columns) - each filter column leads, then the keyset order
+INDEXES = [
+    ('ix_tasks_created_at_id', ['created_at', 'id']),
+    ('ix_tasks_org_id_created_at_id', ['org_id', 'created_at', 'id']),
+    ('ix_tasks_agent_id_created_at_id', ['agent_id', 'created_at', 'id']),
+    ('ix_tasks_status_created_at_id', ['status', 'created_at', 'id']),
+]
+
+# Superseded by the (org_id, created_at, id) index
+REPLACED = ('ix_tasks_org_id_created_at', ['org_id', 'created_at'])
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(
+                name, 'tasks', columns,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+        op.drop_index(
+            REPLACED[0], table_name='tasks',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            REPLACED[0], 'tasks', REPLACED[1],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        for name, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name='tasks',
+                postgresql_concurrently=True,
+                if_exists=True
+            )
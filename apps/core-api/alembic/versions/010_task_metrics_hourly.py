@@ -0,0 +1,48 @@
+"""Add task_metrics_hourly rollups
+
+Revision ID: 010_task_metrics_hourly
+Revises: 009_task_keyset_indexes
+Create Date: 2024-12-14 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '010_task_metrics_hourly'
+down_revision = '009_task_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_metrics_hourly',
+        sa.Column('org_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('agent_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('task_type', sa.String(), primary_key=True),
+        sa.Column('bucket_start', sa.TIMESTAMP(timezone=True), primary_key=True),
+        sa.Column('task_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('failure_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('duration_p50', sa.Float(), nullable=True),
+        sa.Column('duration_p95', sa.Float(), nullable=True),
+        sa.Column('duration_p99', sa.Float(), nullable=True),
+        sa.Column('duration_sketch', postgresql.JSONB(), nullable=False),
+        sa.Column('llm_calls_total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('llm_tokens_total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('tool_calls_total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ondelete='CASCADE'),
+    )
+    # Summary reads filter on a time range, usually within one org
+    op.create_index('ix_task_metrics_hourly_bucket_start', 'task_metrics_hourly', ['bucket_start'])
+    op.create_index('ix_task_metrics_hourly_org_id_bucket_start', 'task_metrics_hourly', ['org_id', 'bucket_start'])
+    # Rollup job scans raw metrics by time window
+    op.create_index('ix_task_metrics_created_at', 'task_metrics', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_metrics_created_at', table_name='task_metrics')
+    op.drop_table('task_metrics_hourly')
@@ -1,12 +1,40 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
+from phi_utils.db_pool import engine_kwargs, instrument_engine
 
-engine = create_engine(settings.database_url)
+
+def _async_url(url: str) -> str:
+    """Swap the sync driver in a database URL for asyncpg"""
+    scheme, _, rest = url.partition("://")
+    return f"postgresql+asyncpg://{rest}" if scheme.startswith("postgresql") else url
+
+
+# Sync engine: migrations, seed scripts and create_all
+engine = create_engine(settings.database_url, **engine_kwargs(settings))
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: request handlers
+async_engine = create_async_engine(
+    settings.async_database_url or _async_url(settings.database_url),
+    **engine_kwargs(settings, is_async=True)
+)
+instrument_engine(async_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Analytics engine: exports and other long scans, kept off the primary when a replica is configured
+if settings.analytics_database_url:
+    analytics_engine = create_engine(settings.analytics_database_url, **engine_kwargs(settings))
+    instrument_engine(analytics_engine)
+else:
+    analytics_engine = engine
+
 Base = declarative_base()
 
 
@@ -18,3 +46,6 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
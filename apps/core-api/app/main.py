@@ -4,9 +4,11 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db, engine, Base
+from app.database import get_async_db, engine, async_engine, Base
+from app.executor import run_blocking, shutdown_executor
 from app.models import User, Organization, OrganizationMember
 from app.schemas import (
     UserSignup, UserLogin, Token, UserWithMemberships,
@@ -19,6 +21,7 @@ from app.auth import (
 from app.routers import industries, role_templates, tools, agents, documents, admin
 from app.routers.agents import agent_detail_router
 from phi_utils.logging import setup_logging, ContextLogger
+from phi_utils.db_pool import pool_stats, render_prometheus
 
 # Set up structured logging
 logger = setup_logging("core-api")
@@ -38,13 +41,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
 @app.post("/auth/signup", response_model=Token)
-async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
+async def signup(user_data: UserSignup, db: AsyncSession = Depends(get_async_db)):
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    result = await db.execute(select(User).where(User.email == user_data.email))
+    existing_user = result.scalar_one_or_none()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -52,15 +57,15 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await run_blocking(get_password_hash, user_data.password)
     user = User(
         email=user_data.email,
         password_hash=hashed_password,
         name=user_data.name
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     # Create access token
     access_token = create_access_token(data={"sub": str(user.id)})
@@ -68,9 +73,10 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
 
 
 @app.post("/auth/login", response_model=Token)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.password_hash):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User).where(User.email == credentials.email))
+    user = result.scalar_one_or_none()
+    if not user or not await run_blocking(verify_password, credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -84,11 +90,14 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
 @app.get("/me", response_model=UserWithMemberships)
 async def get_current_user_info(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    memberships = db.query(OrganizationMember).filter(
-        OrganizationMember.user_id == current_user.id
-    ).all()
+    result = await db.execute(
+        select(OrganizationMember).where(
+            OrganizationMember.user_id == current_user.id
+        )
+    )
+    memberships = result.scalars().all()
     
     return UserWithMemberships(
         id=current_user.id,
@@ -111,7 +120,7 @@ async def get_current_user_info(
 async def create_organization(
     org_data: OrganizationCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Create organization
     org = Organization(
@@ -119,8 +128,7 @@ async def create_organization(
         owner_user_id=current_user.id
     )
     db.add(org)
-    db.commit()
-    db.refresh(org)
+    await db.flush()
     
     # Add owner as member
     member = OrganizationMember(
@@ -129,7 +137,8 @@ async def create_organization(
         role="OWNER"
     )
     db.add(member)
-    db.commit()
+    await db.commit()
+    await db.refresh(org)
     
     return org
 
@@ -137,15 +146,17 @@ async def create_organization(
 @app.get("/orgs", response_model=list[OrganizationResponse])
 async def list_organizations(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Get all orgs where user is a member
-    memberships = db.query(OrganizationMember).filter(
-        OrganizationMember.user_id == current_user.id
-    ).all()
-    org_ids = [m.org_id for m in memberships]
-    
-    orgs = db.query(Organization).filter(Organization.id.in_(org_ids)).all()
+    result = await db.execute(
+        select(Organization).join(
+            OrganizationMember, OrganizationMember.org_id == Organization.id
+        ).where(
+            OrganizationMember.user_id == current_user.id
+        ).distinct()
+    )
+    orgs = result.scalars().all()
     return orgs
 
 
@@ -153,13 +164,16 @@ async def list_organizations(
 async def get_organization(
     org_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check if user is a member
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(OrganizationMember).where(
+            OrganizationMember.org_id == org_id,
+            OrganizationMember.user_id == current_user.id
+        )
+    )
+    membership = result.scalars().first()
     
     if not membership:
         raise HTTPException(
@@ -167,7 +181,8 @@ async def get_organization(
             detail="Organization not found"
         )
     
-    org = db.query(Organization).filter(Organization.id == org_id).first()
+    result = await db.execute(select(Organization).where(Organization.id == org_id))
+    org = result.scalar_one_or_none()
     if not org:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -192,10 +207,27 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/internal/metrics/db-pool")
+async def db_pool_metrics(format: str = "json"):
+    """Connection pool gauges: checked out, overflow and checkout wait times
+    
+    The max wait is windowed per Prometheus scrape; JSON reads never reset it.
+    """
+    prometheus = format.lower() == "prometheus"
+    stats = {
+        "sync": pool_stats(engine, reset_max=prometheus),
+        "async": pool_stats(async_engine, reset_max=prometheus),
+    }
+    if prometheus:
+        from fastapi.responses import PlainTextResponse
+        return PlainTextResponse(render_prometheus("core-api", stats))
+    return stats
+
+
 @app.get("/internal/agents/{agent_id}")
 async def get_agent_internal(
     agent_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Internal endpoint for service-to-service calls (no auth required)"""
     from uuid import UUID
@@ -210,7 +242,8 @@ async def get_agent_internal(
             detail="Invalid agent ID"
         )
     
-    agent = db.query(Agent).filter(Agent.id == agent_uuid).first()
+    result = await db.execute(select(Agent).where(Agent.id == agent_uuid))
+    agent = result.scalar_one_or_none()
     
     if not agent:
         raise HTTPException(
@@ -219,7 +252,8 @@ async def get_agent_internal(
         )
     
     # Load agent tools
-    agent_tools = db.query(AgentTool).filter(AgentTool.agent_id == agent_uuid).all()
+    result = await db.execute(select(AgentTool).where(AgentTool.agent_id == agent_uuid))
+    agent_tools = result.scalars().all()
     
     return AgentDetailResponse(
         id=agent.id,
@@ -246,13 +280,12 @@ async def get_agent_internal(
 async def search_documents_internal(
     agent_id: str,
     search_request: dict,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Internal endpoint for document search (no auth required for service-to-service calls)"""
     from uuid import UUID
-    from app.models import Agent, DocumentChunk
-    from app.services.document_service import generate_embedding
-    from sqlalchemy import text
+    from app.models import Agent
+    from app.services.document_service import search_document_chunks
     
     try:
         agent_uuid = UUID(agent_id)
@@ -262,7 +295,8 @@ async def search_documents_internal(
             detail="Invalid agent ID"
         )
     
-    agent = db.query(Agent).filter(Agent.id == agent_uuid).first()
+    result = await db.execute(select(Agent.id).where(Agent.id == agent_uuid))
+    agent = result.scalar_one_or_none()
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -275,46 +309,19 @@ async def search_documents_internal(
     if not query:
         return {"query": query, "chunks": []}
     
-    # Generate embedding for query
-    query_embedding = generate_embedding(query)
-    
-    # Convert embedding list to string format for pgvector
-    embedding_str = "[" + ",".join(map(str, query_embedding)) + "]"
-    
-    # Use raw SQL for vector similarity search
-    # Note: Using CAST for UUID to avoid parameter binding issues
-    from sqlalchemy import text
-    chunks_query = text("""
-        SELECT id, document_id, chunk_text, metadata
-        FROM document_chunks
-        WHERE agent_id = CAST(:agent_id AS uuid)
-        ORDER BY embedding <=> CAST(:embedding AS vector)
-        LIMIT :limit
-    """)
-    
-    result = db.execute(
-        chunks_query,
-        {
-            "agent_id": str(agent_uuid),
-            "embedding": embedding_str,
-            "limit": top_k
-        }
-    )
-    
-    chunks_data = result.fetchall()
-    
-    # Build response from results
-    chunks = []
-    for row in chunks_data:
-        chunks.append({
-            "id": str(row[0]),
-            "document_id": str(row[1]),
-            "chunk_text": row[2],
-            "metadata": row[3] if row[3] else {}
-        })
+    # Vector similarity search
+    chunks = [
+        {**chunk, "id": str(chunk["id"]), "document_id": str(chunk["document_id"])}
+        for chunk in await search_document_chunks(db, agent_uuid, query, top_k)
+    ]
     
     return {
         "query": query,
         "chunks": chunks
     }
 
+
+@app.on_event("shutdown")
+async def shutdown():
+    await async_engine.dispose()
+    shutdown_executor()
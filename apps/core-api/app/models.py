@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, ForeignKey, TIMESTAMP, Integer, Float
+from sqlalchemy import Column, String, Text, ForeignKey, TIMESTAMP, Integer, BigInteger, Float, Index, DDL, event
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
@@ -37,6 +37,9 @@ class Organization(Base):
 
 class OrganizationMember(Base):
     __tablename__ = "organization_members"
+    __table_args__ = (
+        Index("ix_organization_members_org_id_user_id", "org_id", "user_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     org_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
@@ -143,6 +146,9 @@ class Document(Base):
 
 class DocumentChunk(Base):
     __tablename__ = "document_chunks"
+    __table_args__ = (
+        Index("ix_document_chunks_agent_id", "agent_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
@@ -159,6 +165,14 @@ class DocumentChunk(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_status", "status"),
+        # Keyset pagination on (created_at, id), optionally behind an equality filter
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_org_id_created_at_id", "org_id", "created_at", "id"),
+        Index("ix_tasks_agent_id_created_at_id", "agent_id", "created_at", "id"),
+        Index("ix_tasks_status_created_at_id", "status", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     agent_id = Column(UUID(as_uuid=True), ForeignKey("agents.id", ondelete="CASCADE"), nullable=False)
@@ -177,11 +191,16 @@ class Task(Base):
 
 
 class TaskEvent(Base):
+    """Range-partitioned by month on timestamp (see migration 008)"""
     __tablename__ = "task_events"
+    __table_args__ = (
+        Index("ix_task_events_task_id_timestamp", "task_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     task_id = Column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
-    timestamp = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    timestamp = Column(TIMESTAMP(timezone=True), primary_key=True, default=datetime.utcnow)
     event_type = Column(String, nullable=False)
     payload = Column(JSONB)
 
@@ -189,8 +208,31 @@ class TaskEvent(Base):
     task = relationship("Task", back_populates="events")
 
 
+# create_all (dev setups) needs a catch-all partition; migrations add the monthly ones
+event.listen(
+    TaskEvent.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS task_events_default PARTITION OF task_events DEFAULT")
+)
+
+
+class TaskEventRollup(Base):
+    """Per-task event summary kept after fine-grained events are dropped"""
+    __tablename__ = "task_event_rollups"
+
+    task_id = Column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    event_count = Column(Integer, nullable=False, default=0)
+    event_type_counts = Column(JSONB, nullable=False, default=dict)
+    first_event_at = Column(TIMESTAMP(timezone=True))
+    last_event_at = Column(TIMESTAMP(timezone=True))
+    compacted_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+
+
 class LocalAgent(Base):
     __tablename__ = "local_agents"
+    __table_args__ = (
+        Index("ix_local_agents_agent_id_status", "agent_id", "status"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     agent_id = Column(UUID(as_uuid=True), ForeignKey("agents.id", ondelete="CASCADE"), nullable=False)
@@ -208,6 +250,9 @@ class LocalAgent(Base):
 class TaskMetrics(Base):
     """Basic metrics table for task performance tracking"""
     __tablename__ = "task_metrics"
+    __table_args__ = (
+        Index("ix_task_metrics_created_at", "created_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     task_id = Column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
@@ -224,3 +269,31 @@ class TaskMetrics(Base):
     task = relationship("Task")
     agent = relationship("Agent")
     organization = relationship("Organization")
+
+
+class TaskMetricsHourly(Base):
+    """Hourly rollup of task_metrics per (org, agent, task_type)
+    
+    duration_sketch is a serialized LatencySketch; sketches merge across hours,
+    so percentiles for any window are computed from these rows alone.
+    """
+    __tablename__ = "task_metrics_hourly"
+    __table_args__ = (
+        Index("ix_task_metrics_hourly_bucket_start", "bucket_start"),
+        Index("ix_task_metrics_hourly_org_id_bucket_start", "org_id", "bucket_start"),
+    )
+
+    org_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True)
+    agent_id = Column(UUID(as_uuid=True), ForeignKey("agents.id", ondelete="CASCADE"), primary_key=True)
+    task_type = Column(String, primary_key=True)
+    bucket_start = Column(TIMESTAMP(timezone=True), primary_key=True)
+    task_count = Column(Integer, nullable=False, default=0)
+    failure_count = Column(Integer, nullable=False, default=0)
+    duration_p50 = Column(Float)
+    duration_p95 = Column(Float)
+    duration_p99 = Column(Float)
+    duration_sketch = Column(JSONB, nullable=False)
+    llm_calls_total = Column(BigInteger, nullable=False, default=0)
+    llm_tokens_total = Column(BigInteger, nullable=False, default=0)
+    tool_calls_total = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from uuid import UUID
+import base64
+import json
 
-from app.database import get_db
-from app.models import Task, TaskEvent, User, OrganizationMember
-from app.schemas import TaskEventResponse
+from app.database import get_async_db
+from app.models import Task, TaskEvent, TaskEventRollup, TaskMetricsHourly, User, OrganizationMember
+from app.schemas import TaskEventResponse, MetricsSummaryResponse
+from app.services.metrics_rollup_service import RollupAccumulator
+from app.services.export_service import EXPORT_FORMATS, EXPORT_TABLES, as_utc, default_until, stream_export
 from app.auth import get_current_user
 from phi_utils.logging import setup_logging, ContextLogger
 
 # Import TaskResponse from orchestrator schemas or create here
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 from uuid import UUID
 from pydantic import BaseModel
@@ -22,8 +28,8 @@ class TaskResponse(BaseModel):
     org_id: UUID
     type: str
     status: str
-    input: Optional[Dict[str, Any]]
-    output: Optional[Dict[str, Any]]
+    input: Optional[Dict[str, Any]] = None
+    output: Optional[Dict[str, Any]] = None
     error: Optional[str]
     created_at: datetime
     updated_at: datetime
@@ -35,12 +41,15 @@ logger = setup_logging("core-api.admin")
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
-def check_admin_access(current_user: User, db: Session):
+async def check_admin_access(current_user: User, db: AsyncSession):
     """Check if user has admin access (owner of any org)"""
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.user_id == current_user.id,
-        OrganizationMember.role.in_(["OWNER", "ADMIN"])
-    ).first()
+    result = await db.execute(
+        select(OrganizationMember).where(
+            OrganizationMember.user_id == current_user.id,
+            OrganizationMember.role.in_(["OWNER", "ADMIN"])
+        ).limit(1)
+    )
+    membership = result.scalar_one_or_none()
     
     if not membership:
         raise HTTPException(
@@ -50,27 +59,54 @@ def check_admin_access(current_user: User, db: Session):
     return membership
 
 
+# Columns returned by the task listing; input/output are only loaded on request
+TASK_LIST_COLUMNS = [
+    Task.id, Task.agent_id, Task.org_id, Task.type, Task.status,
+    Task.error, Task.created_at, Task.updated_at
+]
+
+
+def encode_task_cursor(created_at: datetime, task_id: UUID) -> str:
+    """Opaque cursor for the position after (created_at, id)"""
+    raw = json.dumps({"created_at": created_at.isoformat(), "id": str(task_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_task_cursor(cursor: str) -> tuple[datetime, UUID]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    return datetime.fromisoformat(data["created_at"]), UUID(data["id"])
+
+
 @router.get("/tasks", response_model=list[TaskResponse])
 async def list_all_tasks(
+    response: Response,
     org_id: Optional[str] = Query(None),
     agent_id: Optional[str] = Query(None),
     status_filter: Optional[str] = Query(None),
-    limit: int = Query(100, le=1000),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    include_payloads: bool = Query(False, description="Include the input/output JSONB columns"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List tasks across organizations (admin only)"""
-    check_admin_access(current_user, db)
+    """List tasks across organizations, newest first (admin only)
+    
+    Keyset-paginated on (created_at, id): when more rows exist, the response
+    carries an X-Next-Cursor header to pass back as ?cursor= for the next page.
+    """
+    await check_admin_access(current_user, db)
     
     ctx_logger = ContextLogger(logger, user_id=str(current_user.id))
     ctx_logger.info("Admin task listing requested")
     
-    query = db.query(Task)
+    columns = TASK_LIST_COLUMNS + ([Task.input, Task.output] if include_payloads else [])
+    query = select(*columns)
     
     if org_id:
         try:
             org_uuid = UUID(org_id)
-            query = query.filter(Task.org_id == org_uuid)
+            query = query.where(Task.org_id == org_uuid)
             ctx_logger = ctx_logger.with_context(org_id=org_id)
         except ValueError:
             raise HTTPException(
@@ -81,7 +117,7 @@ async def list_all_tasks(
     if agent_id:
         try:
             agent_uuid = UUID(agent_id)
-            query = query.filter(Task.agent_id == agent_uuid)
+            query = query.where(Task.agent_id == agent_uuid)
             ctx_logger = ctx_logger.with_context(agent_id=agent_id)
         except ValueError:
             raise HTTPException(
@@ -90,9 +126,29 @@ async def list_all_tasks(
             )
     
     if status_filter:
-        query = query.filter(Task.status == status_filter)
+        query = query.where(Task.status == status_filter)
+    
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_task_cursor(cursor)
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        # Row comparison matches the (…, created_at, id) indexes
+        query = query.where(tuple_(Task.created_at, Task.id) < tuple_(cursor_created_at, cursor_id))
+    
+    # Fetch one extra row to know whether another page exists
+    result = await db.execute(
+        query.order_by(Task.created_at.desc(), Task.id.desc()).limit(limit + 1)
+    )
+    tasks = result.mappings().all()
     
-    tasks = query.order_by(Task.created_at.desc()).limit(limit).all()
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        response.headers["X-Next-Cursor"] = encode_task_cursor(last["created_at"], last["id"])
     
     ctx_logger.info(f"Returning {len(tasks)} tasks")
     return tasks
@@ -102,10 +158,10 @@ async def list_all_tasks(
 async def get_task_events(
     task_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all events for a task (admin only)"""
-    check_admin_access(current_user, db)
+    await check_admin_access(current_user, db)
     
     try:
         task_uuid = UUID(task_id)
@@ -121,16 +177,42 @@ async def get_task_events(
         task_id=task_id
     )
     
-    task = db.query(Task).filter(Task.id == task_uuid).first()
+    result = await db.execute(select(Task.id, Task.created_at).where(Task.id == task_uuid))
+    task = result.one_or_none()
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
     
-    events = db.query(TaskEvent).filter(
-        TaskEvent.task_id == task_uuid
-    ).order_by(TaskEvent.timestamp).all()
+    # Events never predate their task; the lower bound lets the planner prune partitions
+    result = await db.execute(
+        select(TaskEvent).where(
+            TaskEvent.task_id == task_uuid,
+            TaskEvent.timestamp >= task.created_at
+        ).order_by(TaskEvent.timestamp)
+    )
+    events = result.scalars().all()
+    
+    if not events:
+        # Fine-grained events may have been compacted away by retention
+        rollup = await db.get(TaskEventRollup, task_uuid)
+        if rollup:
+            ctx_logger.info("Events compacted, returning rollup summary")
+            return [
+                TaskEventResponse(
+                    id=rollup.task_id,
+                    task_id=rollup.task_id,
+                    timestamp=rollup.last_event_at or rollup.compacted_at,
+                    event_type="EVENTS_COMPACTED",
+                    payload={
+                        "event_count": rollup.event_count,
+                        "event_type_counts": rollup.event_type_counts,
+                        "first_event_at": rollup.first_event_at.isoformat() if rollup.first_event_at else None,
+                        "last_event_at": rollup.last_event_at.isoformat() if rollup.last_event_at else None
+                    }
+                )
+            ]
     
     ctx_logger.info(f"Returning {len(events)} events for task")
     
@@ -145,3 +227,124 @@ async def get_task_events(
         for e in events
     ]
 
+
+
+@router.get("/export/{table}")
+async def export_table(
+    table: str,
+    format: str = Query("parquet", description="parquet or arrow (IPC stream)"),
+    since: Optional[datetime] = Query(None, description="Inclusive lower bound (previous X-Export-Watermark)"),
+    until: Optional[datetime] = Query(None, description="Exclusive upper bound, defaults to now minus a short lag"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream tasks, task_events or task_metrics as a columnar file (admin only)
+    
+    Reads from the analytics replica with a server-side cursor. For incremental
+    exports pass the X-Export-Watermark of the previous run as since.
+    """
+    await check_admin_access(current_user, db)
+    
+    if table not in EXPORT_TABLES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export table. Available: {', '.join(EXPORT_TABLES)}"
+        )
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown format. Available: {', '.join(EXPORT_FORMATS)}"
+        )
+    
+    since = as_utc(since)
+    until = as_utc(until) or default_until()
+    if since and since >= until:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="since must be before until"
+        )
+    
+    ctx_logger = ContextLogger(logger, user_id=str(current_user.id))
+    ctx_logger.info(f"Export of {table} as {format} requested")
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    # Sync generator: Starlette iterates it in a worker thread
+    return StreamingResponse(
+        stream_export(table, format, since, until),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{table}.{extension}"',
+            "X-Export-Watermark": until.isoformat()
+        }
+    )
+
+
+@router.get("/metrics/summary", response_model=list[MetricsSummaryResponse])
+async def metrics_summary(
+    org_id: Optional[str] = Query(None),
+    agent_id: Optional[str] = Query(None),
+    task_type: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None, description="Defaults to 24 hours ago"),
+    until: Optional[datetime] = Query(None, description="Defaults to now"),
+    group_by: str = Query("task_type", description="task_type, agent_task_type, agent, org, hour or none"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Task counts, failure rate, duration percentiles and token totals (admin only)
+    
+    Served entirely from the hourly rollups; percentiles come from merging the
+    per-hour sketches, so any window is answered without scanning task_metrics.
+    task_type merges every org and agent into one row per type;
+    agent_task_type keeps them apart.
+    """
+    await check_admin_access(current_user, db)
+    
+    group_fields = {
+        "none": (),
+        "task_type": ("task_type",),
+        "agent_task_type": ("org_id", "agent_id", "task_type"),
+        "agent": ("org_id", "agent_id"),
+        "org": ("org_id",),
+        "hour": ("bucket_start",),
+    }
+    if group_by not in group_fields:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"group_by must be one of: {', '.join(group_fields)}"
+        )
+    
+    until = as_utc(until) or datetime.now(timezone.utc)
+    since = as_utc(since) or until - timedelta(hours=24)
+    # Include the rollup bucket that contains since
+    query = select(TaskMetricsHourly).where(
+        TaskMetricsHourly.bucket_start > since - timedelta(hours=1),
+        TaskMetricsHourly.bucket_start < until
+    )
+    
+    for name, value in (("org_id", org_id), ("agent_id", agent_id)):
+        if value:
+            try:
+                query = query.where(getattr(TaskMetricsHourly, name) == UUID(value))
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid {name}"
+                )
+    if task_type:
+        query = query.where(TaskMetricsHourly.task_type == task_type)
+    
+    result = await db.execute(query)
+    fields = group_fields[group_by]
+    groups: dict = {}
+    for row in result.scalars():
+        key = tuple(getattr(row, name) for name in fields)
+        accumulator = RollupAccumulator.from_row(row)
+        if key in groups:
+            groups[key].merge(accumulator)
+        else:
+            groups[key] = accumulator
+    
+    return [
+        MetricsSummaryResponse(**dict(zip(fields, key)), **accumulator.summary())
+        for key, accumulator in sorted(groups.items(), key=lambda item: tuple(str(part) for part in item[0]))
+    ]
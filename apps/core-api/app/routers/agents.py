@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Agent, AgentTool, OrganizationMember, Tool
 from app.schemas import AgentCreate, AgentResponse, AgentDetailResponse
 from app.auth import get_current_user
@@ -18,7 +19,7 @@ async def create_agent(
     org_id: str,
     agent_data: AgentCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new agent for an organization"""
     try:
@@ -30,10 +31,13 @@ async def create_agent(
         )
     
     # Check if user is a member of the organization
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_uuid,
-        OrganizationMember.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(OrganizationMember).where(
+            OrganizationMember.org_id == org_uuid,
+            OrganizationMember.user_id == current_user.id
+        )
+    )
+    membership = result.scalars().first()
     
     if not membership:
         raise HTTPException(
@@ -50,22 +54,24 @@ async def create_agent(
         status="ACTIVE"
     )
     db.add(agent)
-    db.flush()  # Get the agent ID
+    await db.flush()  # Get the agent ID
     
-    # Add tools
-    for tool_id in agent_data.tool_ids:
-        tool = db.query(Tool).filter(Tool.id == tool_id).first()
-        if not tool:
-            continue  # Skip invalid tool IDs
-        
-        agent_tool = AgentTool(
-            agent_id=agent.id,
-            tool_id=tool_id
-        )
-        db.add(agent_tool)
+    # Add tools (one lookup for all requested IDs; invalid IDs are skipped)
+    if agent_data.tool_ids:
+        result = await db.execute(select(Tool.id).where(Tool.id.in_(agent_data.tool_ids)))
+        valid_tool_ids = set(result.scalars().all())
+        for tool_id in agent_data.tool_ids:
+            if tool_id not in valid_tool_ids:
+                continue  # Skip invalid tool IDs
+            
+            agent_tool = AgentTool(
+                agent_id=agent.id,
+                tool_id=tool_id
+            )
+            db.add(agent_tool)
     
-    db.commit()
-    db.refresh(agent)
+    await db.commit()
+    await db.refresh(agent)
     
     return agent
 
@@ -74,7 +80,7 @@ async def create_agent(
 async def list_agents(
     org_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all agents for an organization"""
     try:
@@ -86,10 +92,13 @@ async def list_agents(
         )
     
     # Check if user is a member of the organization
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_uuid,
-        OrganizationMember.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(OrganizationMember).where(
+            OrganizationMember.org_id == org_uuid,
+            OrganizationMember.user_id == current_user.id
+        )
+    )
+    membership = result.scalars().first()
     
     if not membership:
         raise HTTPException(
@@ -97,7 +106,8 @@ async def list_agents(
             detail="Organization not found or access denied"
         )
     
-    agents = db.query(Agent).filter(Agent.org_id == org_uuid).all()
+    result = await db.execute(select(Agent).where(Agent.org_id == org_uuid))
+    agents = result.scalars().all()
     return agents
 
 
@@ -109,7 +119,7 @@ agent_detail_router = APIRouter(prefix="/agents", tags=["agents"])
 async def get_agent(
     agent_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get agent details"""
     try:
@@ -120,7 +130,8 @@ async def get_agent(
             detail="Invalid agent ID"
         )
     
-    agent = db.query(Agent).filter(Agent.id == agent_uuid).first()
+    result = await db.execute(select(Agent).where(Agent.id == agent_uuid))
+    agent = result.scalar_one_or_none()
     
     if not agent:
         raise HTTPException(
@@ -129,10 +140,13 @@ async def get_agent(
         )
     
     # Check if user is a member of the organization
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == agent.org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(OrganizationMember).where(
+            OrganizationMember.org_id == agent.org_id,
+            OrganizationMember.user_id == current_user.id
+        )
+    )
+    membership = result.scalars().first()
     
     if not membership:
         raise HTTPException(
@@ -141,7 +155,8 @@ async def get_agent(
         )
     
     # Load agent tools
-    agent_tools = db.query(AgentTool).filter(AgentTool.agent_id == agent_uuid).all()
+    result = await db.execute(select(AgentTool).where(AgentTool.agent_id == agent_uuid))
+    agent_tools = result.scalars().all()
     
     return AgentDetailResponse(
         id=agent.id,
@@ -168,7 +183,7 @@ async def get_agent(
 async def generate_profile(
     agent_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Generate agent profile using LLM"""
     try:
@@ -179,7 +194,8 @@ async def generate_profile(
             detail="Invalid agent ID"
         )
     
-    agent = db.query(Agent).filter(Agent.id == agent_uuid).first()
+    result = await db.execute(select(Agent).where(Agent.id == agent_uuid))
+    agent = result.scalar_one_or_none()
     
     if not agent:
         raise HTTPException(
@@ -188,10 +204,13 @@ async def generate_profile(
         )
     
     # Check if user is a member of the organization
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == agent.org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(OrganizationMember).where(
+            OrganizationMember.org_id == agent.org_id,
+            OrganizationMember.user_id == current_user.id
+        )
+    )
+    membership = result.scalars().first()
     
     if not membership:
         raise HTTPException(
@@ -201,13 +220,13 @@ async def generate_profile(
     
     try:
         # Generate profile
-        system_prompt, config = generate_agent_profile(db, agent)
+        system_prompt, config = await generate_agent_profile(db, agent)
         
         # Update agent
         agent.system_prompt = system_prompt
         agent.config = config
-        db.commit()
-        db.refresh(agent)
+        await db.commit()
+        await db.refresh(agent)
         
         return {
             "message": "Profile generated successfully",
@@ -226,7 +245,7 @@ async def get_agent_config(
     agent_id: str,
     format: str = "yaml",
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get agent config for local agent download"""
     try:
@@ -237,7 +256,8 @@ async def get_agent_config(
             detail="Invalid agent ID"
         )
     
-    agent = db.query(Agent).filter(Agent.id == agent_uuid).first()
+    result = await db.execute(select(Agent).where(Agent.id == agent_uuid))
+    agent = result.scalar_one_or_none()
     
     if not agent:
         raise HTTPException(
@@ -246,10 +266,13 @@ async def get_agent_config(
         )
     
     # Check if user is a member of the organization
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == agent.org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(OrganizationMember).where(
+            OrganizationMember.org_id == agent.org_id,
+            OrganizationMember.user_id == current_user.id
+        )
+    )
+    membership = result.scalars().first()
     
     if not membership:
         raise HTTPException(
@@ -258,7 +281,7 @@ async def get_agent_config(
         )
     
     # Generate config
-    config = generate_agent_config(db, agent)
+    config = await generate_agent_config(db, agent)
     
     if format.lower() == "yaml":
         from fastapi.responses import Response
@@ -3,14 +3,16 @@ import uuid
 from typing import Optional
 from pathlib import Path
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Document, DocumentChunk, Agent, OrganizationMember
 from app.schemas import DocumentResponse, DocumentChunkResponse, DocumentSearchRequest, DocumentSearchResponse
 from app.auth import get_current_user
 from app.models import User
-from app.services.document_service import process_document
+from app.executor import run_blocking
+from app.services.document_service import process_document, search_document_chunks
 
 router = APIRouter(prefix="/agents/{agent_id}/documents", tags=["documents"])
 
@@ -25,7 +27,7 @@ async def upload_document(
     file: UploadFile = File(...),
     source_type: str = Form(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Upload and process a document for an agent"""
     try:
@@ -37,7 +39,8 @@ async def upload_document(
         )
     
     # Check if agent exists and user has access
-    agent = db.query(Agent).filter(Agent.id == agent_uuid).first()
+    result = await db.execute(select(Agent).where(Agent.id == agent_uuid))
+    agent = result.scalar_one_or_none()
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -45,10 +48,13 @@ async def upload_document(
         )
     
     # Check if user is a member of the organization
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == agent.org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(OrganizationMember).where(
+            OrganizationMember.org_id == agent.org_id,
+            OrganizationMember.user_id == current_user.id
+        )
+    )
+    membership = result.scalars().first()
     
     if not membership:
         raise HTTPException(
@@ -69,13 +75,12 @@ async def upload_document(
     file_id = str(uuid.uuid4())
     file_path = UPLOADS_DIR / f"{file_id}{file_ext}"
     
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    content = await file.read()
+    await run_blocking(file_path.write_bytes, content)
     
     try:
         # Process document
-        document = process_document(
+        document = await process_document(
             db=db,
             file_path=str(file_path),
             file_name=file.filename,
@@ -99,7 +104,7 @@ async def upload_document(
 async def list_documents(
     agent_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all documents for an agent"""
     try:
@@ -111,7 +116,8 @@ async def list_documents(
         )
     
     # Check if agent exists and user has access
-    agent = db.query(Agent).filter(Agent.id == agent_uuid).first()
+    result = await db.execute(select(Agent).where(Agent.id == agent_uuid))
+    agent = result.scalar_one_or_none()
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -119,10 +125,13 @@ async def list_documents(
         )
     
     # Check if user is a member of the organization
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == agent.org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(OrganizationMember).where(
+            OrganizationMember.org_id == agent.org_id,
+            OrganizationMember.user_id == current_user.id
+        )
+    )
+    membership = result.scalars().first()
     
     if not membership:
         raise HTTPException(
@@ -130,7 +139,8 @@ async def list_documents(
             detail="Agent not found or access denied"
         )
     
-    documents = db.query(Document).filter(Document.agent_id == agent_uuid).all()
+    result = await db.execute(select(Document).where(Document.agent_id == agent_uuid))
+    documents = result.scalars().all()
     return documents
 
 
@@ -139,7 +149,7 @@ async def search_documents(
     agent_id: str,
     search_request: DocumentSearchRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Search documents using vector similarity"""
     try:
@@ -151,7 +161,8 @@ async def search_documents(
         )
     
     # Check if agent exists and user has access
-    agent = db.query(Agent).filter(Agent.id == agent_uuid).first()
+    result = await db.execute(select(Agent).where(Agent.id == agent_uuid))
+    agent = result.scalar_one_or_none()
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -159,10 +170,13 @@ async def search_documents(
         )
     
     # Check if user is a member of the organization
-    membership = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == agent.org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(OrganizationMember).where(
+            OrganizationMember.org_id == agent.org_id,
+            OrganizationMember.user_id == current_user.id
+        )
+    )
+    membership = result.scalars().first()
     
     if not membership:
         raise HTTPException(
@@ -170,47 +184,9 @@ async def search_documents(
             detail="Agent not found or access denied"
         )
     
-    # Generate embedding for query
-    from app.services.document_service import generate_embedding
-    query_embedding = generate_embedding(search_request.query)
-    
     # Vector search using cosine similarity
-    # Using pgvector's cosine distance operator
     top_k = search_request.top_k or 5
-    
-    # Convert embedding list to string format for pgvector
-    embedding_str = "[" + ",".join(map(str, query_embedding)) + "]"
-    
-    # Use raw SQL for vector similarity search
-    from sqlalchemy import text
-    chunks_query = text("""
-        SELECT id, document_id, chunk_text, metadata
-        FROM document_chunks
-        WHERE agent_id = CAST(:agent_id AS uuid)
-        ORDER BY embedding <=> CAST(:embedding AS vector)
-        LIMIT :limit
-    """)
-    
-    result = db.execute(
-        chunks_query,
-        {
-            "agent_id": str(agent_uuid),
-            "embedding": embedding_str,
-            "limit": top_k
-        }
-    )
-    
-    chunks_data = result.fetchall()
-    
-    # Build response from results
-    chunks = []
-    for row in chunks_data:
-        chunks.append({
-            "id": row[0],
-            "document_id": row[1],
-            "chunk_text": row[2],
-            "metadata": row[3] if row[3] else {}
-        })
+    chunks = await search_document_chunks(db, agent_uuid, search_request.query, top_k)
     
     return DocumentSearchResponse(
         query=search_request.query,
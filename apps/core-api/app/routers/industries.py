@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Industry
 from app.schemas import IndustryResponse
 
@@ -9,9 +10,10 @@ router = APIRouter(prefix="/industries", tags=["industries"])
 
 
 @router.get("", response_model=list[IndustryResponse])
-async def list_industries(db: Session = Depends(get_db)):
+async def list_industries(db: AsyncSession = Depends(get_async_db)):
     """List all industries"""
-    industries = db.query(Industry).all()
+    result = await db.execute(select(Industry))
+    industries = result.scalars().all()
     return industries
 
 
@@ -1,8 +1,9 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import RoleTemplate, Industry
 from app.schemas import RoleTemplateResponse
 
@@ -12,18 +13,19 @@ router = APIRouter(prefix="/role-templates", tags=["role-templates"])
 @router.get("", response_model=list[RoleTemplateResponse])
 async def list_role_templates(
     industry_key: Optional[str] = Query(None, alias="industry_key"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List role templates, optionally filtered by industry"""
-    query = db.query(RoleTemplate)
+    query = select(RoleTemplate)
     
     if industry_key:
-        industry = db.query(Industry).filter(Industry.key == industry_key).first()
+        result = await db.execute(select(Industry).where(Industry.key == industry_key))
+        industry = result.scalar_one_or_none()
         if industry:
-            query = query.filter(RoleTemplate.industry_id == industry.id)
+            query = query.where(RoleTemplate.industry_id == industry.id)
         else:
             return []
     
-    role_templates = query.all()
+    result = await db.execute(query)
+    role_templates = result.scalars().all()
     return role_templates
-
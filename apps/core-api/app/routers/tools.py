@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Tool
 from app.schemas import ToolResponse
 
@@ -9,9 +10,10 @@ router = APIRouter(prefix="/tools", tags=["tools"])
 
 
 @router.get("", response_model=list[ToolResponse])
-async def list_tools(db: Session = Depends(get_db)):
+async def list_tools(db: AsyncSession = Depends(get_async_db)):
     """List all available tools"""
-    tools = db.query(Tool).all()
+    result = await db.execute(select(Tool))
+    tools = result.scalars().all()
     return tools
 
 
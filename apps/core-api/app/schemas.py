@@ -182,3 +182,19 @@ class TaskEventResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class MetricsSummaryResponse(BaseModel):
+    org_id: Optional[UUID] = None
+    agent_id: Optional[UUID] = None
+    task_type: Optional[str] = None
+    bucket_start: Optional[datetime] = None
+    task_count: int
+    failure_count: int
+    failure_rate: float
+    duration_p50: Optional[float]
+    duration_p95: Optional[float]
+    duration_p99: Optional[float]
+    llm_calls_total: int
+    llm_tokens_total: int
+    tool_calls_total: int
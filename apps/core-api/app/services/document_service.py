@@ -1,12 +1,14 @@
 import os
 import sys
+import json
 import uuid
 from typing import List, Optional
 from pathlib import Path
 import pdfplumber
 from docx import Document as DocxDocument
-from openai import OpenAI
-from sqlalchemy.orm import Session
+from openai import AsyncOpenAI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 from phi_utils.retry import retry_async
@@ -15,15 +17,27 @@ from phi_utils.logging import setup_logging
 logger = setup_logging("core-api.document_service")
 
 from app.config import settings
+from app.executor import run_blocking
 from app.models import Document, DocumentChunk
 
+# Embedding requests are batched up to this many inputs per API call
+EMBEDDING_BATCH_SIZE = 100
+
+_openai_client: Optional[AsyncOpenAI] = None
+_openai_client_key: Optional[str] = None
+
+
 # Initialize OpenAI client - lazy initialization to ensure settings are loaded
-def get_openai_client():
-    """Get OpenAI client with current API key from settings"""
+def get_openai_client() -> AsyncOpenAI:
+    """Get the shared async OpenAI client, keeping its connection pool across requests"""
+    global _openai_client, _openai_client_key
     api_key = settings.openai_api_key or os.getenv("OPENAI_API_KEY", "")
     if not api_key or api_key == "your-openai-api-key-here":
         raise ValueError("OPENAI_API_KEY is not set or is still the placeholder value")
-    return OpenAI(api_key=api_key)
+    if _openai_client is None or _openai_client_key != api_key:
+        _openai_client = AsyncOpenAI(api_key=api_key)
+        _openai_client_key = api_key
+    return _openai_client
 
 
 def extract_text_from_file(file_path: str, file_extension: str) -> str:
@@ -76,34 +90,52 @@ def chunk_text(text: str, chunk_size: int = 800, overlap: int = 200) -> List[str
     return chunks
 
 
-def generate_embedding(text: str) -> List[float]:
-    """Generate embedding using OpenAI with retry (sync version)"""
-    from phi_utils.retry import retry_sync
-    
-    def call_embedding():
-        client = get_openai_client()
-        return client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=text
-        )
-    
-    try:
-        response = retry_sync(
-            call_embedding,
-            max_retries=3,
-            delay=0.5,
-            backoff=2.0,
-            exceptions=(Exception,),
-            logger=logger
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        logger.error(f"Failed to generate embedding after retries: {str(e)}")
-        raise
-
-
-def process_document(
-    db: Session,
+async def generate_embeddings(texts: List[str]) -> List[List[float]]:
+    """Generate embeddings for a batch of texts using OpenAI with retry"""
+    embeddings: List[List[float]] = []
+    
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        batch = texts[start:start + EMBEDDING_BATCH_SIZE]
+        
+        async def call_embedding():
+            client = get_openai_client()
+            return await client.embeddings.create(
+                model="text-embedding-ada-002",
+                input=batch
+            )
+        
+        try:
+            response = await retry_async(
+                call_embedding,
+                max_retries=3,
+                delay=0.5,
+                backoff=2.0,
+                exceptions=(Exception,),
+                logger=logger
+            )
+        except Exception as e:
+            logger.error(f"Failed to generate embedding after retries: {str(e)}")
+            raise
+        
+        # The API may return items out of order; index restores input order
+        embeddings.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+    
+    return embeddings
+
+
+async def generate_embedding(text: str) -> List[float]:
+    """Generate embedding for a single text"""
+    embeddings = await generate_embeddings([text])
+    return embeddings[0]
+
+
+def embedding_to_pgvector(embedding: List[float]) -> str:
+    """Convert embedding list to string format for pgvector"""
+    return "[" + ",".join(map(str, embedding)) + "]"
+
+
+async def process_document(
+    db: AsyncSession,
     file_path: str,
     file_name: str,
     org_id: uuid.UUID,
@@ -115,10 +147,10 @@ def process_document(
     # Extract file extension
     file_ext = Path(file_name).suffix
     
-    # Extract text
-    text = extract_text_from_file(file_path, file_ext)
+    # Extract text (pdf/docx parsing is blocking, keep it off the event loop)
+    document_text = await run_blocking(extract_text_from_file, file_path, file_ext)
     
-    if not text.strip():
+    if not document_text.strip():
         raise ValueError("No text could be extracted from the document")
     
     # Create document record
@@ -130,45 +162,80 @@ def process_document(
         storage_path=file_path
     )
     db.add(document)
-    db.flush()
+    await db.flush()
     
     # Chunk text
-    chunks = chunk_text(text)
-    
-    # Generate embeddings and store chunks
-    for i, chunk_text_content in enumerate(chunks):
-        embedding = generate_embedding(chunk_text_content)
-        
-        # Convert embedding to string format for pgvector
-        embedding_str = "[" + ",".join(map(str, embedding)) + "]"
-        
-        # Use raw SQL to insert with vector type
-        from sqlalchemy import text
-        import json
-        metadata_json = json.dumps({
-            "chunk_index": i,
-            "total_chunks": len(chunks),
-            "source_type": source_type
-        })
-        db.execute(
-            text("""
-                INSERT INTO document_chunks 
-                (id, document_id, org_id, agent_id, chunk_text, embedding, metadata, created_at)
-                VALUES 
-                (uuid_generate_v4(), :doc_id, :org_id, :agent_id, :chunk_text, :embedding::vector, :metadata::jsonb, now())
-            """),
+    chunks = chunk_text(document_text)
+    
+    # Generate embeddings in batches
+    embeddings = await generate_embeddings(chunks)
+    
+    # Use raw SQL to insert with vector type (executemany, one round trip per batch)
+    await db.execute(
+        text("""
+            INSERT INTO document_chunks 
+            (id, document_id, org_id, agent_id, chunk_text, embedding, metadata, created_at)
+            VALUES 
+            (uuid_generate_v4(), CAST(:doc_id AS uuid), CAST(:org_id AS uuid), CAST(:agent_id AS uuid),
+             :chunk_text, CAST(:embedding AS vector), CAST(:metadata AS jsonb), now())
+        """),
+        [
             {
                 "doc_id": str(document.id),
                 "org_id": str(org_id),
                 "agent_id": str(agent_id) if agent_id else None,
                 "chunk_text": chunk_text_content,
-                "embedding": embedding_str,
-                "metadata": metadata_json
+                "embedding": embedding_to_pgvector(embedding),
+                "metadata": json.dumps({
+                    "chunk_index": i,
+                    "total_chunks": len(chunks),
+                    "source_type": source_type
+                })
             }
-        )
+            for i, (chunk_text_content, embedding) in enumerate(zip(chunks, embeddings))
+        ]
+    )
     
-    db.commit()
-    db.refresh(document)
+    await db.commit()
+    await db.refresh(document)
     
     return document
 
+
+
+async def search_document_chunks(
+    db: AsyncSession,
+    agent_id: uuid.UUID,
+    query: str,
+    top_k: int = 5
+) -> List[dict]:
+    """Vector similarity search over an agent's document chunks"""
+    # Generate embedding for query
+    query_embedding = await generate_embedding(query)
+    
+    # Use raw SQL with pgvector's cosine distance operator
+    # Note: Using CAST for UUID to avoid parameter binding issues
+    result = await db.execute(
+        text("""
+            SELECT id, document_id, chunk_text, metadata
+            FROM document_chunks
+            WHERE agent_id = CAST(:agent_id AS uuid)
+            ORDER BY embedding <=> CAST(:embedding AS vector)
+            LIMIT :limit
+        """),
+        {
+            "agent_id": str(agent_id),
+            "embedding": embedding_to_pgvector(query_embedding),
+            "limit": top_k
+        }
+    )
+    
+    return [
+        {
+            "id": row[0],
+            "document_id": row[1],
+            "chunk_text": row[2],
+            "metadata": row[3] if row[3] else {}
+        }
+        for row in result.fetchall()
+    ]
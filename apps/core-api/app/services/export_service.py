@@ -0,0 +1,231 @@
+"""
+Columnar export of task history for analytics
+Streams tasks, task_events and task_metrics as Parquet or Arrow IPC from the
+analytics (replica) engine using server-side cursors, one record batch at a time
+"""
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, String, Text, Uuid, select
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from phi_utils.logging import setup_logging
+
+from app.config import settings
+from app.database import analytics_engine
+from app.models import Task, TaskEvent, TaskMetrics
+
+logger = setup_logging("core-api.export_service")
+
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+# table name -> (model, watermark column); tasks use updated_at so changed rows are re-exported
+EXPORT_TABLES = {
+    "tasks": (Task, Task.updated_at),
+    "task_events": (TaskEvent, TaskEvent.timestamp),
+    "task_metrics": (TaskMetrics, TaskMetrics.created_at),
+}
+
+
+def _arrow_type(column) -> pa.DataType:
+    # Generic types, so both the postgres dialect types and plain TIMESTAMP match
+    column_type = column.type
+    if isinstance(column_type, Uuid):
+        return pa.string()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(column_type, JSON):
+        return pa.string()  # JSON text; analytics engines parse it on read
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, (String, Text)):
+        return pa.string()
+    raise ValueError(f"No Arrow mapping for column {column.name} ({column_type})")
+
+
+def export_schema(table: str) -> pa.Schema:
+    model, _ = EXPORT_TABLES[table]
+    return pa.schema([
+        pa.field(column.name, _arrow_type(column), nullable=True)
+        for column in model.__table__.columns
+    ])
+
+
+def _convert(value: Any, arrow_type: pa.DataType) -> Any:
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type) and not isinstance(value, str):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, default=str)
+        return str(value)
+    return value
+
+
+def _record_batch(rows: List[Tuple], schema: pa.Schema) -> pa.RecordBatch:
+    columns = []
+    for index, field in enumerate(schema):
+        columns.append(pa.array([_convert(row[index], field.type) for row in rows], type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Treat naive datetimes from query strings and state files as UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def default_until() -> datetime:
+    """Upper bound for an export run, lagged so in-flight transactions are not skipped"""
+    return datetime.now(timezone.utc) - timedelta(seconds=settings.export_watermark_lag_seconds)
+
+
+def iter_record_batches(
+    table: str,
+    since: Optional[datetime],
+    until: datetime,
+    batch_size: Optional[int] = None
+) -> Iterator[pa.RecordBatch]:
+    """Yield rows with since <= watermark < until as Arrow record batches
+
+    Uses a server-side cursor, so memory stays bounded by batch_size
+    regardless of how many rows match.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table: {table}")
+    model, watermark = EXPORT_TABLES[table]
+    schema = export_schema(table)
+    batch_size = batch_size or settings.export_batch_size
+
+    query = select(*model.__table__.columns).where(watermark < until)
+    if since is not None:
+        query = query.where(watermark >= since)
+    query = query.order_by(watermark)
+
+    with analytics_engine.connect() as conn:
+        # Repeatable read keeps the snapshot consistent across batches
+        conn = conn.execution_options(
+            stream_results=True,
+            yield_per=batch_size,
+            isolation_level="REPEATABLE READ",
+            postgresql_readonly=True
+        )
+        result = conn.execute(query)
+        for rows in result.partitions():
+            yield _record_batch(rows, schema)
+
+
+class _ChunkSink:
+    """Write-only file object that collects bytes until drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _open_writer(sink, fmt: str, schema: pa.Schema):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    if fmt == "arrow":
+        return pa.ipc.new_stream(sink, schema)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def stream_export(
+    table: str,
+    fmt: str,
+    since: Optional[datetime],
+    until: datetime
+) -> Iterator[bytes]:
+    """Serialize an export incrementally, yielding bytes after every record batch
+
+    The schema and format are checked before the iterator is returned, so a
+    bad request fails before any response headers are sent.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return _stream_export(table, fmt, since, until, export_schema(table))
+
+
+def _stream_export(
+    table: str,
+    fmt: str,
+    since: Optional[datetime],
+    until: datetime,
+    schema: pa.Schema
+) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    writer = _open_writer(pa.PythonFile(sink, mode="w"), fmt, schema)
+    rows = 0
+    try:
+        for batch in iter_record_batches(table, since, until):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+    logger.info(f"Exported {rows} rows from {table} as {fmt}")
+
+
+def export_to_file(
+    table: str,
+    fmt: str,
+    path: str,
+    since: Optional[datetime],
+    until: datetime
+) -> int:
+    """Write an export to path atomically; returns the row count"""
+    schema = export_schema(table)
+    tmp_path = f"{path}.tmp"
+    rows = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            writer = _open_writer(f, fmt, schema)
+            try:
+                for batch in iter_record_batches(table, since, until):
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+            finally:
+                writer.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return rows
@@ -0,0 +1,156 @@
+"""
+Hourly rollups of task_metrics with mergeable latency sketches
+Each run rebuilds the hours in its window from raw metrics, so reruns are idempotent
+and late-arriving rows are picked up by the lookback
+"""
+import os
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from phi_utils.logging import setup_logging
+
+from app.config import settings
+from app.models import Task, TaskMetrics, TaskMetricsHourly
+from app.services.sketch import LatencySketch
+
+logger = setup_logging("core-api.metrics_rollup_service")
+
+RollupKey = Tuple[UUID, UUID, str, datetime]
+
+
+@dataclass
+class RollupAccumulator:
+    sketch: LatencySketch = field(default_factory=LatencySketch)
+    task_count: int = 0
+    failure_count: int = 0
+    llm_calls_total: int = 0
+    llm_tokens_total: int = 0
+    tool_calls_total: int = 0
+
+    def add(self, duration: Optional[float], failed: bool, llm_calls: int, llm_tokens: int, tool_calls: int) -> None:
+        self.task_count += 1
+        if failed:
+            self.failure_count += 1
+        if duration is not None:
+            self.sketch.add(max(duration, 0.0))
+        self.llm_calls_total += llm_calls or 0
+        self.llm_tokens_total += llm_tokens or 0
+        self.tool_calls_total += tool_calls or 0
+
+    def merge(self, other: "RollupAccumulator") -> "RollupAccumulator":
+        self.sketch.merge(other.sketch)
+        self.task_count += other.task_count
+        self.failure_count += other.failure_count
+        self.llm_calls_total += other.llm_calls_total
+        self.llm_tokens_total += other.llm_tokens_total
+        self.tool_calls_total += other.tool_calls_total
+        return self
+
+    @classmethod
+    def from_row(cls, row: TaskMetricsHourly) -> "RollupAccumulator":
+        return cls(
+            sketch=LatencySketch.from_dict(row.duration_sketch),
+            task_count=row.task_count,
+            failure_count=row.failure_count,
+            llm_calls_total=row.llm_calls_total,
+            llm_tokens_total=row.llm_tokens_total,
+            tool_calls_total=row.tool_calls_total,
+        )
+
+    def summary(self) -> Dict:
+        return {
+            "task_count": self.task_count,
+            "failure_count": self.failure_count,
+            "failure_rate": self.failure_count / self.task_count if self.task_count else 0.0,
+            "duration_p50": self.sketch.quantile(0.50),
+            "duration_p95": self.sketch.quantile(0.95),
+            "duration_p99": self.sketch.quantile(0.99),
+            "llm_calls_total": self.llm_calls_total,
+            "llm_tokens_total": self.llm_tokens_total,
+            "tool_calls_total": self.tool_calls_total,
+        }
+
+
+def hour_start(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_window(conn, start: datetime, end: datetime) -> int:
+    """Rebuild rollup rows for the hours in [start, end); returns rows written"""
+    start, end = hour_start(start), hour_start(end)
+    query = (
+        select(
+            TaskMetrics.org_id, TaskMetrics.agent_id, TaskMetrics.task_type, TaskMetrics.created_at,
+            TaskMetrics.duration_seconds, TaskMetrics.llm_calls, TaskMetrics.llm_tokens_used,
+            TaskMetrics.tool_calls, Task.status
+        )
+        .join(Task, Task.id == TaskMetrics.task_id)
+        .where(TaskMetrics.created_at >= start, TaskMetrics.created_at < end)
+    )
+
+    accumulators: Dict[RollupKey, RollupAccumulator] = {}
+    result = conn.execution_options(stream_results=True, yield_per=settings.export_batch_size).execute(query)
+    for row in result:
+        key = (row.org_id, row.agent_id, row.task_type, hour_start(row.created_at))
+        accumulator = accumulators.setdefault(key, RollupAccumulator())
+        accumulator.add(
+            row.duration_seconds, row.status == "FAILED",
+            row.llm_calls, row.llm_tokens_used, row.tool_calls
+        )
+
+    rows = []
+    now = datetime.now(timezone.utc)
+    for (org_id, agent_id, task_type, bucket_start), accumulator in accumulators.items():
+        summary = accumulator.summary()
+        rows.append({
+            "org_id": org_id,
+            "agent_id": agent_id,
+            "task_type": task_type,
+            "bucket_start": bucket_start,
+            "task_count": summary["task_count"],
+            "failure_count": summary["failure_count"],
+            "duration_p50": summary["duration_p50"],
+            "duration_p95": summary["duration_p95"],
+            "duration_p99": summary["duration_p99"],
+            "duration_sketch": accumulator.sketch.to_dict(),
+            "llm_calls_total": summary["llm_calls_total"],
+            "llm_tokens_total": summary["llm_tokens_total"],
+            "tool_calls_total": summary["tool_calls_total"],
+            "updated_at": now,
+        })
+
+    # Replace the window wholesale so keys with no remaining rows disappear too
+    conn.execute(
+        delete(TaskMetricsHourly).where(
+            TaskMetricsHourly.bucket_start >= start,
+            TaskMetricsHourly.bucket_start < end
+        )
+    )
+    if rows:
+        conn.execute(insert(TaskMetricsHourly), rows)
+    return len(rows)
+
+
+def run_metrics_rollup(
+    conn,
+    lookback_hours: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> Dict:
+    """Roll up the last lookback_hours plus the current (partial) hour"""
+    lookback_hours = lookback_hours if lookback_hours is not None else settings.metrics_rollup_lookback_hours
+    end = hour_start(now or datetime.now(timezone.utc)) + timedelta(hours=1)
+    start = end - timedelta(hours=lookback_hours + 1)
+
+    with conn.begin():
+        written = rollup_window(conn, start, end)
+    logger.info(f"Rolled up {written} metric buckets for {start.isoformat()} - {end.isoformat()}")
+    return {"start": start.isoformat(), "end": end.isoformat(), "rows": written}
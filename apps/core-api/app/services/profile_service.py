@@ -2,8 +2,9 @@ import os
 import sys
 import json
 from typing import Dict, Any, List
-from openai import OpenAI
-from sqlalchemy.orm import Session
+from openai import AsyncOpenAI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 from phi_utils.retry import retry_async
@@ -16,35 +17,49 @@ from app.config import settings
 
 # Initialize OpenAI client - lazy initialization to ensure settings are loaded
 def get_openai_client():
-    """Get OpenAI client with current API key from settings"""
+    """Get async OpenAI client with current API key from settings"""
     api_key = settings.openai_api_key or os.getenv("OPENAI_API_KEY", "")
     if not api_key or api_key == "your-openai-api-key-here":
         raise ValueError("OPENAI_API_KEY is not set or is still the placeholder value")
-    return OpenAI(api_key=api_key)
+    return AsyncOpenAI(api_key=api_key)
 
-# For backward compatibility, but will be recreated on each use
-openai_client = None
 
+async def _load_industry_and_role(db: AsyncSession, agent: Agent):
+    """Load the agent's industry and role template"""
+    result = await db.execute(select(Industry).where(Industry.id == agent.industry_id))
+    industry = result.scalar_one_or_none()
+    result = await db.execute(select(RoleTemplate).where(RoleTemplate.id == agent.role_template_id))
+    role_template = result.scalar_one_or_none()
+    return industry, role_template
 
-def generate_agent_profile(
-    db: Session,
+
+async def _load_agent_tools(db: AsyncSession, agent: Agent) -> List[Tool]:
+    """Load the tools attached to an agent in a single join"""
+    result = await db.execute(
+        select(Tool).join(AgentTool, AgentTool.tool_id == Tool.id).where(AgentTool.agent_id == agent.id)
+    )
+    return list(result.scalars().all())
+
+
+async def generate_agent_profile(
+    db: AsyncSession,
     agent: Agent
 ) -> tuple[str, Dict[str, Any]]:
     """Generate agent profile using LLM"""
     
     # Load industry and role template
-    industry = db.query(Industry).filter(Industry.id == agent.industry_id).first()
-    role_template = db.query(RoleTemplate).filter(RoleTemplate.id == agent.role_template_id).first()
+    industry, role_template = await _load_industry_and_role(db, agent)
     
     # Get sample document chunks (5-10 chunks from JDs and SOPs)
-    chunks = db.query(DocumentChunk).filter(
-        DocumentChunk.agent_id == agent.id
-    ).limit(10).all()
+    result = await db.execute(
+        select(DocumentChunk.chunk_text).where(
+            DocumentChunk.agent_id == agent.id
+        ).limit(10)
+    )
+    chunk_texts = result.scalars().all()
     
     # Get agent tools
-    agent_tools = db.query(AgentTool).filter(AgentTool.agent_id == agent.id).all()
-    tool_ids = [at.tool_id for at in agent_tools]
-    tools = db.query(Tool).filter(Tool.id.in_(tool_ids)).all() if tool_ids else []
+    tools = await _load_agent_tools(db, agent)
     
     # Build context
     industry_info = f"Industry: {industry.name if industry else 'Unknown'}\n{industry.description if industry and industry.description else ''}"
@@ -52,10 +67,10 @@ def generate_agent_profile(
     
     # Sample document chunks
     doc_context = ""
-    if chunks:
+    if chunk_texts:
         doc_context = "\n\nSample Context from Documents:\n"
-        for i, chunk in enumerate(chunks[:10], 1):
-            doc_context += f"\n--- Chunk {i} ---\n{chunk.chunk_text[:500]}\n"
+        for i, chunk_text in enumerate(chunk_texts[:10], 1):
+            doc_context += f"\n--- Chunk {i} ---\n{chunk_text[:500]}\n"
     
     # Tools info
     tools_info = ""
@@ -102,12 +117,10 @@ Format your response as JSON with the following structure:
 
 Be specific and detailed. The system prompt should be professional and clearly define the agent's purpose."""
     
-    # Call OpenAI with retry (sync version)
-    from phi_utils.retry import retry_sync
-    
-    def call_llm():
+    # Call OpenAI with retry
+    async def call_llm():
         client = get_openai_client()
-        return client.chat.completions.create(
+        return await client.chat.completions.create(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an expert at designing AI agent profiles and system prompts. Always respond with valid JSON."},
@@ -117,7 +130,7 @@ Be specific and detailed. The system prompt should be professional and clearly d
         )
     
     try:
-        response = retry_sync(
+        response = await retry_async(
             call_llm,
             max_retries=3,
             delay=1.0,
@@ -167,20 +180,17 @@ Be specific and detailed. The system prompt should be professional and clearly d
     return system_prompt, config
 
 
-def generate_agent_config(
-    db: Session,
+async def generate_agent_config(
+    db: AsyncSession,
     agent: Agent
 ) -> Dict[str, Any]:
     """Generate config YAML/JSON for local agent"""
     
     # Get tools
-    agent_tools = db.query(AgentTool).filter(AgentTool.agent_id == agent.id).all()
-    tool_ids = [at.tool_id for at in agent_tools]
-    tools = db.query(Tool).filter(Tool.id.in_(tool_ids)).all() if tool_ids else []
+    tools = await _load_agent_tools(db, agent)
     
     # Get industry and role
-    industry = db.query(Industry).filter(Industry.id == agent.industry_id).first()
-    role_template = db.query(RoleTemplate).filter(RoleTemplate.id == agent.role_template_id).first()
+    industry, role_template = await _load_industry_and_role(db, agent)
     
     # Extract required settings from tool config schemas
     tool_configs = []
@@ -0,0 +1,89 @@
+"""
+Retention for the time-partitioned task_events table
+Compacts expiring partitions into task_event_rollups, then drops them
+"""
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from phi_utils.logging import setup_logging
+from phi_utils.partitions import drop_partition, ensure_monthly_partitions, expired_partitions
+
+from app.config import settings
+
+logger = setup_logging("core-api.retention_service")
+
+# Merges a partition's events into the existing per-task rollup
+COMPACT_PARTITION_SQL = """
+    INSERT INTO task_event_rollups
+        (task_id, event_count, event_type_counts, first_event_at, last_event_at, compacted_at)
+    SELECT task_id, SUM(n), jsonb_object_agg(event_type, n), MIN(first_at), MAX(last_at), now()
+    FROM (
+        SELECT task_id, event_type, COUNT(*) AS n,
+               MIN("timestamp") AS first_at, MAX("timestamp") AS last_at
+        FROM {partition}
+        GROUP BY task_id, event_type
+    ) per_type
+    WHERE EXISTS (SELECT 1 FROM tasks WHERE tasks.id = per_type.task_id)
+    GROUP BY task_id
+    ON CONFLICT (task_id) DO UPDATE SET
+        event_count = task_event_rollups.event_count + EXCLUDED.event_count,
+        event_type_counts = (
+            SELECT jsonb_object_agg(
+                k,
+                COALESCE((task_event_rollups.event_type_counts ->> k)::int, 0)
+                + COALESCE((EXCLUDED.event_type_counts ->> k)::int, 0)
+            )
+            FROM (
+                SELECT jsonb_object_keys(task_event_rollups.event_type_counts)
+                UNION
+                SELECT jsonb_object_keys(EXCLUDED.event_type_counts)
+            ) AS keys(k)
+        ),
+        first_event_at = LEAST(task_event_rollups.first_event_at, EXCLUDED.first_event_at),
+        last_event_at = GREATEST(task_event_rollups.last_event_at, EXCLUDED.last_event_at),
+        compacted_at = now()
+"""
+
+
+def compact_partition(conn, partition: str) -> int:
+    """Fold one partition's events into task_event_rollups; returns tasks touched"""
+    result = conn.execute(text(COMPACT_PARTITION_SQL.format(partition=partition)))
+    return result.rowcount
+
+
+def run_task_events_retention(
+    conn,
+    retention_days: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Premake future partitions, then compact and drop the expired ones
+    
+    Each expired partition is compacted and dropped in its own transaction, so
+    a failure leaves either the raw events or their rollup, never neither.
+    """
+    now = now or datetime.now(timezone.utc)
+    retention_days = retention_days if retention_days is not None else settings.task_events_retention_days
+    cutoff = now - timedelta(days=retention_days)
+    
+    with conn.begin():
+        created = ensure_monthly_partitions(
+            conn, "task_events", "timestamp",
+            months_ahead=settings.partition_premake_months, now=now
+        )
+    
+    dropped = []
+    with conn.begin():
+        expired = expired_partitions(conn, "task_events", cutoff)
+    for partition in expired:
+        with conn.begin():
+            tasks = compact_partition(conn, partition)
+            drop_partition(conn, "task_events", partition)
+        logger.info(f"Compacted {tasks} tasks from {partition} and dropped it")
+        dropped.append(partition)
+    
+    return {"created": created, "dropped": dropped, "cutoff": cutoff.isoformat()}
@@ -0,0 +1,101 @@
+"""
+Mergeable latency sketch for percentile rollups
+Log-bucketed histogram in the style of DDSketch: every quantile estimate is within
+relative_accuracy of the true value, and sketches merge by adding bucket counts,
+so hourly rollups can be combined into any larger window exactly
+"""
+import math
+from typing import Any, Dict, Optional
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# Durations below this (seconds) are counted as zero
+MIN_TRACKED_VALUE = 1e-6
+
+
+class LatencySketch:
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value < 0:
+            raise ValueError("LatencySketch only tracks non-negative values")
+        if value < MIN_TRACKED_VALUE:
+            self.zero_count += count
+        else:
+            index = self._index(value)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Clamp to the observed range so tiny samples stay exact at the ends
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable form (bucket keys become strings in JSONB)"""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencySketch":
+        sketch = cls(data.get("relative_accuracy", DEFAULT_RELATIVE_ACCURACY))
+        sketch.buckets = {int(index): count for index, count in data.get("buckets", {}).items()}
+        sketch.zero_count = data.get("zero_count", 0)
+        sketch.count = data.get("count", 0)
+        sketch.sum = data.get("sum", 0.0)
+        sketch.min = data.get("min")
+        sketch.max = data.get("max")
+        return sketch
@@ -0,0 +1,262 @@
+"""
+Query plan regression check for hot queries
+Seeds realistic volumes inside a transaction, runs EXPLAIN on each hot query
+and asserts the planner picks the expected index. Everything is rolled back.
+
+Run after migrations: python scripts/check_query_plans.py [--scale 1.0]
+"""
+import argparse
+import json
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+
+INDEX_NODE_TYPES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+# Base row counts at --scale 1.0
+VOLUMES = {
+    "orgs": 200,
+    "users": 2000,
+    "agents": 1000,
+    "local_agents": 2000,
+    "tasks": 200000,
+    "events_per_task": 6,
+    "document_chunks": 100000,
+}
+
+SEED_SQL = [
+    # Users and organizations
+    """
+    INSERT INTO users (id, email, password_hash, created_at)
+    SELECT uuid_generate_v4(), 'plan-check-' || g || '@example.com', 'x', now()
+    FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO organizations (id, name, owner_user_id, created_at)
+    SELECT uuid_generate_v4(), 'plan-check-org-' || g,
+           (SELECT id FROM users WHERE email LIKE 'plan-check-%' LIMIT 1), now()
+    FROM generate_series(1, :orgs) g
+    """,
+    """
+    CREATE TEMP TABLE plan_orgs ON COMMIT DROP AS
+    SELECT id, row_number() OVER () AS n FROM organizations WHERE name LIKE 'plan-check-org-%'
+    """,
+    """
+    CREATE TEMP TABLE plan_users ON COMMIT DROP AS
+    SELECT id, row_number() OVER () AS n FROM users WHERE email LIKE 'plan-check-%'
+    """,
+    # Each user belongs to one org
+    """
+    INSERT INTO organization_members (id, org_id, user_id, role, created_at)
+    SELECT uuid_generate_v4(), o.id, u.id, 'MEMBER', now()
+    FROM plan_users u JOIN plan_orgs o ON o.n = (u.n % :orgs) + 1
+    """,
+    # Agents spread across orgs
+    """
+    INSERT INTO agents (id, org_id, name, status, created_at)
+    SELECT uuid_generate_v4(), o.id, 'plan-check-agent-' || g, 'ACTIVE', now()
+    FROM generate_series(1, :agents) g JOIN plan_orgs o ON o.n = (g % :orgs) + 1
+    """,
+    """
+    CREATE TEMP TABLE plan_agents ON COMMIT DROP AS
+    SELECT id, org_id, row_number() OVER () AS n FROM agents WHERE name LIKE 'plan-check-agent-%'
+    """,
+    # Mostly offline local agents, a few active
+    """
+    INSERT INTO local_agents (id, agent_id, org_id, name, status, last_heartbeat_at)
+    SELECT uuid_generate_v4(), a.id, a.org_id, 'plan-check-local-' || g,
+           CASE WHEN g % 10 = 0 THEN 'ACTIVE' ELSE 'OFFLINE' END,
+           now() - (g % 1000) * interval '1 minute'
+    FROM generate_series(1, :local_agents) g JOIN plan_agents a ON a.n = (g % :agents) + 1
+    """,
+    # Tasks over the last 90 days, overwhelmingly finished
+    """
+    INSERT INTO tasks (id, agent_id, org_id, type, status, created_at, updated_at)
+    SELECT uuid_generate_v4(), a.id, a.org_id, 'DAILY_WAREHOUSE_REPORT',
+           CASE WHEN g % 500 = 0 THEN 'RUNNING'
+                WHEN g % 20 = 0 THEN 'FAILED'
+                ELSE 'SUCCESS' END,
+           now() - (g % 129600) * interval '1 minute',
+           now() - (g % 129600) * interval '1 minute'
+    FROM generate_series(1, :tasks) g JOIN plan_agents a ON a.n = (g % :agents) + 1
+    """,
+    """
+    CREATE TEMP TABLE plan_tasks ON COMMIT DROP AS
+    SELECT t.id, t.created_at, t.agent_id FROM tasks t
+    JOIN plan_agents a ON a.id = t.agent_id
+    """,
+    """
+    INSERT INTO task_events (id, task_id, timestamp, event_type, payload)
+    SELECT uuid_generate_v4(), t.id, t.created_at + e * interval '5 seconds', 'PROGRESS_UPDATE',
+           jsonb_build_object('progress', e * 15)
+    FROM plan_tasks t CROSS JOIN generate_series(1, :events_per_task) e
+    """,
+    """
+    INSERT INTO documents (id, org_id, agent_id, name, source_type, storage_path, created_at)
+    SELECT uuid_generate_v4(), a.org_id, a.id, 'plan-check-doc', 'SOP', '/dev/null', now()
+    FROM plan_agents a
+    """,
+    """
+    INSERT INTO document_chunks (id, document_id, org_id, agent_id, chunk_text, created_at)
+    SELECT uuid_generate_v4(), d.id, d.org_id, d.agent_id, 'chunk ' || g, now()
+    FROM generate_series(1, :document_chunks) g
+    JOIN (SELECT id, org_id, agent_id, row_number() OVER () AS n
+          FROM documents WHERE name = 'plan-check-doc') d
+      ON d.n = (g % :agents) + 1
+    """,
+]
+
+TOOL_TASK_SEED_SQL = """
+    INSERT INTO tool_tasks (id, task_id, local_agent_id, step_id, tool_name, payload, status, created_at)
+    SELECT uuid_generate_v4(), t.id,
+           (SELECT id FROM local_agents WHERE agent_id = t.agent_id LIMIT 1),
+           'fetch_wms_data', 'db', '{}'::jsonb,
+           CASE WHEN random() < 0.002 THEN 'PENDING' ELSE 'COMPLETED' END,
+           t.created_at
+    FROM plan_tasks t
+"""
+
+# (label, expected index, query) - parameters are sampled from the seeded rows
+HOT_QUERIES = [
+    (
+        "pending tool tasks poll",
+        "ix_tool_tasks_local_agent_id_status",
+        "SELECT * FROM tool_tasks WHERE local_agent_id = :local_agent_id AND status = 'PENDING'",
+    ),
+    (
+        "tool callback lookup",
+        "ix_tool_tasks_task_id_step_id",
+        "SELECT * FROM tool_tasks WHERE task_id = :task_id AND step_id = 'fetch_wms_data' LIMIT 1",
+    ),
+    (
+        "task events read",
+        "ix_task_events_task_id_timestamp",
+        "SELECT * FROM task_events WHERE task_id = :task_id ORDER BY timestamp",
+    ),
+    (
+        "admin tasks by org",
+        "ix_tasks_org_id_created_at_id",
+        "SELECT * FROM tasks WHERE org_id = :org_id ORDER BY created_at DESC, id DESC LIMIT 101",
+    ),
+    (
+        "admin tasks next page",
+        "ix_tasks_created_at_id",
+        "SELECT id, status, created_at FROM tasks WHERE (created_at, id) < (now() - interval '30 days', CAST(:task_id AS uuid)) "
+        "ORDER BY created_at DESC, id DESC LIMIT 101",
+    ),
+    (
+        "admin tasks by agent",
+        "ix_tasks_agent_id_created_at_id",
+        "SELECT * FROM tasks WHERE agent_id = :agent_id ORDER BY created_at DESC, id DESC LIMIT 101",
+    ),
+    (
+        "tasks by status",
+        "ix_tasks_status",
+        "SELECT * FROM tasks WHERE status = 'RUNNING'",
+    ),
+    (
+        "active local agent for agent",
+        "ix_local_agents_agent_id_status",
+        "SELECT * FROM local_agents WHERE agent_id = :agent_id AND status = 'ACTIVE' LIMIT 1",
+    ),
+    (
+        "membership check",
+        "ix_organization_members_org_id_user_id",
+        "SELECT * FROM organization_members WHERE org_id = :org_id AND user_id = :user_id LIMIT 1",
+    ),
+    (
+        "document chunks for agent",
+        "ix_document_chunks_agent_id",
+        "SELECT id FROM document_chunks WHERE agent_id = :agent_id LIMIT 10",
+    ),
+]
+
+
+def _index_scans(plan: dict):
+    """Yield (node type, index name) for every index access in a plan tree"""
+    if plan.get("Node Type") in INDEX_NODE_TYPES:
+        yield plan["Node Type"], plan.get("Index Name")
+    for child in plan.get("Plans", []):
+        yield from _index_scans(child)
+
+
+def _root_index(conn, index_name: str) -> str:
+    """Resolve an index on a partition to the partitioned parent index it belongs to"""
+    parent = conn.execute(text("""
+        SELECT p.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE c.relname = :name
+    """), {"name": index_name}).scalar()
+    return _root_index(conn, parent) if parent else index_name
+
+
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": table}).scalar()
+
+
+def check_query_plans(scale: float) -> bool:
+    volumes = {key: max(1, int(value * scale)) for key, value in VOLUMES.items()}
+    volumes["events_per_task"] = VOLUMES["events_per_task"]
+    ok = True
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            print(f"Seeding {volumes['tasks']} tasks across {volumes['agents']} agents...")
+            for statement in SEED_SQL:
+                conn.execute(text(statement), volumes)
+
+            has_tool_tasks = _table_exists(conn, "tool_tasks")
+            if has_tool_tasks:
+                conn.execute(text(TOOL_TASK_SEED_SQL))
+
+            for table in ["tasks", "task_events", "local_agents", "organization_members", "document_chunks"] + (
+                ["tool_tasks"] if has_tool_tasks else []
+            ):
+                conn.execute(text(f"ANALYZE {table}"))
+
+            sample = conn.execute(text("""
+                SELECT t.id AS task_id, t.agent_id, a.org_id,
+                       (SELECT id FROM local_agents WHERE agent_id = t.agent_id LIMIT 1) AS local_agent_id,
+                       (SELECT user_id FROM organization_members WHERE org_id = a.org_id LIMIT 1) AS user_id
+                FROM plan_tasks t JOIN plan_agents a ON a.id = t.agent_id
+                LIMIT 1
+            """)).mappings().one()
+            params = {key: str(value) for key, value in sample.items()}
+
+            for label, expected_index, query in HOT_QUERIES:
+                if expected_index.startswith("ix_tool_tasks") and not has_tool_tasks:
+                    print(f"SKIP  {label}: tool_tasks table not found (run orchestrator migrations)")
+                    continue
+
+                plan_json = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params).scalar()
+                if isinstance(plan_json, str):
+                    plan_json = json.loads(plan_json)
+                scans = [
+                    (node, _root_index(conn, name) if name else name)
+                    for node, name in _index_scans(plan_json[0]["Plan"])
+                ]
+
+                if any(index_name == expected_index for _, index_name in scans):
+                    print(f"PASS  {label}: {expected_index}")
+                else:
+                    ok = False
+                    used = ", ".join(f"{node} on {name}" for node, name in scans) or "no index scan"
+                    print(f"FAIL  {label}: expected {expected_index}, planner used {used}")
+        finally:
+            trans.rollback()
+
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for seeded row counts")
+    args = parser.parse_args()
+
+    sys.exit(0 if check_query_plans(args.scale) else 1)
@@ -0,0 +1,60 @@
+"""
+Incremental columnar export of tasks, task_events and task_metrics
+Each run exports rows since the last watermark (kept in a state file) up to now,
+one file per table, reading from ANALYTICS_DATABASE_URL when configured.
+
+Usage: python scripts/export_tasks.py --out-dir exports [--format parquet|arrow]
+"""
+import argparse
+import json
+import sys
+import os
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.export_service import EXPORT_FORMATS, EXPORT_TABLES, as_utc, default_until, export_to_file
+
+
+def load_watermarks(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_watermarks(path: str, watermarks: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export task history as Parquet/Arrow")
+    parser.add_argument("--out-dir", required=True, help="Directory for exported files")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--tables", nargs="+", choices=list(EXPORT_TABLES), default=list(EXPORT_TABLES))
+    parser.add_argument("--state-file", default=None, help="Watermark file (default: <out-dir>/watermarks.json)")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="Override the stored watermark")
+    parser.add_argument("--full", action="store_true", help="Ignore stored watermarks and export everything")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    state_file = args.state_file or os.path.join(args.out_dir, "watermarks.json")
+    watermarks = load_watermarks(state_file)
+    until = default_until()
+    _, extension = EXPORT_FORMATS[args.format]
+
+    for table in args.tables:
+        since = as_utc(args.since)
+        if since is None and not args.full and table in watermarks:
+            since = as_utc(datetime.fromisoformat(watermarks[table]))
+
+        stamp = until.strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(args.out_dir, f"{table}-{stamp}.{extension}")
+        rows = export_to_file(table, args.format, path, since, until)
+        print(f"{table}: {rows} rows -> {path}")
+
+        # Only advance the watermark once the file is safely written
+        watermarks[table] = until.isoformat()
+        save_watermarks(state_file, watermarks)
@@ -0,0 +1,34 @@
+"""
+Hourly task_metrics rollups for GET /admin/metrics/summary
+Run every few minutes from cron: python scripts/rollup_task_metrics.py
+Backfill history once with: python scripts/rollup_task_metrics.py --backfill-days 30
+"""
+import argparse
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.services.metrics_rollup_service import hour_start, rollup_window, run_metrics_rollup
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll up task_metrics into hourly buckets")
+    parser.add_argument("--lookback-hours", type=int, default=None, help="Override METRICS_ROLLUP_LOOKBACK_HOURS")
+    parser.add_argument("--backfill-days", type=int, default=None, help="Rebuild this many days, one day per transaction")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        if args.backfill_days:
+            end = hour_start(datetime.now(timezone.utc)) + timedelta(hours=1)
+            day_start = end - timedelta(days=args.backfill_days)
+            while day_start < end:
+                day_end = min(day_start + timedelta(days=1), end)
+                with conn.begin():
+                    rows = rollup_window(conn, day_start, day_end)
+                print(f"{day_start.isoformat()}: {rows} buckets")
+                day_start = day_end
+        else:
+            result = run_metrics_rollup(conn, lookback_hours=args.lookback_hours)
+            print(f"Rolled up {result['rows']} buckets for {result['start']} - {result['end']}")
@@ -0,0 +1,23 @@
+"""
+Partition maintenance and retention for task_events
+Run from cron at least monthly: python scripts/run_retention.py
+"""
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.services.retention_service import run_task_events_retention
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact and drop expired task_events partitions")
+    parser.add_argument("--retention-days", type=int, default=None, help="Override TASK_EVENTS_RETENTION_DAYS")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        result = run_task_events_retention(conn, retention_days=args.retention_days)
+
+    print(f"Created partitions: {', '.join(result['created']) or 'none'}")
+    print(f"Dropped partitions (older than {result['cutoff']}): {', '.join(result['dropped']) or 'none'}")
@@ -0,0 +1,29 @@
+"""
+Export schemas must map every column of every exportable table
+"""
+import os
+import sys
+
+import pyarrow as pa
+import pytest
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+sys.path.insert(0, os.path.join(base_dir, '..', '..', 'packages', 'shared-utils'))
+
+from app.services.export_service import EXPORT_TABLES, export_schema
+
+
+@pytest.mark.parametrize("table", list(EXPORT_TABLES))
+def test_export_schema_covers_every_column(table):
+    model, _ = EXPORT_TABLES[table]
+    schema = export_schema(table)
+    assert schema.names == [column.name for column in model.__table__.columns]
+
+
+@pytest.mark.parametrize("table", list(EXPORT_TABLES))
+def test_export_schema_types(table):
+    model, watermark = EXPORT_TABLES[table]
+    schema = export_schema(table)
+    assert schema.field(watermark.name).type == pa.timestamp("us", tz="UTC")
+    assert schema.field("id" if "id" in schema.names else "task_id").type == pa.string()
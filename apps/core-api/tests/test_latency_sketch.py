@@ -0,0 +1,136 @@
+"""
+Latency sketches and rollup accumulators must merge without losing accuracy
+"""
+import json
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+sys.path.insert(0, os.path.join(base_dir, '..', '..', 'packages', 'shared-utils'))
+
+from app.services.metrics_rollup_service import RollupAccumulator
+from app.services.sketch import DEFAULT_RELATIVE_ACCURACY, LatencySketch
+
+QUANTILES = [0.0, 0.01, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0]
+
+
+def exact_quantile(values, q):
+    # Same rank convention as LatencySketch.quantile
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_merged_sketch_stays_within_relative_accuracy():
+    rng = random.Random(7)
+    hours = [[rng.lognormvariate(0, 1.5) for _ in range(rng.randint(50, 2000))] for _ in range(24)]
+
+    merged = LatencySketch()
+    for values in hours:
+        hourly = LatencySketch()
+        for value in values:
+            hourly.add(value)
+        merged.merge(hourly)
+
+    everything = [value for values in hours for value in values]
+    assert merged.count == len(everything)
+    assert merged.sum == pytest.approx(sum(everything))
+    assert merged.min == min(everything)
+    assert merged.max == max(everything)
+    for q in QUANTILES:
+        expected = exact_quantile(everything, q)
+        assert abs(merged.quantile(q) - expected) <= DEFAULT_RELATIVE_ACCURACY * expected
+
+
+def test_merge_matches_single_sketch():
+    rng = random.Random(11)
+    values = [rng.expovariate(0.5) for _ in range(5000)]
+    single = LatencySketch()
+    left, right = LatencySketch(), LatencySketch()
+    for i, value in enumerate(values):
+        single.add(value)
+        (left if i % 2 else right).add(value)
+    left.merge(right)
+    assert left.buckets == single.buckets
+    for q in QUANTILES:
+        assert left.quantile(q) == single.quantile(q)
+
+
+def test_zero_durations_are_counted():
+    sketch = LatencySketch()
+    for value in [0.0, 0.0, 0.0, 2.0]:
+        sketch.add(value)
+    assert sketch.zero_count == 3
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == pytest.approx(2.0, rel=DEFAULT_RELATIVE_ACCURACY)
+
+
+def test_dict_round_trip_through_json():
+    sketch = LatencySketch()
+    for value in [0.0, 0.05, 1.5, 1.5, 30.0]:
+        sketch.add(value)
+    restored = LatencySketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    assert restored.buckets == sketch.buckets
+    assert restored.to_dict() == sketch.to_dict()
+    for q in QUANTILES:
+        assert restored.quantile(q) == sketch.quantile(q)
+
+
+def test_empty_sketch():
+    sketch = LatencySketch()
+    assert sketch.quantile(0.5) is None
+    assert LatencySketch.from_dict({}).quantile(0.99) is None
+    # Merging an empty sketch changes nothing, in either direction
+    other = LatencySketch()
+    other.add(1.0)
+    assert other.merge(LatencySketch()).to_dict()["count"] == 1
+    assert sketch.merge(other).quantile(0.5) == 1.0
+
+
+def test_sketch_rejects_invalid_input():
+    with pytest.raises(ValueError):
+        LatencySketch().add(-1.0)
+    with pytest.raises(ValueError):
+        LatencySketch().quantile(1.5)
+    with pytest.raises(ValueError):
+        LatencySketch().merge(LatencySketch(relative_accuracy=0.02))
+
+
+def test_rollup_accumulators_merge():
+    first = RollupAccumulator()
+    first.add(1.0, failed=False, llm_calls=2, llm_tokens=100, tool_calls=1)
+    first.add(None, failed=True, llm_calls=None, llm_tokens=None, tool_calls=None)
+    second = RollupAccumulator()
+    second.add(3.0, failed=False, llm_calls=1, llm_tokens=50, tool_calls=4)
+
+    # Stored rows come back through JSONB, so rebuild one from its dict form
+    row = SimpleNamespace(
+        duration_sketch=json.loads(json.dumps(second.sketch.to_dict())),
+        task_count=second.task_count,
+        failure_count=second.failure_count,
+        llm_calls_total=second.llm_calls_total,
+        llm_tokens_total=second.llm_tokens_total,
+        tool_calls_total=second.tool_calls_total,
+    )
+    summary = first.merge(RollupAccumulator.from_row(row)).summary()
+    assert summary["task_count"] == 3
+    assert summary["failure_count"] == 1
+    assert summary["failure_rate"] == pytest.approx(1 / 3)
+    assert summary["llm_calls_total"] == 3
+    assert summary["llm_tokens_total"] == 150
+    assert summary["tool_calls_total"] == 5
+    # The failed task had no duration, so only 1.0 and 3.0 are in the sketch
+    for key, q in [("duration_p50", 0.5), ("duration_p99", 0.99)]:
+        assert summary[key] == pytest.approx(exact_quantile([1.0, 3.0], q), rel=DEFAULT_RELATIVE_ACCURACY)
+    assert first.sketch.max == 3.0
+
+
+def test_empty_rollup_summary():
+    summary = RollupAccumulator().summary()
+    assert summary["task_count"] == 0
+    assert summary["failure_rate"] == 0.0
+    assert summary["duration_p95"] is None
@@ -0,0 +1,113 @@
+"""
+Keyset cursor of the admin task listing
+"""
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+sys.path.insert(0, os.path.join(base_dir, '..', '..', 'packages', 'shared-utils'))
+
+from app.auth import get_current_user
+from app.database import get_async_db
+from app.routers.admin import decode_task_cursor, encode_task_cursor, router
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalar_one_or_none(self):
+        return self.rows[0] if self.rows else None
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Answers the admin check, and runs the task query's keyset over an in-memory list"""
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+
+    async def execute(self, query):
+        if "organization_members" in str(query):
+            return FakeResult([object()])
+        params = list(query.compile().params.values())
+        rows = sorted(self.tasks, key=lambda task: (task["created_at"], task["id"]), reverse=True)
+        if len(params) == 3:
+            # (created_at, id) < (cursor created_at, cursor id), then the limit
+            rows = [task for task in rows if (task["created_at"], task["id"]) < (params[0], params[1])]
+        return FakeResult(rows[:query._limit])
+
+
+def make_task(created_at):
+    return {
+        "id": uuid.uuid4(),
+        "agent_id": uuid.uuid4(),
+        "org_id": uuid.uuid4(),
+        "type": "report",
+        "status": "COMPLETED",
+        "error": None,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def client_for(tasks):
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_user] = lambda: type("User", (), {"id": uuid.uuid4()})()
+    app.dependency_overrides[get_async_db] = lambda: FakeSession(tasks)
+    return TestClient(app)
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    task_id = uuid.uuid4()
+    cursor = encode_task_cursor(created_at, task_id)
+    assert "=" not in cursor
+    assert decode_task_cursor(cursor) == (created_at, task_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    "e30",  # {} - valid JSON without the fields
+    encode_task_cursor(datetime.now(timezone.utc), uuid.uuid4())[:-4],  # truncated
+])
+def test_invalid_cursor_is_rejected(cursor):
+    response = client_for([]).get("/admin/tasks", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_pages_break_ties_on_id():
+    now = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    # Several tasks share each created_at, so pages split inside a tie
+    tasks = [make_task(now - timedelta(seconds=i // 4)) for i in range(11)]
+    client = client_for(tasks)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/admin/tasks", params=params)
+        assert response.status_code == 200
+        seen.extend(task["id"] for task in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    expected = sorted(tasks, key=lambda task: (task["created_at"], task["id"]), reverse=True)
+    assert seen == [str(task["id"]) for task in expected]
@@ -0,0 +1,91 @@
+"""
+Declarative aggregation of tabular data on the local agent
+Lets a tool return a small summary table instead of every row
+"""
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+AGGREGATE_OPS = ("count", "sum", "mean", "min", "max", "median", "nunique", "percentile")
+
+
+def _metric_name(metric: Dict[str, Any]) -> str:
+    if metric.get("as"):
+        return metric["as"]
+    op = metric["op"]
+    column = metric.get("column")
+    if column is None:
+        return op
+    if op == "percentile":
+        return f"{column}_p{round(float(metric['q']) * 100, 2):g}"
+    return f"{column}_{op}"
+
+
+def validate_spec(group_by: Any, metrics: Any) -> None:
+    if group_by is not None and (not isinstance(group_by, list) or not all(isinstance(c, str) for c in group_by)):
+        raise ValueError("group_by must be a list of column names")
+    if not isinstance(metrics, list) or not metrics:
+        raise ValueError("metrics must be a non-empty list")
+    for metric in metrics:
+        if not isinstance(metric, dict) or metric.get("op") not in AGGREGATE_OPS:
+            raise ValueError(f"Each metric needs an op in {', '.join(AGGREGATE_OPS)}")
+        if metric["op"] != "count" and not metric.get("column"):
+            raise ValueError(f"Metric {metric['op']} needs a column")
+        if metric["op"] == "percentile":
+            q = metric.get("q")
+            if not isinstance(q, (int, float)) or not 0 <= q <= 1:
+                raise ValueError("percentile needs q between 0 and 1")
+
+
+def metric_columns(group_by: Optional[List[str]], metrics: List[Dict[str, Any]]) -> List[str]:
+    """Columns the aggregation reads, for projection"""
+    columns = list(group_by or [])
+    columns += [metric["column"] for metric in metrics if metric.get("column")]
+    return list(dict.fromkeys(columns))
+
+
+def _apply(target, metric: Dict[str, Any]):
+    """Run one metric on a DataFrame or a GroupBy"""
+    op = metric["op"]
+    column = metric.get("column")
+    if column is None:
+        # Row count (per group when grouped)
+        return target.size() if hasattr(target, "size") and callable(target.size) else len(target)
+    values = target[column]
+    if op == "percentile":
+        return values.quantile(float(metric["q"]))
+    return getattr(values, op)()
+
+
+def aggregate(
+    df: pd.DataFrame,
+    group_by: Optional[List[str]],
+    metrics: List[Dict[str, Any]],
+    order_by: Optional[str] = None,
+    descending: bool = True,
+    top_n: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Aggregate df and return the result rows as plain Python values"""
+    validate_spec(group_by, metrics)
+    names = [_metric_name(metric) for metric in metrics]
+
+    if group_by:
+        grouped = df.groupby(group_by, dropna=False, sort=False)
+        result = pd.concat(
+            [_apply(grouped, metric).rename(name) for metric, name in zip(metrics, names)],
+            axis=1
+        ).reset_index()
+    else:
+        result = pd.DataFrame([{name: _apply(df, metric) for metric, name in zip(metrics, names)}])
+
+    if top_n is not None or order_by is not None:
+        order_by = order_by or names[0]
+        if order_by not in result.columns:
+            raise ValueError(f"Unknown order_by column: {order_by}")
+        result = result.sort_values(order_by, ascending=not descending, kind="stable")
+        if top_n is not None:
+            result = result.head(int(top_n))
+
+    # Through Arrow so numpy scalars become JSON-friendly Python values
+    return pa.Table.from_pandas(result, preserve_index=False).to_pylist()
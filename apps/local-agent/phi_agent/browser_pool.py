@@ -0,0 +1,190 @@
+"""
+Pool of warm Playwright browser contexts for WebTool
+One Chromium process serves every web task; each task leases its own context and
+page, so exports run in parallel without sharing navigation state
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from playwright.async_api import Browser, BrowserContext, Page, async_playwright
+
+HEALTH_CHECK_TIMEOUT_SECONDS = 5.0
+
+
+@dataclass
+class PooledContext:
+    context: BrowserContext
+    page: Page
+    # Contexts are only reused for leases with the same key (e.g. site and user),
+    # so cookies never leak between sessions
+    key: Optional[str] = None
+    uses: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    released_at: float = field(default_factory=time.monotonic)
+
+
+class BrowserContextPool:
+    """Leases of (context, page) pairs from a shared browser
+
+    At most size contexts exist at once. A context is health-checked before it
+    is handed out, recycled after max_uses leases, and closed after sitting
+    idle for idle_timeout seconds; the browser itself is closed once nothing
+    is left open.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_uses: int = 50,
+        idle_timeout: float = 300.0,
+        headless: bool = True,
+        context_options: Optional[Dict[str, Any]] = None
+    ):
+        if size < 1:
+            raise ValueError("Browser pool size must be at least 1")
+        self.size = size
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self.headless = headless
+        self.context_options = context_options or {}
+        self._playwright = None
+        self._browser: Optional[Browser] = None
+        self._idle: List[PooledContext] = []
+        self._open = 0
+        self._slots = asyncio.Semaphore(size)
+        self._lock = asyncio.Lock()
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def _ensure_browser(self) -> Browser:
+        async with self._lock:
+            if self._browser is not None and not self._browser.is_connected():
+                # Chromium crashed or was killed; idle contexts went with it, leased
+                # ones are given up when their tasks fail
+                self._open -= len(self._idle)
+                self._idle = []
+                self._browser = None
+            if self._browser is None:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            if self._reaper is None or self._reaper.done():
+                self._reaper = asyncio.create_task(self._reap_idle())
+            return self._browser
+
+    async def _create(self, key: Optional[str], options: Optional[Dict[str, Any]]) -> PooledContext:
+        # Counted up front so the idle reaper never closes the browser under us
+        self._open += 1
+        try:
+            browser = await self._ensure_browser()
+            context = await browser.new_context(**{**self.context_options, **(options or {})})
+        except BaseException:
+            self._open -= 1
+            raise
+        try:
+            page = await context.new_page()
+        except BaseException:
+            self._open -= 1
+            await context.close()
+            raise
+        return PooledContext(context=context, page=page, key=key)
+
+    async def _discard(self, pooled: PooledContext) -> None:
+        self._open -= 1
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass  # Already gone with the browser
+
+    async def _healthy(self, pooled: PooledContext) -> bool:
+        if self._browser is None or not self._browser.is_connected() or pooled.page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(pooled.page.evaluate("1"), timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+            return True
+        except Exception:
+            return False
+
+    async def _acquire(self, key: Optional[str], options: Optional[Dict[str, Any]]) -> PooledContext:
+        # Prefer a warm context for the same key; an idle context for another key
+        # is closed to make room when the pool is full
+        for pooled in list(self._idle):
+            if pooled.key != key:
+                continue
+            self._idle.remove(pooled)
+            if await self._healthy(pooled):
+                return pooled
+            await self._discard(pooled)
+        if self._open >= self.size and self._idle:
+            await self._discard(self._idle.pop(0))
+        return await self._create(key, options)
+
+    @asynccontextmanager
+    async def lease(
+        self,
+        key: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[PooledContext]:
+        """Lease a context and page for the duration of a task
+
+        options are extra new_context() arguments, used only when a new context
+        has to be created for key. A lease that raises gives its context up
+        instead of returning a page in an unknown state.
+        """
+        async with self._slots:
+            pooled = await self._acquire(key, options)
+            try:
+                yield pooled
+            except BaseException:
+                await self._discard(pooled)
+                raise
+            pooled.uses += 1
+            pooled.released_at = time.monotonic()
+            if pooled.uses >= self.max_uses:
+                await self._discard(pooled)
+            else:
+                self._idle.append(pooled)
+
+    async def _reap_idle(self) -> None:
+        interval = max(min(self.idle_timeout / 2, 60.0), 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            expired = [pooled for pooled in self._idle if now - pooled.released_at >= self.idle_timeout]
+            for pooled in expired:
+                self._idle.remove(pooled)
+                await self._discard(pooled)
+            if self._open == 0 and self._browser is not None:
+                # Nothing leased or idle: let Chromium go until the next task
+                async with self._lock:
+                    if self._open == 0:
+                        await self._close_browser()
+                        return
+
+    async def _close_browser(self) -> None:
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": self.size, "open": self._open, "idle": len(self._idle)}
+
+    async def close(self) -> None:
+        """Close every idle context and the browser; leased pages are closed with it"""
+        if self._reaper is not None and self._reaper is not asyncio.current_task():
+            self._reaper.cancel()
+        self._reaper = None
+        idle, self._idle = self._idle, []
+        for pooled in idle:
+            await self._discard(pooled)
+        async with self._lock:
+            await self._close_browser()
+        self._open = 0
@@ -0,0 +1,136 @@
+"""
+In-process TTL cache for tool results
+Bounded by the approximate encoded size of the cached values and evicted
+least-recently-used first. Concurrent misses for the same key share one load.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Single-quoted SQL literals ('' escapes a quote); their contents are never normalized
+_SQL_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace outside string literals and drop a trailing semicolon"""
+    parts = []
+    position = 0
+    for match in _SQL_LITERAL.finditer(query):
+        parts.append(_WHITESPACE.sub(" ", query[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_WHITESPACE.sub(" ", query[position:]))
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def cache_key(query: str, params: Optional[Dict[str, Any]] = None, namespace: str = "") -> str:
+    encoded = json.dumps(
+        {"ns": namespace, "sql": normalize_sql(query), "params": params or {}},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def estimate_size(value: Any) -> int:
+    return len(json.dumps(value, default=str))
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int, default_ttl: float):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # key -> (value, expires_at, size), least recently used first
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        if key in self._entries:
+            self._remove(key)
+        if ttl <= 0:
+            return
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            # Never worth evicting everything else for one oversized result
+            return
+        self._entries[key] = (value, time.monotonic() + ttl, size)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        bypass: bool = False
+    ) -> Any:
+        """Return a fresh cached value, or load (once for concurrent callers) and cache it
+
+        bypass skips the lookup but still refreshes the cache with the new value.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if not bypass:
+            hit, value = self.get(key)
+            if hit:
+                self.hits += 1
+                return value
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.hits += 1
+                return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Waiters must not be cancelled along with this caller
+            future.set_exception(RuntimeError("Shared query was cancelled"))
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            self.put(key, value, ttl)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            # Mark the exception retrieved when nobody else was waiting
+            if future.done() and not future.cancelled():
+                future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,5 +1,6 @@
+import json
 import httpx
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from phi_agent.config import Settings
 
 settings = Settings()
@@ -21,9 +22,10 @@ class OrchestratorClient:
         org_id: str,
         name: str,
         capabilities: Dict[str, Any],
-        status: str = "ACTIVE"
+        status: str = "ACTIVE",
+        load: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Register or update local agent heartbeat"""
+        """Register or update local agent heartbeat (load feeds orchestrator routing)"""
         response = await self.client.post(
             "/local-agents/heartbeat",
             json={
@@ -32,16 +34,18 @@ class OrchestratorClient:
                 "org_id": org_id,
                 "name": name,
                 "capabilities": capabilities,
-                "status": status
+                "status": status,
+                "load": load
             }
         )
         response.raise_for_status()
         return response.json()
 
-    async def get_pending_tasks(self, local_agent_id: str) -> Dict[str, Any]:
-        """Get pending tool tasks for this local agent"""
+    async def get_pending_tasks(self, local_agent_id: str, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Claim up to limit pending tool tasks for this local agent"""
         response = await self.client.get(
-            f"/local-agents/{local_agent_id}/pending-tasks"
+            f"/local-agents/{local_agent_id}/pending-tasks",
+            params={"limit": limit} if limit else None
         )
         response.raise_for_status()
         return response.json()
@@ -52,22 +56,61 @@ class OrchestratorClient:
         step_id: str,
         tool_name: str,
         result: Any,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        task_tool_id: Optional[str] = None,
+        chunk_count: Optional[int] = None,
+        local_agent_id: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Send tool execution result back to orchestrator"""
+        """Send tool execution result back to orchestrator
+        
+        chunk_count marks the end of a streamed result sent with send_tool_chunk.
+        local_agent_id identifies the sender; results for a tool task that was
+        failed over to another agent are rejected.
+        """
         response = await self.client.post(
             "/tool-callbacks",
             json={
                 "task_id": task_id,
+                "task_tool_id": task_tool_id,
                 "step_id": step_id,
                 "tool_name": tool_name,
                 "result": result,
-                "error": error
+                "error": error,
+                "chunk_count": chunk_count,
+                "local_agent_id": local_agent_id
             }
         )
         response.raise_for_status()
         return response.json()
 
+    async def send_tool_chunk(
+        self,
+        task_id: str,
+        task_tool_id: str,
+        seq: int,
+        rows: List[Any],
+        local_agent_id: str
+    ) -> Dict[str, Any]:
+        """Send one sequenced chunk of a streamed tool result"""
+        # default=str covers dates and decimals coming straight from the database
+        body = json.dumps(
+            {
+                "task_id": task_id,
+                "task_tool_id": task_tool_id,
+                "local_agent_id": local_agent_id,
+                "seq": seq,
+                "rows": rows
+            },
+            default=str
+        )
+        response = await self.client.post(
+            "/tool-callbacks/chunks",
+            content=body,
+            headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+        return response.json()
+
     async def close(self):
         await self.client.aclose()
 
@@ -41,6 +41,20 @@ class LocalDBConfig(BaseModel):
     database: Optional[str] = None
     username: Optional[str] = None
     password: Optional[str] = None
+    # Threads (and pooled connections) running queries off the event loop
+    max_workers: Optional[int] = None
+    # Queries running longer are cancelled on the server with pg_cancel_backend
+    query_timeout_seconds: Optional[float] = None
+    # Read results are reused for this long unless the payload sets cache_ttl (0 disables)
+    cache_ttl_seconds: Optional[float] = None
+    cache_max_bytes: Optional[int] = None
+    # Governance: results beyond either cap are truncated and flagged
+    max_rows: Optional[int] = None
+    max_bytes: Optional[int] = None
+    # Run every query in a read-only transaction; set false for payloads that write
+    read_only: bool = True
+    # Reads (SELECT, or WITH ... SELECT) go here when set
+    replica_dsn: Optional[str] = None
 
 
 class LocalFileConfig(BaseModel):
@@ -48,12 +62,51 @@ class LocalFileConfig(BaseModel):
     reports: Optional[str] = None
     exports: Optional[str] = None
     base_path: Optional[str] = None
+    # Parquet sidecars of parsed CSV/Excel files (default ~/.cache/phi-agent/files, 1 GB)
+    cache_enabled: bool = True
+    cache_dir: Optional[str] = None
+    cache_max_bytes: Optional[int] = None
+    # file_sql tool: table name -> file glob under the roots, e.g. orders: "exports/orders_*.csv"
+    tables: Dict[str, str] = Field(default_factory=dict)
+    sql_threads: Optional[int] = None
+
+
+class LocalWebConfig(BaseModel):
+    """Browser pool for the web tool"""
+    # Warm contexts sharing one Chromium; defaults to the web concurrency limit
+    pool_size: Optional[int] = None
+    # Contexts are recycled after this many tasks and closed after idling this long
+    max_uses_per_context: int = 50
+    idle_timeout_seconds: float = 300.0
+    headless: bool = True
+    # Skip images/fonts/analytics, wait on selectors instead of networkidle, fetch downloads directly
+    fast_mode: bool = False
+    # Saved logins (storage_state per site and username), encrypted with WEB_STATE_KEY
+    reuse_sessions: bool = True
+    session_dir: Optional[str] = None
+    session_max_age_seconds: Optional[float] = None
+    # Generated key when WEB_STATE_KEY is unset (default ~/.config/phi-agent/web-state.key)
+    state_key_path: Optional[str] = None
+
+
+class ConcurrencyConfig(BaseModel):
+    """Tool execution limits for the worker"""
+    max_concurrent: int = 8
+    # Per-tool limits; tools not listed use default_tool_limit
+    per_tool: Dict[str, int] = Field(default_factory=lambda: {"db": 8, "file": 4, "web": 2, "dashboard": 1})
+    default_tool_limit: int = 2
+    # Tasks claimed but not yet started; polling pauses while the queue is full
+    queue_size: int = 32
+    # On shutdown, wait this long for queued and running tools to finish
+    drain_timeout_seconds: float = 60.0
 
 
 class LocalConfig(BaseModel):
     """Local agent configuration"""
     db: Optional[LocalDBConfig] = None
     file_roots: Optional[LocalFileConfig] = None
+    web: LocalWebConfig = Field(default_factory=LocalWebConfig)
+    concurrency: ConcurrencyConfig = Field(default_factory=ConcurrencyConfig)
 
 
 class AgentConfig(BaseModel):
@@ -75,7 +128,10 @@ class Settings(BaseSettings):
     orchestrator_url: str = "http://localhost:8001"
     core_api_url: str = "http://localhost:8000"
     db_dsn: Optional[str] = None
+    db_replica_dsn: Optional[str] = None
     file_base_path: Optional[str] = None
+    # Fernet key for saved web sessions; generated at local.web.state_key_path when unset
+    web_state_key: Optional[str] = None
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,138 @@
+"""
+Compact columnar encoding for tabular tool results
+A list of row dicts becomes one schema plus one array per column, so column
+names are sent once and numbers stay numbers; repetitive text columns (SKUs,
+statuses, dates) are dictionary-encoded. Only used when the orchestrator
+advertises support for it in its heartbeat response.
+"""
+import math
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+COLUMNAR_V1 = "columnar/v1"
+SUPPORTED_ENCODINGS = (COLUMNAR_V1,)
+# Text columns with at most this share of distinct values are dictionary-encoded
+DICTIONARY_MAX_DISTINCT_RATIO = 0.5
+_TEXT_TYPES = ("string", "decimal", "timestamp", "date")
+
+
+def is_tabular(value: Any) -> bool:
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(row, dict) for row in value)
+
+
+def _column_type(values: List[Any]) -> str:
+    for value in values:
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        if isinstance(value, bool):
+            return "bool"
+        if isinstance(value, int):
+            return "int"
+        if isinstance(value, float):
+            return "float"
+        if isinstance(value, Decimal):
+            return "decimal"
+        if isinstance(value, datetime):
+            return "timestamp"
+        if isinstance(value, date):
+            return "date"
+        if isinstance(value, (dict, list)):
+            return "json"
+        return "string"
+    return "null"
+
+
+def _convert(value: Any, column_type: str) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        # pandas uses NaN for missing values; JSON has no NaN
+        return None
+    if column_type in ("bool", "int", "float", "json"):
+        return value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    # Decimals keep their exact digits as text
+    return str(value)
+
+
+def _dictionary_encode(values: List[Any]) -> Optional[Tuple[List[Any], List[Optional[int]]]]:
+    """Return (dictionary, codes) if it pays off; None codes stay None"""
+    dictionary: Dict[Any, int] = {}
+    codes: List[Optional[int]] = []
+    limit = len(values) * DICTIONARY_MAX_DISTINCT_RATIO
+    for value in values:
+        if value is None:
+            codes.append(None)
+            continue
+        code = dictionary.setdefault(value, len(dictionary))
+        if len(dictionary) > limit:
+            return None
+        codes.append(code)
+    return list(dictionary), codes
+
+
+def encode_columnar(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Encode row dicts as {"encoding", "columns", "data", "row_count"}
+
+    A column entry with a "dictionary" holds integer codes into it in data.
+    """
+    names: Dict[str, None] = {}
+    for row in rows:
+        for name in row:
+            names.setdefault(name, None)
+
+    columns = []
+    data = []
+    for name in names:
+        values = [row.get(name) for row in rows]
+        column_type = _column_type(values)
+        converted = [_convert(value, column_type) for value in values]
+        column = {"name": name, "type": column_type}
+        encoded = _dictionary_encode(converted) if column_type in _TEXT_TYPES else None
+        if encoded is not None:
+            column["dictionary"], converted = encoded
+        columns.append(column)
+        data.append(converted)
+
+    return {
+        "encoding": COLUMNAR_V1,
+        "columns": columns,
+        "data": data,
+        "row_count": len(rows),
+    }
+
+
+def negotiate(accepted: Optional[List[str]]) -> Optional[str]:
+    """Pick the first encoding both sides support, or None for plain rows"""
+    for encoding in accepted or []:
+        if encoding in SUPPORTED_ENCODINGS:
+            return encoding
+    return None
+
+
+def _is_truncated(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("truncated") is True and is_tabular(value.get("rows"))
+
+
+def _encode_value(value: Any) -> Any:
+    if is_tabular(value):
+        return encode_columnar(value)
+    if _is_truncated(value):
+        return {**value, "rows": encode_columnar(value["rows"])}
+    return value
+
+
+def encode_result(result: Any, encoding: Optional[str]) -> Any:
+    """Encode a tabular result with the negotiated encoding; anything else is sent as-is
+
+    Truncated results ({"rows": [...], "truncated": true, ...}) have their rows
+    encoded, and keyed results (batched statements) have each table encoded.
+    """
+    if encoding != COLUMNAR_V1:
+        return result
+    encoded = _encode_value(result)
+    if encoded is result and isinstance(result, dict):
+        return {key: _encode_value(value) for key, value in result.items()}
+    return encoded
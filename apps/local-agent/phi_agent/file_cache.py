@@ -0,0 +1,82 @@
+"""
+Parquet sidecar cache for parsed CSV and Excel files
+A file is converted to Parquet once per (path, size, mtime); later reads open
+the sidecar memory-mapped instead of reparsing. Disk use is bounded and the
+least recently read sidecars are evicted first.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import pyarrow as pa
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "phi-agent", "files")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+class ParquetSidecarCache:
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes or DEFAULT_MAX_BYTES
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _sidecar_path(self, source: Path) -> str:
+        stat = source.stat()
+        identity = f"{source.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+        return os.path.join(self.cache_dir, hashlib.sha256(identity.encode("utf-8")).hexdigest() + ".parquet")
+
+    def get(self, source: Path, build: Callable[[str], None]) -> Optional[str]:
+        """Return the sidecar for source, building it with build(tmp_path) on a miss
+
+        Returns None when the file cannot be represented as Parquet (e.g. a
+        column mixing numbers and text), in which case callers read the source.
+        """
+        path = self._sidecar_path(source)
+        if os.path.exists(path):
+            # mtime doubles as the LRU clock
+            os.utime(path)
+            self.hits += 1
+            return path
+
+        self.misses += 1
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            build(tmp_path)
+            os.replace(tmp_path, path)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            return None
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str) -> None:
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".parquet"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+            total = sum(size for _, _, size in entries)
+            for _, path, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    # Readers holding a memory map keep their view on POSIX
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
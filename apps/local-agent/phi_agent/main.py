@@ -1,4 +1,5 @@
 import asyncio
+import signal
 import click
 from phi_agent.config import load_config, AgentConfig
 from phi_agent.client import OrchestratorClient
@@ -39,6 +40,8 @@ async def main(config: AgentConfig, poll_interval: int):
         
         # Start worker
         worker = Worker(config, client, local_agent_id)
+        registry.load_provider = worker.load_report
+        worker.encodings_provider = lambda: registry.result_encodings
         print("Starting worker...")
         
         # Start heartbeat in background
@@ -50,11 +53,17 @@ async def main(config: AgentConfig, poll_interval: int):
                 except Exception as e:
                     print(f"Heartbeat error: {e}")
         
-        # Run worker and heartbeat concurrently
-        await asyncio.gather(
-            worker.run(poll_interval),
-            heartbeat_loop()
-        )
+        # Stop polling on SIGINT/SIGTERM and let in-flight tools finish
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        
+        # Keep heartbeating while the worker runs and drains
+        heartbeat_task = asyncio.create_task(heartbeat_loop())
+        try:
+            await worker.run(poll_interval)
+        finally:
+            heartbeat_task.cancel()
     except KeyboardInterrupt:
         print("\nShutting down...")
     finally:
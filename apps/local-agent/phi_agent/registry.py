@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List
 from phi_agent.config import AgentConfig
 from phi_agent.client import OrchestratorClient
 
@@ -10,6 +10,10 @@ class LocalAgentRegistry:
         self.config = config
         self.client = client
         self.local_agent_id: Optional[str] = None
+        # Returns the current load report (set once the worker exists)
+        self.load_provider: Optional[Callable[[], Dict[str, Any]]] = None
+        # Result encodings the orchestrator accepts, from its heartbeat response
+        self.result_encodings: List[str] = []
     
     async def register(self) -> str:
         """Register local agent and return local_agent_id"""
@@ -27,6 +31,7 @@ class LocalAgentRegistry:
         )
         
         self.local_agent_id = result.get("id")
+        self.result_encodings = result.get("result_encodings") or []
         return self.local_agent_id
     
     async def heartbeat(self):
@@ -39,13 +44,15 @@ class LocalAgentRegistry:
             "tools": [tool.key for tool in self.config.tools]
         }
         
-        await self.client.heartbeat(
+        result = await self.client.heartbeat(
             local_agent_id=self.local_agent_id,
             agent_id=self.config.agent_id,
             org_id=self.config.org_id,
             name=self.config.name,
             capabilities=capabilities,
-            status="ACTIVE"
+            status="ACTIVE",
+            load=self.load_provider() if self.load_provider else None
         )
+        self.result_encodings = result.get("result_encodings") or []
 
 
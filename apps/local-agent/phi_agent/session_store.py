@@ -0,0 +1,94 @@
+"""
+Encrypted Playwright storage_state per (site, username)
+WebTool saves the cookies and local storage of a logged-in context so later
+exports can skip the login form. States are Fernet-encrypted at rest and
+expire after max_age seconds.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+DEFAULT_SESSION_DIR = os.path.join(os.path.expanduser("~"), ".local", "state", "phi-agent", "web-sessions")
+# Kept apart from the states it decrypts, so a copy of the session directory alone is useless
+DEFAULT_KEY_PATH = os.path.join(os.path.expanduser("~"), ".config", "phi-agent", "web-state.key")
+DEFAULT_MAX_AGE_SECONDS = 12 * 3600
+
+
+def _write_private(path: str, data: bytes) -> None:
+    """Write data to path atomically, readable by the owner only"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class SessionStore:
+    """Encrypted storage_state files, one per (site, username)
+
+    The key comes from key (a Fernet key, e.g. the WEB_STATE_KEY environment
+    variable); without one, a key is generated once at key_path, readable by
+    the owner only. key_path must lie outside the session directory.
+    """
+
+    def __init__(
+        self,
+        session_dir: Optional[str] = None,
+        key: Optional[str] = None,
+        max_age: Optional[float] = None,
+        key_path: Optional[str] = None
+    ):
+        self.session_dir = session_dir or DEFAULT_SESSION_DIR
+        self.max_age = max_age or DEFAULT_MAX_AGE_SECONDS
+        self._fernet = Fernet(key.encode("utf-8") if key else self._local_key(key_path or DEFAULT_KEY_PATH))
+
+    def _local_key(self, key_path: str) -> bytes:
+        session_dir = os.path.realpath(self.session_dir)
+        if os.path.commonpath([session_dir, os.path.realpath(key_path)]) == session_dir:
+            raise ValueError("The web session key must not be stored in the session directory")
+        if os.path.exists(key_path):
+            with open(key_path, "rb") as f:
+                return f.read().strip()
+        key = Fernet.generate_key()
+        _write_private(key_path, key)
+        return key
+
+    def _path(self, site: str, username: str) -> str:
+        identity = f"{site.lower()}\0{username}"
+        return os.path.join(self.session_dir, hashlib.sha256(identity.encode("utf-8")).hexdigest() + ".state")
+
+    def load(self, site: str, username: str) -> Optional[Dict[str, Any]]:
+        """Saved storage_state, or None if missing, expired or unreadable"""
+        path = self._path(site, username)
+        try:
+            with open(path, "rb") as f:
+                token = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            return json.loads(self._fernet.decrypt(token, ttl=int(self.max_age)))
+        except (InvalidToken, ValueError):
+            # Expired, written with another key, or corrupt: log in afresh
+            self.invalidate(site, username)
+            return None
+
+    def save(self, site: str, username: str, state: Dict[str, Any]) -> None:
+        token = self._fernet.encrypt(json.dumps(state).encode("utf-8"))
+        _write_private(self._path(site, username), token)
+
+    def invalidate(self, site: str, username: str) -> None:
+        try:
+            os.unlink(self._path(site, username))
+        except FileNotFoundError:
+            pass
@@ -1,9 +1,10 @@
 from .base import BaseTool
 from .db import DBTool
 from .file import FileTool
+from .file_sql import FileSQLTool
 from .web import WebTool
 from .dashboard import DashboardTool
 
-__all__ = ["BaseTool", "DBTool", "FileTool", "WebTool", "DashboardTool"]
+__all__ = ["BaseTool", "DBTool", "FileTool", "FileSQLTool", "WebTool", "DashboardTool"]
 
 
@@ -1,19 +1,171 @@
+import asyncio
+import concurrent.futures
+import json
 import os
-from typing import Any, Dict
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import NullPool
 from phi_agent.tools.base import BaseTool
+from phi_agent.cache import ResultCache, cache_key
 from phi_agent.config import Settings
 
 settings = Settings()
 
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_QUERY_TIMEOUT_SECONDS = 300.0
+DEFAULT_MAX_ROWS = 100_000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Rows fetched per round trip while enforcing the row and byte caps
+FETCH_BATCH_ROWS = 1000
+# Rows per chunk in streaming mode
+DEFAULT_CHUNK_ROWS = 5000
+# Chunks read ahead of the uploader before the cursor pauses
+STREAM_READ_AHEAD = 2
+DEFAULT_CACHE_TTL_SECONDS = 60.0
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+APPLICATION_NAME = "phi-agent"
+MAX_BATCH_STATEMENTS = 50
+
+# Only plain reads are cached or sent to the replica
+_SQL_TOKEN = re.compile(
+    r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(\$\w*\$).*?\1|([()])|([A-Za-z_]\w*)",
+    re.DOTALL
+)
+_WRITE_KEYWORDS = {"insert", "update", "delete", "merge", "into"}
+# FOR UPDATE / NO KEY UPDATE / SHARE / KEY SHARE take row locks
+_LOCK_STRENGTHS = {"update", "share", "no", "key"}
+
+_END_OF_STREAM = object()
+
+# One tuned pool per DSN, shared by every tool in the process
+_engines: Dict[str, Tuple[Engine, Engine]] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engines(dsn: str, pool_size: int) -> Tuple[Engine, Engine]:
+    """Return (pooled engine, unpooled cancel engine) for dsn, creating them once"""
+    with _engines_lock:
+        engines = _engines.get(dsn)
+        if engines is None:
+            connect_args = {"application_name": APPLICATION_NAME}
+            engine = create_engine(
+                dsn,
+                # One pooled connection per worker thread; never more than that
+                pool_size=pool_size,
+                max_overflow=0,
+                pool_timeout=30,
+                pool_recycle=1800,
+                pool_pre_ping=True,
+                connect_args=connect_args
+            )
+            # Cancels go over their own connection so they never wait behind a busy pool
+            cancel_engine = create_engine(dsn, poolclass=NullPool, connect_args=connect_args)
+            engines = _engines[dsn] = (engine, cancel_engine)
+        return engines
+
+
+def dispose_engines() -> None:
+    with _engines_lock:
+        for engine, cancel_engine in _engines.values():
+            engine.dispose()
+            cancel_engine.dispose()
+        _engines.clear()
+
+
+def _is_read(query: str) -> bool:
+    """Whether query is a plain read, judged by its top-level statement keyword
+    
+    A leading WITH is looked through: WITH ... SELECT is a read, but WITH ...
+    UPDATE/DELETE/INSERT and CTEs that modify data (WITH x AS (DELETE ...))
+    are not. SELECT ... INTO creates a table, and locking clauses (FOR UPDATE,
+    FOR SHARE, ...) need the primary and lose their meaning when cached, so
+    neither is a read.
+    Comments, string literals and quoted identifiers are skipped.
+    """
+    depth = 0
+    words = []  # (paren depth, lowercased keyword, follows an opening paren)
+    after_paren = False
+    for match in _SQL_TOKEN.finditer(query):
+        paren, word = match.group(2), match.group(3)
+        if paren == "(":
+            depth += 1
+            after_paren = True
+        elif paren == ")":
+            depth -= 1
+            after_paren = False
+        elif word:
+            words.append((depth, word.lower(), after_paren))
+            after_paren = False
+        elif not match.group(0).startswith(("--", "/*")):
+            after_paren = False
+    if not words or words[0][0] != 0 or words[0][1] not in ("select", "with"):
+        return False
+    if words[0][1] == "with":
+        # The first word of each CTE body says whether that CTE writes
+        if any(depth == 1 and first and word in _WRITE_KEYWORDS for depth, word, first in words):
+            return False
+        statement = next(
+            (word for depth, word, _ in words[1:] if depth == 0 and (word == "select" or word in _WRITE_KEYWORDS)),
+            None
+        )
+        if statement != "select":
+            return False
+    if any(depth == 0 and word == "into" for depth, word, _ in words):
+        return False
+    # Locks taken in subqueries and CTEs count too
+    return not any(
+        word == "for" and following in _LOCK_STRENGTHS
+        for (_, word, _), (_, following, _) in zip(words, words[1:])
+    )
+
+
+def _row_bytes(row: Tuple) -> int:
+    # Cheap estimate of the encoded size; exact JSON encoding would double the cost
+    return sum(len(str(value)) for value in row) + 4 * len(row)
+
 
 class DBTool(BaseTool):
-    """Database tool for executing SQL queries"""
+    """Database tool for executing SQL queries
+    
+    Queries run on a bounded thread pool so the event loop (heartbeats,
+    polling) stays responsive. A query that times out or whose task is
+    cancelled is stopped on the server with pg_cancel_backend.
+    
+    Every query is governed: read-only transaction (unless disabled),
+    statement_timeout, and row/byte caps. A capped result comes back as
+    {"rows", "row_count", "truncated": true, "truncated_by"}. Reads go to the
+    replica when one is configured (payload use_primary forces the primary
+    and skips the cache lookup).
+    
+    Read results are cached by normalized SQL and params; payloads can set
+    cache_ttl (seconds, 0 disables) and cache_bypass (always hit the database).
+    
+    Instead of query, a payload may carry statements: a list of
+    {"name", "query", "params"} run on one connection in a single REPEATABLE
+    READ transaction, so every result comes from the same snapshot. The
+    result maps each name to its rows.
+    """
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.engine: Engine = None
+        self._cancel_engine: Engine = None
+        self.replica_engine: Optional[Engine] = None
+        self._replica_cancel_engine: Optional[Engine] = None
+        self.max_workers = int(self.config.get("max_workers") or DEFAULT_MAX_WORKERS)
+        self.query_timeout = float(self.config.get("query_timeout_seconds") or DEFAULT_QUERY_TIMEOUT_SECONDS)
+        self.max_rows = int(self.config.get("max_rows") or DEFAULT_MAX_ROWS)
+        self.max_bytes = int(self.config.get("max_bytes") or DEFAULT_MAX_BYTES)
+        self.read_only = bool(self.config.get("read_only", True))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db-tool")
+        self.cache = ResultCache(
+            max_bytes=int(self.config.get("cache_max_bytes") or DEFAULT_CACHE_MAX_BYTES),
+            default_ttl=float(self.config.get("cache_ttl_seconds", DEFAULT_CACHE_TTL_SECONDS))
+        )
         self._initialize_engine()
     
     def _initialize_engine(self):
@@ -29,28 +181,296 @@ class DBTool(BaseTool):
             password = self.config.get("password") or os.getenv("DB_PASSWORD", "postgres")
             dsn = f"postgresql://{username}:{password}@{host}:{port}/{database}"
         
-        self.engine = create_engine(dsn)
+        self.engine, self._cancel_engine = get_engines(dsn, self.max_workers)
+        replica_dsn = self.config.get("replica_dsn") or settings.db_replica_dsn
+        if replica_dsn:
+            self.replica_engine, self._replica_cancel_engine = get_engines(replica_dsn, self.max_workers)
+    
+    def _route(self, is_read: bool, payload: Dict[str, Any]) -> Tuple[Engine, Engine]:
+        """Pick (engine, cancel engine): reads go to the replica when there is one"""
+        if self.replica_engine is not None and is_read and not payload.get("use_primary"):
+            return self.replica_engine, self._replica_cancel_engine
+        return self.engine, self._cancel_engine
+    
+    def _begin(
+        self,
+        conn: Connection,
+        state: Dict[str, Any],
+        timeout: Optional[float],
+        snapshot: bool = False
+    ) -> None:
+        """Apply per-transaction governance and record the backend pid"""
+        # Must be the first statement of the transaction
+        modes = []
+        if snapshot:
+            modes.append("ISOLATION LEVEL REPEATABLE READ")
+        if self.read_only:
+            modes.append("READ ONLY")
+        if modes:
+            conn.execute(text(f"SET TRANSACTION {' '.join(modes)}"))
+        if timeout:
+            conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+        state["pid"] = conn.execute(text("SELECT pg_backend_pid()")).scalar()
+        if state.get("cancelled"):
+            raise RuntimeError("Query cancelled before it started")
+    
+    def _run_query(
+        self,
+        engine: Engine,
+        query: str,
+        params: Dict[str, Any],
+        limits: Tuple[int, int, float],
+        state: Dict[str, Any]
+    ) -> Any:
+        """Blocking part of execute; runs on the tool's thread pool"""
+        max_rows, max_bytes, timeout = limits
+        with engine.connect() as conn:
+            self._begin(conn, state, timeout)
+            value = self._fetch(conn, query, params, max_rows, max_bytes)
+            if not self.read_only:
+                conn.commit()
+        return value
+    
+    def _run_batch(
+        self,
+        engine: Engine,
+        statements: List[Dict[str, Any]],
+        limits: Tuple[int, int, float],
+        state: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Run named statements in one snapshot-consistent transaction"""
+        max_rows, max_bytes, timeout = limits
+        results: Dict[str, Any] = {}
+        with engine.connect() as conn:
+            self._begin(conn, state, timeout, snapshot=True)
+            for statement in statements:
+                results[statement["name"]] = self._fetch(
+                    conn, statement["query"], statement.get("params") or {}, max_rows, max_bytes
+                )
+            if not self.read_only:
+                conn.commit()
+        return results
+    
+    def _fetch(self, conn: Connection, query: str, params: Dict[str, Any], max_rows: int, max_bytes: int) -> Any:
+        """Execute one statement and collect its rows, stopping at the first cap reached"""
+        # Server-side cursor for reads so the caps stop fetching early
+        options = {"stream_results": True} if _is_read(query) else {}
+        result = conn.execution_options(**options).execute(text(query), params)
+        if not result.returns_rows:
+            return {"row_count": result.rowcount}
+        
+        # Convert to list of dicts
+        columns = list(result.keys())
+        rows = []
+        size = 0
+        truncated_by = None
+        while truncated_by is None:
+            batch = result.fetchmany(FETCH_BATCH_ROWS)
+            if not batch:
+                break
+            for row in batch:
+                if len(rows) >= max_rows:
+                    truncated_by = "max_rows"
+                    break
+                size += _row_bytes(row)
+                if size > max_bytes:
+                    truncated_by = "max_bytes"
+                    break
+                rows.append(dict(zip(columns, row)))
+        result.close()
+        
+        if truncated_by:
+            return {"rows": rows, "row_count": len(rows), "truncated": True, "truncated_by": truncated_by}
+        return rows
+    
+    def _stream_query(
+        self,
+        engine: Engine,
+        query: str,
+        params: Dict[str, Any],
+        chunk_rows: int,
+        state: Dict[str, Any],
+        queue: asyncio.Queue,
+        loop: asyncio.AbstractEventLoop
+    ) -> None:
+        """Read through a server-side cursor, handing chunks to the event loop
+        
+        Blocks while the queue is full, so a slow upload pauses the cursor
+        instead of buffering the result set.
+        """
+        def put(item):
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    return future.result(timeout=1.0)
+                except concurrent.futures.TimeoutError:
+                    if state.get("cancelled"):
+                        future.cancel()
+                        raise RuntimeError("Stream cancelled")
+        
+        try:
+            with engine.connect() as conn:
+                # Exports are long by design: read-only, but no statement_timeout
+                self._begin(conn, state, None)
+                result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(text(query), params)
+                columns = list(result.keys())
+                for rows in result.partitions():
+                    put([dict(zip(columns, row)) for row in rows])
+            put(_END_OF_STREAM)
+        except BaseException as e:
+            if not state.get("cancelled"):
+                put(e)
+    
+    async def stream(self, payload: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Execute SQL query and yield its rows in chunks of chunk_rows
+        
+        The timeout bounds the wait for each chunk rather than the whole
+        stream, so long exports keep going as long as rows keep arriving.
+        """
+        query = payload.get("query")
+        if not query:
+            raise ValueError("Query is required in payload")
+        timeout = float(payload.get("timeout_seconds") or self.query_timeout)
+        chunk_rows = int(payload.get("chunk_rows") or DEFAULT_CHUNK_ROWS)
+        engine, cancel_engine = self._route(_is_read(query), payload)
+        
+        loop = asyncio.get_running_loop()
+        state: Dict[str, Any] = {"cancel_engine": cancel_engine}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_READ_AHEAD)
+        producer = loop.run_in_executor(
+            self._executor, self._stream_query,
+            engine, query, payload.get("params") or {}, chunk_rows, state, queue, loop
+        )
+        finished = False
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"Query cancelled after {timeout}s without rows")
+                if item is _END_OF_STREAM:
+                    finished = True
+                    break
+                if isinstance(item, BaseException):
+                    finished = True
+                    raise item
+                yield item
+        finally:
+            if not finished:
+                # Consumer stopped early, timed out or was cancelled
+                await asyncio.to_thread(self._cancel_backend, state)
+            await asyncio.gather(producer, return_exceptions=True)
+    
+    def _cancel_backend(self, state: Dict[str, Any]) -> None:
+        state["cancelled"] = True
+        pid = state.get("pid")
+        if pid is None:
+            # Not connected yet; _begin sees the flag before executing
+            return
+        with state["cancel_engine"].connect() as conn:
+            conn.execute(text("SELECT pg_cancel_backend(:pid)"), {"pid": pid})
     
     async def execute(self, payload: Dict[str, Any]) -> Any:
-        """Execute SQL query and return results"""
+        """Execute SQL query (or a batch of named statements) and return results"""
+        if payload.get("statements") is not None:
+            return await self._execute_statements(payload)
         query = payload.get("query")
         if not query:
             raise ValueError("Query is required in payload")
+        params = payload.get("params") or {}
+        ttl: Optional[float] = payload.get("cache_ttl")
         
-        # Execute query
-        with self.engine.connect() as conn:
-            result = conn.execute(text(query))
-            
-            # Convert to list of dicts
-            columns = result.keys()
-            rows = []
-            for row in result:
-                rows.append(dict(zip(columns, row)))
+        if not _is_read(query) or ttl == 0:
+            return await self._execute_query(query, params, payload)
+        return await self.cache.get_or_load(
+            cache_key(query, params, namespace=self._limits_key(payload)),
+            lambda: self._execute_query(query, params, payload),
+            ttl=ttl,
+            bypass=self._cache_bypass(payload)
+        )
+    
+    async def _execute_statements(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        statements = payload["statements"]
+        if not isinstance(statements, list) or not statements:
+            raise ValueError("statements must be a non-empty list")
+        if len(statements) > MAX_BATCH_STATEMENTS:
+            raise ValueError(f"At most {MAX_BATCH_STATEMENTS} statements per batch")
+        names = set()
+        for statement in statements:
+            name = statement.get("name") if isinstance(statement, dict) else None
+            if not name or not statement.get("query"):
+                raise ValueError("Each statement needs a name and a query")
+            if name in names:
+                raise ValueError(f"Duplicate statement name: {name}")
+            names.add(name)
         
-        return rows
+        all_reads = all(_is_read(statement["query"]) for statement in statements)
+        ttl: Optional[float] = payload.get("cache_ttl")
+        if not all_reads or ttl == 0:
+            return await self._execute_batch(statements, payload, all_reads)
+        key_sql = json.dumps(
+            [[s["name"], s["query"], s.get("params") or {}] for s in statements],
+            sort_keys=True,
+            default=str
+        )
+        return await self.cache.get_or_load(
+            cache_key(key_sql, namespace=f"batch:{self._limits_key(payload)}"),
+            lambda: self._execute_batch(statements, payload, all_reads),
+            ttl=ttl,
+            bypass=self._cache_bypass(payload)
+        )
+    
+    async def _execute_batch(
+        self,
+        statements: List[Dict[str, Any]],
+        payload: Dict[str, Any],
+        all_reads: bool
+    ) -> Dict[str, Any]:
+        limits = self._limits(payload)
+        # Route the whole batch as one unit so it sees a single snapshot
+        engine, cancel_engine = self._route(all_reads, payload)
+        return await self._run_cancellable(self._run_batch, engine, cancel_engine, limits[2], statements, limits)
+    
+    def _cache_bypass(self, payload: Dict[str, Any]) -> bool:
+        # use_primary asks for read-after-write freshness, which a result cached
+        # from the replica cannot give; the primary's answer still refreshes the cache
+        return bool(payload.get("cache_bypass") or payload.get("use_primary"))
+    
+    def _limits(self, payload: Dict[str, Any]) -> Tuple[int, int, float]:
+        """Payloads may tighten the configured caps but never raise them"""
+        max_rows = min(int(payload.get("max_rows") or self.max_rows), self.max_rows)
+        max_bytes = min(int(payload.get("max_bytes") or self.max_bytes), self.max_bytes)
+        timeout = float(payload.get("timeout_seconds") or self.query_timeout)
+        return max_rows, max_bytes, timeout
+    
+    def _limits_key(self, payload: Dict[str, Any]) -> str:
+        max_rows, max_bytes, _ = self._limits(payload)
+        return f"{max_rows}:{max_bytes}"
+    
+    async def _execute_query(self, query: str, params: Dict[str, Any], payload: Dict[str, Any]) -> Any:
+        limits = self._limits(payload)
+        engine, cancel_engine = self._route(_is_read(query), payload)
+        return await self._run_cancellable(self._run_query, engine, cancel_engine, limits[2], query, params, limits)
+    
+    async def _run_cancellable(self, func, engine: Engine, cancel_engine: Engine, timeout: float, *args) -> Any:
+        """Run func(engine, *args, state) on the pool; cancel it on the server on timeout"""
+        loop = asyncio.get_running_loop()
+        state: Dict[str, Any] = {"cancel_engine": cancel_engine}
+        future = loop.run_in_executor(self._executor, func, engine, *args, state)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            await asyncio.to_thread(self._cancel_backend, state)
+            raise TimeoutError(f"Query cancelled after {timeout}s")
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self._cancel_backend, state)
+            raise
+    
+    def close(self):
+        """Release the thread pool and connections"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        dispose_engines()
     
     @property
     def name(self) -> str:
         return "db"
-
-
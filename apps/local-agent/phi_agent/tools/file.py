@@ -1,19 +1,135 @@
+import asyncio
 import os
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from phi_agent.tools.base import BaseTool
 from phi_agent.config import Settings
+from phi_agent.file_cache import ParquetSidecarCache
+from phi_agent.aggregate import aggregate, metric_columns, validate_spec
+from phi_agent.writers import WRITE_FORMATS, StreamingWriter, open_writer
 
 settings = Settings()
 
+# Bytes of CSV parsed per record batch
+CSV_BLOCK_SIZE = 4 * 1024 * 1024
+DEFAULT_CHUNK_ROWS = 5000
+
+FILTER_OPS = {
+    "==": pc.equal,
+    "!=": pc.not_equal,
+    "<": pc.less,
+    "<=": pc.less_equal,
+    ">": pc.greater,
+    ">=": pc.greater_equal,
+}
+
+# Payload keys that select the projected/streaming read path
+READ_OPTION_KEYS = ("columns", "filters", "offset", "limit", "stream")
+
+
+def _filter_value(column: str, value: Any, to_type: pa.DataType) -> Any:
+    """Cast a JSON filter value (e.g. "2024-01-02") to the column's Arrow type"""
+    try:
+        return pa.scalar(value).cast(to_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+        numeric = not isinstance(value, bool) and isinstance(value, (int, float))
+        if numeric and (pa.types.is_integer(to_type) or pa.types.is_floating(to_type)):
+            # e.g. 2.5 against an integer column: the kernels compare mixed numbers
+            return value
+        raise ValueError(f"Filter value {value!r} does not match column {column} of type {to_type}: {e}") from e
+
+
+def _filter_value_set(column: str, values: List[Any], to_type: pa.DataType) -> pa.Array:
+    """Value set for in/not in, cast to the column's type"""
+    cast = [_filter_value(column, value, to_type) for value in values]
+    # Numbers left uncast (2.5 against integers) can never be equal to a value
+    return pa.array([value.as_py() for value in cast if isinstance(value, pa.Scalar)], type=to_type)
+
+
+def _filter_mask(table: pa.Table, filters: List[List[Any]]) -> Optional[pa.Array]:
+    """AND of [column, op, value] predicates; op is a comparison, in or not in"""
+    mask = None
+    for column, op, value in filters:
+        values = table.column(column)
+        if op not in FILTER_OPS and op not in ("in", "not in"):
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if op in ("in", "not in") and not isinstance(value, (list, tuple)):
+            raise ValueError(f"Filter {op} on {column} needs a list of values")
+        if pa.types.is_null(values.type):
+            # A column with no values at all: nothing matches
+            condition = pa.array([False] * len(values))
+        elif op == "in":
+            condition = pc.is_in(values, value_set=_filter_value_set(column, value, values.type))
+        elif op == "not in":
+            condition = pc.invert(pc.is_in(values, value_set=_filter_value_set(column, value, values.type)))
+        else:
+            condition = FILTER_OPS[op](values, _filter_value(column, value, values.type))
+        # Nulls never match
+        condition = pc.fill_null(condition, False)
+        mask = condition if mask is None else pc.and_(mask, condition)
+    return mask
+
+
+def _pandas_to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Convert a DataFrame, turning columns that mix types (common in Excel) into text"""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for name in df.columns:
+            if df[name].dtype == object:
+                df[name] = df[name].map(lambda value: None if pd.isna(value) else str(value))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _temporal_as_iso(table: pa.Table) -> pa.Table:
+    """Replace date, time and timestamp columns with ISO 8601 strings, which JSON can carry"""
+    for index, field in enumerate(table.schema):
+        if pa.types.is_date(field.type) or pa.types.is_time(field.type) or pa.types.is_timestamp(field.type):
+            values = [None if value is None else value.isoformat() for value in table.column(index).to_pylist()]
+            table = table.set_column(index, field.name, pa.array(values, pa.string()))
+    return table
+
+
+def _validate_filters(filters: Any) -> List[List[Any]]:
+    if filters is None:
+        return []
+    if not isinstance(filters, list) or not all(isinstance(f, (list, tuple)) and len(f) == 3 for f in filters):
+        raise ValueError("filters must be a list of [column, op, value]")
+    return [list(f) for f in filters]
+
 
 class FileTool(BaseTool):
-    """File tool for reading CSV and Excel files"""
+    """File tool for reading CSV and Excel files
+    
+    Reads accept columns (projection), filters ([column, op, value], ANDed),
+    offset and limit (applied after filtering). CSV files are then parsed
+    incrementally with the pyarrow CSV reader, so only the needed columns are
+    materialized and parsing stops once limit rows are found. With
+    "stream": true rows are delivered in chunks of chunk_rows.
+    
+    Parsed CSV/Excel files are kept as Parquet sidecars keyed by path, size
+    and mtime, so repeat reads of an unchanged export skip parsing entirely.
+    
+    The aggregate action applies filters, then group_by/metrics/top_n locally
+    and returns only the summary table.
+    
+    write_ndjson, write_csv and write_parquet take content as a list of row
+    dicts and write through a temporary file renamed into place; the worker
+    also uses open_writer to persist streamed results as they arrive.
+    """
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.base_path = config.get("base_path") or settings.file_base_path or "."
+        self.cache: Optional[ParquetSidecarCache] = None
+        if config.get("cache_enabled", True):
+            self.cache = ParquetSidecarCache(config.get("cache_dir"), config.get("cache_max_bytes"))
     
     async def execute(self, payload: Dict[str, Any]) -> Any:
         """Execute file operation (read or write)"""
@@ -29,6 +145,11 @@ class FileTool(BaseTool):
         else:
             full_path = Path(file_path)
         
+        if action == "aggregate":
+            if not full_path.exists():
+                raise FileNotFoundError(f"File not found: {full_path}")
+            return await asyncio.to_thread(self._aggregate, full_path, payload)
+        
         if action.startswith("read"):
             # Read operation
             if not full_path.exists():
@@ -37,6 +158,13 @@ class FileTool(BaseTool):
             # Read based on extension
             ext = full_path.suffix.lower()
             
+            # Plain reads take the Arrow path only to use (or build) the Parquet sidecar
+            use_arrow = self.cache is not None or any(key in payload for key in READ_OPTION_KEYS)
+            if use_arrow and ext != ".json" and action != "read_json":
+                return await asyncio.to_thread(lambda: [
+                    row for chunk in self._iter_rows(full_path, action, payload) for row in chunk
+                ])
+            
             if ext == ".csv" or action == "read_csv":
                 df = pd.read_csv(full_path)
             elif ext in [".xlsx", ".xls"] or action == "read_excel":
@@ -49,7 +177,7 @@ class FileTool(BaseTool):
                 raise ValueError(f"Unsupported file type: {ext}")
             
             # Convert to list of dicts
-            return df.to_dict("records")
+            return _temporal_as_iso(_pandas_to_arrow(df)).to_pylist()
         
         elif action.startswith("write"):
             # Write operation
@@ -67,14 +195,179 @@ class FileTool(BaseTool):
             elif action == "write_json":
                 import json
                 with open(full_path, "w") as f:
-                    json.dump(content, f, indent=2)
+                    # indent: null writes compact JSON
+                    json.dump(content, f, indent=payload.get("indent", 2))
                 return {"status": "success", "path": str(full_path)}
+            elif action[len("write_"):] in WRITE_FORMATS:
+                if not isinstance(content, list):
+                    raise ValueError(f"{action} needs content as a list of rows")
+                return await asyncio.to_thread(self._write_rows, full_path, action[len("write_"):], content, payload)
             else:
                 raise ValueError(f"Unsupported write action: {action}")
         
         else:
             raise ValueError(f"Unsupported action: {action}")
     
+    def _write_rows(self, full_path: Path, fmt: str, rows: List[Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
+        with open_writer(full_path, fmt, options) as writer:
+            writer.write_rows(rows)
+            return writer.commit()
+    
+    def open_writer(self, file_path: str, fmt: str, options: Optional[Dict[str, Any]] = None) -> StreamingWriter:
+        """Streaming writer for a path under the tool's base path"""
+        full_path = Path(file_path) if os.path.isabs(file_path) else Path(self.base_path) / file_path
+        return open_writer(full_path, fmt, options)
+    
+    def _resolve(self, payload: Dict[str, Any]) -> Path:
+        file_path = payload.get("path") or payload.get("file_path")
+        if not file_path:
+            raise ValueError("path or file_path is required in payload")
+        full_path = Path(file_path) if os.path.isabs(file_path) else Path(self.base_path) / file_path
+        if not full_path.exists():
+            raise FileNotFoundError(f"File not found: {full_path}")
+        return full_path
+    
+    def _is_csv(self, full_path: Path, action: str) -> bool:
+        # The extension wins over the default read_csv action
+        ext = full_path.suffix.lower()
+        return ext == ".csv" or (action == "read_csv" and ext not in [".xlsx", ".xls"])
+    
+    def _build_sidecar(self, full_path: Path, action: str, tmp_path: str) -> None:
+        """Convert the source file to Parquet at tmp_path"""
+        if self._is_csv(full_path, action):
+            # Batch by batch, so converting a large CSV needs little memory
+            try:
+                reader = self._open_csv(full_path)
+                with pq.ParquetWriter(tmp_path, reader.schema) as writer:
+                    for batch in reader:
+                        writer.write_batch(batch)
+            except pa.ArrowInvalid:
+                # A column changes type after the first block (ints, then "pending"):
+                # let pandas infer over the whole file instead
+                pq.write_table(_pandas_to_arrow(pd.read_csv(full_path)), tmp_path)
+        else:
+            pq.write_table(_pandas_to_arrow(pd.read_excel(full_path)), tmp_path)
+    
+    def _open_csv(self, full_path: Path, columns: Optional[List[str]] = None) -> pa_csv.CSVStreamingReader:
+        return pa_csv.open_csv(
+            full_path,
+            read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+            convert_options=pa_csv.ConvertOptions(include_columns=columns)
+        )
+    
+    def _arrow_types_hold(self, full_path: Path, columns: Optional[List[str]]) -> bool:
+        """Whether every block fits the types Arrow infers from the first one
+        
+        Checked in one pass before any rows are returned, so a column that
+        changes type partway (ints, then "pending") is typed once for the whole
+        file instead of differently before and after the change.
+        """
+        try:
+            for _ in self._open_csv(full_path, columns):
+                pass
+        except pa.ArrowInvalid:
+            return False
+        return True
+    
+    def _iter_tables(self, full_path: Path, action: str, columns: Optional[List[str]], filters: List[List[Any]]) -> Iterator[pa.Table]:
+        """Yield the file as Arrow tables, reading only the projected and filtered columns"""
+        needed = None
+        if columns:
+            needed = list(dict.fromkeys(list(columns) + [f[0] for f in filters]))
+        
+        ext = full_path.suffix.lower()
+        if self.cache is not None and (self._is_csv(full_path, action) or ext in [".xlsx", ".xls"] or action == "read_excel"):
+            sidecar = self.cache.get(full_path, lambda tmp_path: self._build_sidecar(full_path, action, tmp_path))
+            if sidecar is not None:
+                parquet = pq.ParquetFile(sidecar, memory_map=True)
+                for batch in parquet.iter_batches(columns=needed):
+                    yield pa.Table.from_batches([batch], schema=batch.schema)
+                return
+        
+        if self._is_csv(full_path, action):
+            if not self._arrow_types_hold(full_path, needed):
+                # Same result as the sidecar: pandas types the whole file at once
+                yield _pandas_to_arrow(pd.read_csv(full_path, usecols=needed))
+                return
+            for batch in self._open_csv(full_path, needed):
+                yield pa.Table.from_batches([batch])
+        elif ext in [".xlsx", ".xls"] or action == "read_excel":
+            # Excel has no incremental reader; projection still limits what is converted
+            yield _pandas_to_arrow(pd.read_excel(full_path, usecols=needed))
+        else:
+            raise ValueError(f"Unsupported file type: {ext}")
+    
+    def _iter_rows(self, full_path: Path, action: str, payload: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        """Yield lists of row dicts after projection, filtering and offset/limit"""
+        columns = payload.get("columns")
+        filters = _validate_filters(payload.get("filters"))
+        to_skip = int(payload.get("offset") or 0)
+        remaining = payload.get("limit")
+        remaining = int(remaining) if remaining is not None else None
+        chunk_rows = int(payload.get("chunk_rows") or DEFAULT_CHUNK_ROWS)
+        
+        for table in self._iter_tables(full_path, action, columns, filters):
+            if remaining is not None and remaining <= 0:
+                return
+            mask = _filter_mask(table, filters)
+            if mask is not None:
+                table = table.filter(mask)
+            if to_skip:
+                skipped = min(to_skip, table.num_rows)
+                table = table.slice(skipped)
+                to_skip -= skipped
+            if remaining is not None:
+                table = table.slice(0, remaining)
+                remaining -= table.num_rows
+            if columns:
+                table = table.select(columns)
+            table = _temporal_as_iso(table)
+            for start in range(0, table.num_rows, chunk_rows):
+                yield table.slice(start, chunk_rows).to_pylist()
+    
+    def _aggregate(self, full_path: Path, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Aggregate a CSV/Excel file, reading only the columns the spec needs"""
+        group_by = payload.get("group_by")
+        metrics = payload.get("metrics")
+        validate_spec(group_by, metrics)
+        filters = _validate_filters(payload.get("filters"))
+        columns = metric_columns(group_by, metrics)
+        
+        tables = []
+        for table in self._iter_tables(full_path, "aggregate", columns or None, filters):
+            mask = _filter_mask(table, filters)
+            if mask is not None:
+                table = table.filter(mask)
+            if columns:
+                table = table.select(columns)
+            # Group keys and min/max of dates come back as ISO strings
+            tables.append(_temporal_as_iso(table))
+        if not tables:
+            raise ValueError(f"No data in {full_path}")
+        
+        df = pa.concat_tables(tables).to_pandas()
+        return aggregate(
+            df,
+            group_by,
+            metrics,
+            order_by=payload.get("order_by"),
+            descending=payload.get("descending", True),
+            top_n=payload.get("top_n")
+        )
+    
+    async def stream(self, payload: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Read a CSV/Excel file and yield its rows in chunks of chunk_rows
+        
+        Each chunk is parsed only when the previous one has been sent.
+        """
+        full_path = self._resolve(payload)
+        rows = self._iter_rows(full_path, payload.get("action", "read_csv"), payload)
+        while True:
+            chunk = await asyncio.to_thread(next, rows, None)
+            if chunk is None:
+                return
+            yield chunk
+    
     @property
     def name(self) -> str:
         return "file"
@@ -0,0 +1,207 @@
+import asyncio
+import glob
+import os
+import re
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import duckdb
+import pandas as pd
+import pyarrow.parquet as pq
+from phi_agent.tools.base import BaseTool
+from phi_agent.config import Settings
+from phi_agent.file_cache import ParquetSidecarCache
+from phi_agent.tools.file import _pandas_to_arrow
+
+settings = Settings()
+
+DEFAULT_QUERY_TIMEOUT_SECONDS = 300.0
+DEFAULT_MAX_ROWS = 100_000
+DEFAULT_CHUNK_ROWS = 5000
+FETCH_BATCH_ROWS = 10_000
+MAX_BATCH_STATEMENTS = 50
+
+_TABLE_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_GLOB_CHARS = re.compile(r"[*?\[]")
+
+# extension -> DuckDB table function
+_READERS = {
+    ".csv": "read_csv_auto",
+    ".tsv": "read_csv_auto",
+    ".gz": "read_csv_auto",
+    ".parquet": "read_parquet",
+    ".json": "read_json_auto",
+    ".ndjson": "read_json_auto",
+    ".jsonl": "read_json_auto",
+}
+_EXCEL = (".xlsx", ".xls")
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class FileSQLTool(BaseTool):
+    """SQL over local export files with the embedded DuckDB engine
+    
+    Tables map names to file globs under the configured roots, e.g.
+    {"orders": "exports/orders_*.csv"}. Configured tables can be extended per
+    payload with "tables". Each query runs in a fresh in-memory database that
+    can only read the configured roots, and only a single SELECT (or a batch
+    of named SELECT statements) is accepted, so report SQL written for the
+    WMS database can run unchanged against its CSV/Parquet/Excel exports.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        roots = config.get("roots") or [config.get("base_path") or settings.file_base_path or "."]
+        self.roots = [os.path.realpath(root) for root in roots if root]
+        self.tables: Dict[str, str] = dict(config.get("tables") or {})
+        self.threads = config.get("threads")
+        self.max_rows = int(config.get("max_rows") or DEFAULT_MAX_ROWS)
+        self.query_timeout = float(config.get("query_timeout_seconds") or DEFAULT_QUERY_TIMEOUT_SECONDS)
+        # Excel has no DuckDB reader without extensions; convert through Parquet sidecars
+        self.sidecars = ParquetSidecarCache(config.get("cache_dir"), config.get("cache_max_bytes"))
+    
+    def _resolve_pattern(self, pattern: str) -> str:
+        """Absolute glob for pattern, which must stay inside one of the roots"""
+        full = pattern if os.path.isabs(pattern) else os.path.join(self.roots[0], pattern)
+        # Check the fixed part of the glob; wildcards cannot climb out of it
+        fixed = _GLOB_CHARS.split(full, 1)[0]
+        fixed_dir = os.path.realpath(fixed if fixed.endswith(os.sep) else os.path.dirname(fixed))
+        if ".." in Path(full).parts or not any(
+            fixed_dir == root or fixed_dir.startswith(root + os.sep) for root in self.roots
+        ):
+            raise ValueError(f"Table path is outside the configured file roots: {pattern}")
+        return full
+    
+    def _source_sql(self, pattern: str) -> str:
+        full = self._resolve_pattern(pattern)
+        suffixes = Path(full).suffixes
+        ext = suffixes[-1].lower() if suffixes else ""
+        if ext in _EXCEL:
+            files = sorted(glob.glob(full))
+            if not files:
+                raise FileNotFoundError(f"No files match {pattern}")
+            sidecars = [self._excel_sidecar(Path(path)) for path in files]
+            return f"read_parquet([{', '.join(_sql_literal(path) for path in sidecars)}])"
+        reader = _READERS.get(ext)
+        if reader is None:
+            raise ValueError(f"Unsupported file type for SQL: {pattern}")
+        return f"{reader}({_sql_literal(full)})"
+    
+    def _excel_sidecar(self, path: Path) -> str:
+        def build(tmp_path: str) -> None:
+            pq.write_table(_pandas_to_arrow(pd.read_excel(path)), tmp_path)
+        sidecar = self.sidecars.get(path, build)
+        if sidecar is None:
+            raise ValueError(f"Could not convert {path} for SQL")
+        return sidecar
+    
+    def _connect(self, tables: Dict[str, str]) -> duckdb.DuckDBPyConnection:
+        con = duckdb.connect(":memory:")
+        if self.threads:
+            con.execute(f"SET threads = {int(self.threads)}")
+        for name, pattern in tables.items():
+            if not _TABLE_NAME.match(name):
+                raise ValueError(f"Invalid table name: {name}")
+            con.execute(f'CREATE VIEW "{name}" AS SELECT * FROM {self._source_sql(pattern)}')
+        # From here on the query can only read files under the roots (and sidecars)
+        allowed = [root + os.sep for root in self.roots] + [os.path.realpath(self.sidecars.cache_dir) + os.sep]
+        con.execute(f"SET allowed_directories = [{', '.join(_sql_literal(path) for path in allowed)}]")
+        con.execute("SET enable_external_access = false")
+        con.execute("SET lock_configuration = true")
+        return con
+    
+    @staticmethod
+    def _check_select(con: duckdb.DuckDBPyConnection, query: str) -> None:
+        statements = con.extract_statements(query)
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            raise ValueError("Only a single SELECT statement is allowed")
+    
+    def _fetch(self, con: duckdb.DuckDBPyConnection, query: str, params: Optional[Dict[str, Any]], max_rows: int) -> Any:
+        self._check_select(con, query)
+        reader = con.execute(query, params or None).fetch_record_batch(FETCH_BATCH_ROWS)
+        rows: List[Dict[str, Any]] = []
+        for batch in reader:
+            rows.extend(batch.to_pylist())
+            if len(rows) > max_rows:
+                return {"rows": rows[:max_rows], "row_count": max_rows, "truncated": True, "truncated_by": "max_rows"}
+        return rows
+    
+    def _tables(self, payload: Dict[str, Any]) -> Dict[str, str]:
+        return {**self.tables, **(payload.get("tables") or {})}
+    
+    def _run(self, con: duckdb.DuckDBPyConnection, payload: Dict[str, Any]) -> Any:
+        max_rows = min(int(payload.get("max_rows") or self.max_rows), self.max_rows)
+        statements = payload.get("statements")
+        if statements is None:
+            return self._fetch(con, payload["query"], payload.get("params"), max_rows)
+        
+        # Same shape as DBTool batches: one result per statement name
+        results: Dict[str, Any] = {}
+        for statement in statements:
+            results[statement["name"]] = self._fetch(con, statement["query"], statement.get("params"), max_rows)
+        return results
+    
+    def _validate(self, payload: Dict[str, Any]) -> None:
+        statements = payload.get("statements")
+        if statements is None:
+            if not payload.get("query"):
+                raise ValueError("Query is required in payload")
+            return
+        if not isinstance(statements, list) or not statements:
+            raise ValueError("statements must be a non-empty list")
+        if len(statements) > MAX_BATCH_STATEMENTS:
+            raise ValueError(f"At most {MAX_BATCH_STATEMENTS} statements per batch")
+        names = set()
+        for statement in statements:
+            name = statement.get("name") if isinstance(statement, dict) else None
+            if not name or not statement.get("query"):
+                raise ValueError("Each statement needs a name and a query")
+            if name in names:
+                raise ValueError(f"Duplicate statement name: {name}")
+            names.add(name)
+    
+    async def execute(self, payload: Dict[str, Any]) -> Any:
+        """Run the payload's query (or statements) over the configured file tables"""
+        self._validate(payload)
+        timeout = float(payload.get("timeout_seconds") or self.query_timeout)
+        con = await asyncio.to_thread(self._connect, self._tables(payload))
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(self._run, con, payload), timeout=timeout)
+        except asyncio.TimeoutError:
+            con.interrupt()
+            raise TimeoutError(f"Query cancelled after {timeout}s")
+        except asyncio.CancelledError:
+            con.interrupt()
+            raise
+        finally:
+            con.close()
+    
+    def _iter_chunks(self, con: duckdb.DuckDBPyConnection, payload: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        query = payload["query"]
+        self._check_select(con, query)
+        chunk_rows = int(payload.get("chunk_rows") or DEFAULT_CHUNK_ROWS)
+        reader = con.execute(query, payload.get("params") or None).fetch_record_batch(chunk_rows)
+        for batch in reader:
+            yield batch.to_pylist()
+    
+    async def stream(self, payload: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Run the payload's query and yield its rows in chunks of chunk_rows"""
+        if not payload.get("query"):
+            raise ValueError("Query is required in payload")
+        con = await asyncio.to_thread(self._connect, self._tables(payload))
+        try:
+            chunks = self._iter_chunks(con, payload)
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            con.interrupt()
+            con.close()
+    
+    @property
+    def name(self) -> str:
+        return "file_sql"
@@ -1,73 +1,235 @@
 """
 WebTool for browser automation using Playwright
 """
-import asyncio
-from typing import Any, Dict, Optional
-from playwright.async_api import async_playwright, Browser, Page, BrowserContext
+import os
+import re
+import tempfile
+from contextlib import suppress
+from http.cookiejar import Cookie
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urljoin, urlparse
+import httpx
+from playwright.async_api import Page, Route
+from phi_agent.browser_pool import BrowserContextPool
+from phi_agent.config import Settings
+from phi_agent.session_store import SessionStore
 from phi_agent.tools.base import BaseTool
+from phi_agent.writers import publish_mode
+
+settings = Settings()
+
+MAX_STEPS = 50
+DEFAULT_WMS_URL = "https://wms.example.com"
+DEFAULT_PASSWORD_SELECTOR = 'input[name="password"], input[type="password"], #password'
+SESSION_PROBE_TIMEOUT_MS = 5000
+
+# Fast mode: requests a report page never needs
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+BLOCKED_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "segment.io", "hotjar.com", "connect.facebook.net"
+)
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = 300.0
+
+
+def _site(url: str) -> str:
+    return urlparse(url).netloc.lower() or url
+
+
+async def _block_nonessential(route: Route):
+    request = route.request
+    host = urlparse(request.url).hostname or ""
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(
+        host == blocked or host.endswith("." + blocked) for blocked in BLOCKED_HOSTS
+    ):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+def _cookie_jar(cookies: List[Dict[str, Any]]) -> httpx.Cookies:
+    """httpx cookies from Playwright's, keeping domain, path and the secure flag"""
+    jar = httpx.Cookies()
+    for cookie in cookies:
+        domain = cookie.get("domain") or ""
+        if domain and "." not in domain.lstrip(".") and ":" not in domain:
+            # http.cookiejar matches dotless hosts (intranet names, localhost) as host.local
+            domain = f"{domain}.local"
+        path = cookie.get("path") or "/"
+        expires = cookie.get("expires")
+        jar.jar.set_cookie(Cookie(
+            version=0,
+            name=cookie["name"],
+            value=cookie["value"],
+            port=None,
+            port_specified=False,
+            domain=domain,
+            domain_specified=bool(domain),
+            domain_initial_dot=domain.startswith("."),
+            path=path,
+            path_specified=True,
+            secure=bool(cookie.get("secure")),
+            # Playwright uses -1 for session cookies
+            expires=int(expires) if expires is not None and expires >= 0 else None,
+            discard=expires is None or expires < 0,
+            comment=None,
+            comment_url=None,
+            rest={}
+        ))
+    return jar
+
+
+def _filename_from(response: httpx.Response, url: str) -> str:
+    disposition = response.headers.get("content-disposition", "")
+    match = re.search(r"filename\*=(?:UTF-8'')?([^;]+)|filename=\"?([^\";]+)\"?", disposition, re.IGNORECASE)
+    if match:
+        name = unquote(match.group(1) or match.group(2)).strip()
+    else:
+        name = unquote(os.path.basename(urlparse(url).path))
+    return os.path.basename(name) or "download"
 
 
 class WebTool(BaseTool):
-    """Browser automation tool using Playwright"""
+    """Browser automation tool using Playwright
+    
+    Every task leases its own context and page from a pool of warm contexts
+    sharing one Chromium process, so web tasks run concurrently. Page state
+    does not carry over between tasks: a multi-step flow is sent as one
+    steps action. Tasks with the same session key reuse a context (and its
+    cookies) when one is idle.
+    
+    In fast mode (config fast_mode or payload fast) images, media, fonts and
+    analytics are not loaded, waits use the given selectors or URLs (or
+    domcontentloaded) instead of networkidle, and downloads whose URL can
+    be resolved are fetched directly with the browser's cookies.
+    
+    Logins save the context's storage_state per (site, username), encrypted
+    at rest. A later task for the same login starts from that state and
+    only fills the login form if a quick probe shows the session has lapsed.
+    """
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
-        self.browser: Optional[Browser] = None
-        self.context: Optional[BrowserContext] = None
-        self.page: Optional[Page] = None
-        self.playwright = None
+        self.pool = BrowserContextPool(
+            size=config.get("pool_size") or 2,
+            max_uses=config.get("max_uses_per_context") or 50,
+            idle_timeout=config.get("idle_timeout_seconds") or 300.0,
+            headless=config.get("headless", True)
+        )
+        self.fast_mode = config.get("fast_mode", False)
+        self.sessions: Optional[SessionStore] = None
+        if config.get("reuse_sessions", True):
+            self.sessions = SessionStore(
+                config.get("session_dir"),
+                key=config.get("state_key") or settings.web_state_key,
+                max_age=config.get("session_max_age_seconds"),
+                key_path=config.get("state_key_path")
+            )
         
         # Script registry for common operations
         self.scripts = {
             "LOGIN_AND_EXPORT_DAILY_ORDERS": self._login_and_export_daily_orders,
-            "LOGIN": self._login,
+            "LOGIN": self._login_session,
             "DOWNLOAD_REPORT": self._download_report,
         }
     
-    async def _initialize_browser(self):
-        """Initialize browser if not already initialized"""
-        if self.browser is None:
-            self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(headless=True)
-            self.context = await self.browser.new_context()
-            self.page = await self.context.new_page()
-    
-    async def _cleanup(self):
-        """Clean up browser resources"""
-        if self.page:
-            await self.page.close()
-        if self.context:
-            await self.context.close()
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
-    
-    async def _login(self, url: str, username: str, password: str, selectors: Dict[str, str]) -> Dict[str, Any]:
+    async def close(self):
+        """Close pooled contexts and the browser"""
+        await self.pool.close()
+    
+    def _fast(self, params: Dict[str, Any]) -> bool:
+        return params.get("fast", self.fast_mode)
+    
+    async def _goto(self, page: Page, url: str, params: Dict[str, Any]):
+        await page.goto(url, wait_until="domcontentloaded" if self._fast(params) else "load")
+    
+    async def _settle(
+        self,
+        page: Page,
+        params: Dict[str, Any],
+        selector: Optional[str] = None,
+        url: Optional[str] = None,
+        idle_fallback: bool = False
+    ):
+        """Wait for the page to be ready after a navigation or click
+        
+        An explicit selector or URL pattern is the fastest signal. Without
+        one, fast mode only waits for the DOM, except where nothing else says
+        an in-page update has finished (idle_fallback); otherwise networkidle.
+        """
+        if selector:
+            await page.wait_for_selector(selector)
+        elif url:
+            await page.wait_for_url(url)
+        elif self._fast(params) and not idle_fallback:
+            await page.wait_for_load_state("domcontentloaded")
+        else:
+            await page.wait_for_load_state("networkidle")
+    
+    async def _login(self, page: Page, params: Dict[str, Any]) -> Dict[str, Any]:
         """Login to a website"""
-        await self._initialize_browser()
-        await self.page.goto(url)
+        url = params.get("url")
+        username = params.get("username")
+        password = params.get("password")
+        selectors = params.get("selectors", {})
+        await self._goto(page, url, params)
         
         # Fill username
         username_selector = selectors.get("username", 'input[name="username"], input[type="email"], #username')
-        await self.page.fill(username_selector, username)
+        await page.fill(username_selector, username)
         
         # Fill password
-        password_selector = selectors.get("password", 'input[name="password"], input[type="password"], #password')
-        await self.page.fill(password_selector, password)
+        password_selector = selectors.get("password", DEFAULT_PASSWORD_SELECTOR)
+        await page.fill(password_selector, password)
         
         # Click login button
         login_selector = selectors.get("login_button", 'button[type="submit"], input[type="submit"], button:has-text("Login")')
-        await self.page.click(login_selector)
+        await page.click(login_selector)
+        
+        # Wait for navigation; in fast mode, for the login form to go away
+        if self._fast(params) and not (params.get("logged_in_selector") or params.get("after_login_url")):
+            await page.wait_for_selector(password_selector, state="detached")
+        else:
+            await self._settle(page, params, params.get("logged_in_selector"), params.get("after_login_url"))
         
-        # Wait for navigation
-        await self.page.wait_for_load_state("networkidle")
+        return {"status": "success", "url": page.url}
+    
+    async def _session_valid(self, page: Page, params: Dict[str, Any]) -> bool:
+        """Cheap check that the context's saved cookies are still logged in
+        
+        Loads session_probe_url (default: the login url) without waiting for
+        the network to settle. With logged_in_selector the session is valid if
+        that element appears; otherwise if no password field is shown.
+        """
+        if not await page.context.cookies():
+            return False
+        await page.goto(params.get("session_probe_url") or params["url"], wait_until="domcontentloaded")
+        logged_in_selector = params.get("logged_in_selector")
+        if logged_in_selector:
+            try:
+                await page.wait_for_selector(logged_in_selector, timeout=SESSION_PROBE_TIMEOUT_MS)
+                return True
+            except Exception:
+                return False
+        password_selector = params.get("selectors", {}).get("password", DEFAULT_PASSWORD_SELECTOR)
+        return await page.locator(password_selector).count() == 0
+    
+    async def _login_session(self, page: Page, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Log in unless the context already holds a valid session, then save it"""
+        url = params.get("url")
+        username = params.get("username")
+        if self.sessions is not None and url and username and await self._session_valid(page, params):
+            return {"status": "success", "url": page.url, "session_reused": True}
         
-        return {"status": "success", "url": self.page.url}
+        result = await self._login(page, params)
+        if self.sessions is not None and url and username:
+            self.sessions.save(_site(url), username, await page.context.storage_state())
+        return {**result, "session_reused": False}
     
-    async def _login_and_export_daily_orders(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    async def _login_and_export_daily_orders(self, page: Page, params: Dict[str, Any]) -> Dict[str, Any]:
         """Login to WMS and export daily orders"""
-        url = params.get("url", "https://wms.example.com")
+        url = params.get("url", DEFAULT_WMS_URL)
         username = params.get("username")
         password = params.get("password")
         date = params.get("date")
@@ -75,36 +237,68 @@ class WebTool(BaseTool):
         if not username or not password:
             raise ValueError("username and password are required")
         
-        await self._initialize_browser()
+        # Login (skipped when a saved session is still valid)
+        login_result = await self._login_session(page, {**params, "url": url})
         
-        # Login
-        login_result = await self._login(
-            url,
-            username,
-            password,
-            params.get("selectors", {})
-        )
-        
-        # Navigate to orders page
+        # Navigate to orders page; in fast mode the export button showing up means it is ready
         orders_url = params.get("orders_url", f"{url}/orders")
-        await self.page.goto(orders_url)
-        await self.page.wait_for_load_state("networkidle")
+        export_selector = params.get("export_selector", 'button:has-text("Export"), a:has-text("Export")')
+        await self._goto(page, orders_url, params)
+        await self._settle(page, params, params.get("orders_ready_selector") or (export_selector if self._fast(params) else None))
         
         # Set date filter if provided
         if date:
             date_selector = params.get("date_selector", 'input[name="date"], input[type="date"]')
-            await self.page.fill(date_selector, date)
-            await self.page.click(params.get("filter_button", 'button:has-text("Filter")'))
-            await self.page.wait_for_load_state("networkidle")
+            await page.fill(date_selector, date)
+            await page.click(params.get("filter_button", 'button:has-text("Filter")'))
+            await self._settle(page, params, params.get("filter_ready_selector"), idle_fallback=True)
         
-        # Click export button
-        export_selector = params.get("export_selector", 'button:has-text("Export"), a:has-text("Export")')
-        async with self.page.expect_download() as download_info:
-            await self.page.click(export_selector)
+        # Export and save the download
+        return await self._save_download(
+            page, params, export_selector,
+            params.get("download_path", f"/tmp/orders_{date or 'latest'}.csv")
+        )
+    
+    async def _download_report(self, page: Page, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Download a report from current page"""
+        url = params.get("url")
+        download_selector = params.get("download_selector", 'a:has-text("Download"), button:has-text("Download")')
+        if url:
+            await self._goto(page, url, params)
+            await self._settle(page, params, params.get("wait_for") or (download_selector if self._fast(params) else None))
+        
+        return await self._save_download(page, params, download_selector, params.get("download_path"))
+    
+    async def _download_url(self, page: Page, params: Dict[str, Any], selector: str) -> Optional[str]:
+        """URL the download control points at, if it can be known without clicking"""
+        if params.get("download_url"):
+            return urljoin(page.url, params["download_url"])
+        if not self._fast(params) or params.get("direct_download") is False:
+            return None
+        href = await page.locator(selector).first.get_attribute("href")
+        if not href or href.startswith(("#", "javascript:", "blob:", "data:")):
+            return None
+        return urljoin(page.url, href)
+    
+    async def _save_download(
+        self,
+        page: Page,
+        params: Dict[str, Any],
+        selector: str,
+        download_path: Optional[str]
+    ) -> Dict[str, Any]:
+        """Save the file behind selector, fetching it directly when its URL is known"""
+        url = await self._download_url(page, params, selector)
+        if url:
+            result = await self._fetch(page, url, download_path)
+            if result is not None:
+                return result
+        
+        async with page.expect_download() as download_info:
+            await page.click(selector)
         download = await download_info.value
         
-        # Save download
-        download_path = params.get("download_path", f"/tmp/orders_{date or 'latest'}.csv")
+        download_path = download_path or f"/tmp/{download.suggested_filename}"
         await download.save_as(download_path)
         
         return {
@@ -113,89 +307,167 @@ class WebTool(BaseTool):
             "filename": download.suggested_filename
         }
     
-    async def _download_report(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Download a report from current page"""
-        await self._initialize_browser()
-        
-        url = params.get("url")
-        if url:
-            await self.page.goto(url)
-            await self.page.wait_for_load_state("networkidle")
+    async def _fetch(self, page: Page, url: str, download_path: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Stream url to disk over HTTP with the page's cookies
         
-        download_selector = params.get("download_selector", 'a:has-text("Download"), button:has-text("Download")')
-        async with self.page.expect_download() as download_info:
-            await self.page.click(download_selector)
-        download = await download_info.value
+        The file is written next to its destination and renamed into place
+        once complete. Returns None if the server refuses the request (4xx)
+        or answers with an HTML page (usually a login or error page), so the
+        caller can click instead.
+        """
+        headers = {
+            "User-Agent": await page.evaluate("navigator.userAgent"),
+            "Referer": page.url,
+        }
+        # A jar rather than a Cookie header: httpx drops the header on redirects,
+        # but matches the jar's cookies against every hop (/export -> /files/x.csv)
+        cookies = _cookie_jar(await page.context.cookies())
         
-        download_path = params.get("download_path", f"/tmp/{download.suggested_filename}")
-        await download.save_as(download_path)
+        async with httpx.AsyncClient(
+            cookies=cookies,
+            follow_redirects=True,
+            timeout=DOWNLOAD_TIMEOUT_SECONDS
+        ) as client:
+            async with client.stream("GET", url, headers=headers) as response:
+                if response.is_client_error:
+                    return None
+                response.raise_for_status()
+                if response.headers.get("content-type", "").startswith("text/html"):
+                    return None
+                filename = _filename_from(response, str(response.url))
+                download_path = download_path or f"/tmp/{filename}"
+                directory = os.path.dirname(os.path.abspath(download_path))
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(download_path)}.", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                            f.write(chunk)
+                    publish_mode(tmp_path, download_path)
+                    os.replace(tmp_path, download_path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.unlink(tmp_path)
+                    raise
         
         return {
             "status": "success",
             "download_path": download_path,
-            "filename": download.suggested_filename
+            "filename": filename,
+            "direct": True
         }
     
     async def execute(self, payload: Dict[str, Any]) -> Any:
-        """Execute web automation task"""
-        action = payload.get("action", "goto")
-        
+        """Execute web automation task on a leased page"""
         try:
-            await self._initialize_browser()
-            
-            if action == "run_script":
-                # Run a named script
-                script_name = payload.get("script")
-                if script_name not in self.scripts:
-                    raise ValueError(f"Unknown script: {script_name}")
-                
-                script_func = self.scripts[script_name]
-                params = payload.get("params", {})
-                return await script_func(params)
-            
-            elif action == "goto":
-                url = payload.get("url")
-                if not url:
-                    raise ValueError("url is required for goto action")
-                await self.page.goto(url)
-                await self.page.wait_for_load_state("networkidle")
-                return {"status": "success", "url": self.page.url}
-            
-            elif action == "click":
-                selector = payload.get("selector")
-                if not selector:
-                    raise ValueError("selector is required for click action")
-                await self.page.click(selector)
-                await self.page.wait_for_load_state("networkidle")
-                return {"status": "success"}
-            
-            elif action == "fill":
-                selector = payload.get("selector")
-                value = payload.get("value")
-                if not selector or value is None:
-                    raise ValueError("selector and value are required for fill action")
-                await self.page.fill(selector, str(value))
-                return {"status": "success"}
-            
-            elif action == "login":
-                return await self._login(
-                    payload.get("url"),
-                    payload.get("username"),
-                    payload.get("password"),
-                    payload.get("selectors", {})
-                )
-            
-            elif action == "download":
-                return await self._download_report(payload)
-            
-            else:
-                raise ValueError(f"Unsupported action: {action}")
-        
+            key, options = self._lease_for(payload)
+            async with self.pool.lease(key=key, options=options) as leased:
+                fast = self._fast(payload)
+                if fast:
+                    await leased.page.route("**/*", _block_nonessential)
+                try:
+                    if payload.get("action") == "steps":
+                        return await self._run_steps(leased.page, payload.get("steps"), fast)
+                    return await self._run_action(leased.page, {**payload, "fast": fast})
+                finally:
+                    if fast:
+                        # Pooled pages are reused by tasks that may not want blocking
+                        with suppress(Exception):
+                            await leased.page.unroute("**/*", _block_nonessential)
         finally:
-            # Don't cleanup on every action - keep browser alive for session
-            # Only cleanup if explicitly requested
+            # The pool keeps warm contexts between tasks; close_browser shuts it down
             if payload.get("close_browser", False):
-                await self._cleanup()
+                await self.pool.close()
+    
+    def _credentials(self, payload: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """(site, username) the task logs in as, if any"""
+        action = payload.get("action")
+        if action == "steps":
+            for step in payload.get("steps") or []:
+                credentials = self._credentials(step) if isinstance(step, dict) else None
+                if credentials:
+                    return credentials
+            return None
+        if action == "run_script":
+            params = payload.get("params") or {}
+            url = params.get("url", DEFAULT_WMS_URL if payload.get("script") == "LOGIN_AND_EXPORT_DAILY_ORDERS" else None)
+            username = params.get("username")
+        elif action == "login":
+            url, username = payload.get("url"), payload.get("username")
+        else:
+            return None
+        return (_site(url), username) if url and username else None
+    
+    def _lease_for(self, payload: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Pool key and new-context options for a task
+        
+        Tasks that log in are keyed by (site, username) so contexts, and the
+        cookies in them, are only shared by the same login; a fresh context
+        starts from the saved storage_state.
+        """
+        credentials = self._credentials(payload)
+        if credentials is None:
+            return payload.get("session"), None
+        state = self.sessions.load(*credentials) if self.sessions is not None else None
+        return "\0".join(credentials), ({"storage_state": state} if state else None)
+    
+    async def _run_steps(self, page: Page, steps: Any, fast: bool) -> Dict[str, Any]:
+        """Run several actions in order on the same page"""
+        if not isinstance(steps, list) or not steps:
+            raise ValueError("steps must be a non-empty list of actions")
+        if len(steps) > MAX_STEPS:
+            raise ValueError(f"At most {MAX_STEPS} steps are allowed per task")
+        results: List[Any] = []
+        for index, step in enumerate(steps):
+            if not isinstance(step, dict) or step.get("action") == "steps":
+                raise ValueError(f"Step {index} must be an action object")
+            results.append(await self._run_action(page, {"fast": fast, **step}))
+        return {"status": "success", "url": page.url, "steps": results}
+    
+    async def _run_action(self, page: Page, payload: Dict[str, Any]) -> Any:
+        action = payload.get("action", "goto")
+        if action == "run_script":
+            # Run a named script
+            script_name = payload.get("script")
+            if script_name not in self.scripts:
+                raise ValueError(f"Unknown script: {script_name}")
+            
+            script_func = self.scripts[script_name]
+            params = {"fast": payload["fast"], **payload.get("params", {})}
+            return await script_func(page, params)
+        
+        elif action == "goto":
+            url = payload.get("url")
+            if not url:
+                raise ValueError("url is required for goto action")
+            await self._goto(page, url, payload)
+            await self._settle(page, payload, payload.get("wait_for"), payload.get("wait_for_url"))
+            return {"status": "success", "url": page.url}
+        
+        elif action == "click":
+            selector = payload.get("selector")
+            if not selector:
+                raise ValueError("selector is required for click action")
+            await page.click(selector)
+            await self._settle(page, payload, payload.get("wait_for"), payload.get("wait_for_url"))
+            return {"status": "success"}
+        
+        elif action == "fill":
+            selector = payload.get("selector")
+            value = payload.get("value")
+            if not selector or value is None:
+                raise ValueError("selector and value are required for fill action")
+            await page.fill(selector, str(value))
+            return {"status": "success"}
+        
+        elif action == "login":
+            return await self._login_session(page, payload)
+        
+        elif action == "download":
+            return await self._download_report(page, payload)
+        
+        else:
+            raise ValueError(f"Unsupported action: {action}")
     
     @property
     def name(self) -> str:
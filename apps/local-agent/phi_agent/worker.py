@@ -1,19 +1,66 @@
 import asyncio
-from typing import Dict, Any
-from phi_agent.config import AgentConfig
+import inspect
+import time
+from typing import Callable, Dict, Any, List, Optional, Set
+from phi_agent.config import AgentConfig, ConcurrencyConfig
 from phi_agent.client import OrchestratorClient
-from phi_agent.tools import DBTool, FileTool, WebTool, DashboardTool
+from phi_agent.encoding import encode_result, negotiate
+from phi_agent.tools import DBTool, FileTool, FileSQLTool, WebTool, DashboardTool
+
+
+# Weight of the newest sample in the per-tool latency moving average
+LATENCY_EWMA_ALPHA = 0.3
 
 
 class Worker:
-    """Worker that polls for tasks and executes tools"""
+    """Worker that polls for tasks and executes tools concurrently
+    
+    Each tool has its own bounded queue drained by as many consumers as its
+    limit allows, and every execution also holds a slot of the global limit,
+    so a slow web export never blocks queued db queries.
+    """
     
     def __init__(self, config: AgentConfig, client: OrchestratorClient, local_agent_id: str):
         self.config = config
         self.client = client
         self.local_agent_id = local_agent_id
         self.tools: Dict[str, Any] = {}
+        self.in_flight = 0
+        self.latency_ms: Dict[str, float] = {}
+        # Returns the result encodings the orchestrator accepts (set by main)
+        self.encodings_provider: Optional[Callable[[], List[str]]] = None
+        self.concurrency = config.local.concurrency if config.local else ConcurrencyConfig()
         self._initialize_tools()
+        
+        self._global_limit = asyncio.Semaphore(self.concurrency.max_concurrent)
+        self._queues: Dict[str, asyncio.Queue] = {
+            tool_name: asyncio.Queue(maxsize=self.concurrency.queue_size)
+            for tool_name in self.tools
+        }
+        self._consumers: List[asyncio.Task] = []
+        # task_tool_ids queued or running, so a re-delivered task is not run twice
+        self._known: Set[str] = set()
+        self._stopping = asyncio.Event()
+    
+    def _tool_limit(self, tool_name: str) -> int:
+        return max(1, self.concurrency.per_tool.get(tool_name, self.concurrency.default_tool_limit))
+    
+    def _queued(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values())
+    
+    def _record_latency(self, tool_name: str, elapsed_ms: float):
+        previous = self.latency_ms.get(tool_name)
+        if previous is None:
+            self.latency_ms[tool_name] = elapsed_ms
+        else:
+            self.latency_ms[tool_name] = LATENCY_EWMA_ALPHA * elapsed_ms + (1 - LATENCY_EWMA_ALPHA) * previous
+    
+    def load_report(self) -> Dict[str, Any]:
+        """Load sent with heartbeats so the orchestrator can route to the least-busy agent"""
+        return {
+            "in_flight": self.in_flight,
+            "latency_ms": {tool: round(ms, 1) for tool, ms in self.latency_ms.items()}
+        }
     
     def _initialize_tools(self):
         """Initialize tool instances based on config"""
@@ -32,14 +79,50 @@ class Worker:
                     tool_config_dict["database"] = db_config.database
                     tool_config_dict["username"] = db_config.username
                     tool_config_dict["password"] = db_config.password
+                if db_config.max_workers:
+                    tool_config_dict["max_workers"] = db_config.max_workers
+                if db_config.query_timeout_seconds:
+                    tool_config_dict["query_timeout_seconds"] = db_config.query_timeout_seconds
+                if db_config.cache_ttl_seconds is not None:
+                    tool_config_dict["cache_ttl_seconds"] = db_config.cache_ttl_seconds
+                if db_config.cache_max_bytes:
+                    tool_config_dict["cache_max_bytes"] = db_config.cache_max_bytes
+                if db_config.max_rows:
+                    tool_config_dict["max_rows"] = db_config.max_rows
+                if db_config.max_bytes:
+                    tool_config_dict["max_bytes"] = db_config.max_bytes
+                if db_config.replica_dsn:
+                    tool_config_dict["replica_dsn"] = db_config.replica_dsn
+                tool_config_dict["read_only"] = db_config.read_only
                 self.tools["db"] = DBTool(tool_config_dict)
             elif tool_key == "file" and self.config.local and self.config.local.file_roots:
                 file_config = self.config.local.file_roots
                 tool_config_dict["base_path"] = file_config.base_path or file_config.exports or "."
+                tool_config_dict["cache_enabled"] = file_config.cache_enabled
+                tool_config_dict["cache_dir"] = file_config.cache_dir
+                tool_config_dict["cache_max_bytes"] = file_config.cache_max_bytes
                 self.tools["file"] = FileTool(tool_config_dict)
-            elif tool_key == "web":
-                # WebTool doesn't need special config
-                self.tools["web"] = WebTool({})
+            elif tool_key == "file_sql" and self.config.local and self.config.local.file_roots:
+                file_config = self.config.local.file_roots
+                roots = [file_config.base_path, file_config.exports, file_config.reports]
+                tool_config_dict["roots"] = [root for root in roots if root] or ["."]
+                tool_config_dict["tables"] = file_config.tables
+                tool_config_dict["threads"] = file_config.sql_threads
+                tool_config_dict["cache_dir"] = file_config.cache_dir
+                tool_config_dict["cache_max_bytes"] = file_config.cache_max_bytes
+                self.tools["file_sql"] = FileSQLTool(tool_config_dict)
+            elif tool_key == "web" and self.config.local:
+                web_config = self.config.local.web
+                tool_config_dict["pool_size"] = web_config.pool_size or self._tool_limit("web")
+                tool_config_dict["max_uses_per_context"] = web_config.max_uses_per_context
+                tool_config_dict["idle_timeout_seconds"] = web_config.idle_timeout_seconds
+                tool_config_dict["headless"] = web_config.headless
+                tool_config_dict["fast_mode"] = web_config.fast_mode
+                tool_config_dict["reuse_sessions"] = web_config.reuse_sessions
+                tool_config_dict["session_dir"] = web_config.session_dir
+                tool_config_dict["session_max_age_seconds"] = web_config.session_max_age_seconds
+                tool_config_dict["state_key_path"] = web_config.state_key_path
+                self.tools["web"] = WebTool(tool_config_dict)
             elif tool_key == "dashboard":
                 # DashboardTool config
                 dashboard_config = {}
@@ -52,8 +135,10 @@ class Worker:
             elif tool_key == "file":
                 # Fallback to environment variables
                 self.tools["file"] = FileTool({})
+            elif tool_key == "file_sql":
+                self.tools["file_sql"] = FileSQLTool({})
             elif tool_key == "web":
-                self.tools["web"] = WebTool({})
+                self.tools["web"] = WebTool({"pool_size": self._tool_limit("web")})
             elif tool_key == "dashboard":
                 self.tools["dashboard"] = DashboardTool({})
             # Add more tools as needed
@@ -63,58 +148,217 @@ class Worker:
         tool_name = task.get("tool")
         task_tool_id = task.get("task_tool_id")
         task_id = task.get("task_id")
+        step_id = task.get("step_id") or task_tool_id
         payload = task.get("payload", {})
         
         if tool_name not in self.tools:
             # Send error callback
             await self.client.send_tool_callback(
                 task_id=task_id,
-                step_id=task_tool_id,
+                step_id=step_id,
                 tool_name=tool_name,
                 result=None,
-                error=f"Tool {tool_name} not available"
+                error=f"Tool {tool_name} not available",
+                task_tool_id=task_tool_id,
+                local_agent_id=self.local_agent_id
             )
             return
         
+        self.in_flight += 1
+        started = time.monotonic()
         try:
             # Execute tool
             tool = self.tools[tool_name]
+            if payload.get("sink") and hasattr(tool, "stream"):
+                await self._sink_result(tool, task_id, task_tool_id, step_id, payload)
+                self._record_latency(tool_name, (time.monotonic() - started) * 1000)
+                return
+            if payload.get("stream") and hasattr(tool, "stream"):
+                await self._stream_result(tool, task_id, task_tool_id, step_id, payload)
+                self._record_latency(tool_name, (time.monotonic() - started) * 1000)
+                return
             result = await tool.execute(payload)
+            self._record_latency(tool_name, (time.monotonic() - started) * 1000)
+            accepted = self.encodings_provider() if self.encodings_provider else None
+            result = encode_result(result, negotiate(accepted))
             
             # Send success callback
             await self.client.send_tool_callback(
                 task_id=task_id,
-                step_id=task_tool_id,
+                step_id=step_id,
                 tool_name=tool_name,
                 result=result,
-                error=None
+                error=None,
+                task_tool_id=task_tool_id,
+                local_agent_id=self.local_agent_id
             )
         except Exception as e:
             # Send error callback
             await self.client.send_tool_callback(
                 task_id=task_id,
-                step_id=task_tool_id,
+                step_id=step_id,
                 tool_name=tool_name,
                 result=None,
-                error=str(e)
+                error=str(e),
+                task_tool_id=task_tool_id,
+                local_agent_id=self.local_agent_id
             )
+        finally:
+            self.in_flight -= 1
     
-    async def run(self, poll_interval: int = 5):
-        """Main worker loop"""
+    async def _stream_result(
+        self,
+        tool: Any,
+        task_id: str,
+        task_tool_id: str,
+        step_id: str,
+        payload: Dict[str, Any]
+    ):
+        """Upload a tool's rows chunk by chunk, then send the completion callback
+        
+        A failure partway is reported with the number of chunks already
+        uploaded, so the orchestrator knows to drop them.
+        """
+        seq = 0
+        row_count = 0
+        try:
+            async for rows in tool.stream(payload):
+                await self.client.send_tool_chunk(task_id, task_tool_id, seq, rows, self.local_agent_id)
+                seq += 1
+                row_count += len(rows)
+        except Exception as e:
+            await self.client.send_tool_callback(
+                task_id=task_id,
+                step_id=step_id,
+                tool_name=tool.name,
+                result=None,
+                error=str(e),
+                task_tool_id=task_tool_id,
+                local_agent_id=self.local_agent_id,
+                chunk_count=seq
+            )
+            return
+        
+        await self.client.send_tool_callback(
+            task_id=task_id,
+            step_id=step_id,
+            tool_name=tool.name,
+            result={"row_count": row_count},
+            error=None,
+            task_tool_id=task_tool_id,
+            local_agent_id=self.local_agent_id,
+            chunk_count=seq
+        )
+    
+    async def _sink_result(
+        self,
+        tool: Any,
+        task_id: str,
+        task_tool_id: str,
+        step_id: str,
+        payload: Dict[str, Any]
+    ):
+        """Write a tool's rows to a local file as they are produced
+        
+        payload["sink"] is {"path", "format", ...writer options}; the file
+        appears atomically once the last chunk is written and only its
+        path and row count are sent back.
+        """
+        sink = payload["sink"]
+        file_tool = self.tools.get("file")
+        if file_tool is None:
+            raise ValueError("A sink needs the file tool to be configured")
+        if not sink.get("path"):
+            raise ValueError("sink.path is required")
+        
+        writer = file_tool.open_writer(sink["path"], sink.get("format", "ndjson"), sink)
+        with writer:
+            async for rows in tool.stream(payload):
+                await asyncio.to_thread(writer.write_rows, rows)
+            result = await asyncio.to_thread(writer.commit)
+        
+        await self.client.send_tool_callback(
+            task_id=task_id,
+            step_id=step_id,
+            tool_name=tool.name,
+            result=result,
+            error=None,
+            task_tool_id=task_tool_id,
+            local_agent_id=self.local_agent_id
+        )
+    
+    async def _consume(self, tool_name: str, queue: asyncio.Queue):
+        """Run queued tasks for one tool, holding a global slot while executing"""
         while True:
+            task = await queue.get()
             try:
-                # Get pending tasks
-                response = await self.client.get_pending_tasks(self.local_agent_id)
-                tasks = response.get("tasks", [])
-                
-                # Process each task
-                for task in tasks:
+                async with self._global_limit:
                     await self.process_task(task)
-                
-                # Wait before next poll
-                await asyncio.sleep(poll_interval)
             except Exception as e:
-                print(f"Error in worker loop: {e}")
-                await asyncio.sleep(poll_interval)
+                print(f"Error processing {tool_name} task {task.get('task_tool_id')}: {e}")
+            finally:
+                self._known.discard(task.get("task_tool_id"))
+                queue.task_done()
+    
+    async def _enqueue(self, task: Dict[str, Any]):
+        task_tool_id = task.get("task_tool_id")
+        if task_tool_id in self._known:
+            return
+        queue = self._queues.get(task.get("tool"))
+        if queue is None:
+            # Unknown tool: fails immediately with an error callback
+            await self.process_task(task)
+            return
+        self._known.add(task_tool_id)
+        await queue.put(task)
+    
+    def stop(self):
+        """Stop polling; run() returns once queued and running tools have drained"""
+        self._stopping.set()
+    
+    async def _drain(self):
+        timeout = self.concurrency.drain_timeout_seconds
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues.values())),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"Drain timed out after {timeout}s with {self._queued()} queued and {self.in_flight} running")
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        for tool in self.tools.values():
+            if hasattr(tool, "close"):
+                closed = tool.close()
+                if inspect.isawaitable(closed):
+                    await closed
+    
+    async def run(self, poll_interval: int = 5):
+        """Main worker loop: claim tasks up to free queue capacity and hand them to consumers"""
+        for tool_name, queue in self._queues.items():
+            for _ in range(self._tool_limit(tool_name)):
+                self._consumers.append(asyncio.create_task(self._consume(tool_name, queue)))
+        
+        try:
+            while not self._stopping.is_set():
+                try:
+                    # Backpressure: only claim what the queues can hold
+                    free = self.concurrency.queue_size - self._queued()
+                    if free > 0:
+                        response = await self.client.get_pending_tasks(self.local_agent_id, limit=free)
+                        for task in response.get("tasks", []):
+                            await self._enqueue(task)
+                except Exception as e:
+                    print(f"Error in worker loop: {e}")
+                
+                # Wait before next poll (wakes early on stop)
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._drain()
 
 
@@ -0,0 +1,256 @@
+"""
+Streaming file writers for tabular rows
+Rows are written chunk by chunk to a temporary file next to the target, which
+is renamed into place on commit, so readers never see a partial file
+"""
+import csv
+import json
+import os
+import stat
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+WRITE_FORMATS = ("ndjson", "csv", "parquet")
+DEFAULT_ROW_GROUP_ROWS = 100_000
+
+
+def _umask() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    # Reading the umask means setting it; only done where /proc cannot tell
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+def publish_mode(tmp_path: str, target: str) -> None:
+    """Give a mkstemp file (always 0600) the mode target has, or would get from open()
+
+    Call before renaming tmp_path over target, so replacing a file keeps its
+    permissions and new files honour the umask.
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(target).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_umask()
+    os.chmod(tmp_path, mode)
+
+
+class StreamingWriter:
+    """Base writer: write_rows() any number of times, then commit() or abort()"""
+
+    def __init__(self, path: Path, append: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.append = append
+        self.rows = 0
+        if append:
+            self.tmp_path = None
+        else:
+            fd, self.tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+            os.close(fd)
+
+    @property
+    def target(self) -> str:
+        return str(self.path) if self.append else self.tmp_path
+
+    def write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        raise NotImplementedError
+
+    def commit(self) -> Dict[str, Any]:
+        self._close()
+        if self.tmp_path is not None:
+            publish_mode(self.tmp_path, str(self.path))
+            os.replace(self.tmp_path, self.path)
+            self.tmp_path = None
+        return {"status": "success", "path": str(self.path), "rows": self.rows, "bytes": os.path.getsize(self.path)}
+
+    def abort(self) -> None:
+        try:
+            self._close()
+        finally:
+            if self.tmp_path is not None and os.path.exists(self.tmp_path):
+                os.unlink(self.tmp_path)
+            self.tmp_path = None
+
+    def __enter__(self) -> "StreamingWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.abort()
+
+
+class NDJSONWriter(StreamingWriter):
+    """One compact JSON document per line; append=True adds to an existing file"""
+
+    def __init__(self, path: Path, append: bool = False):
+        super().__init__(path, append)
+        self._file = open(self.target, "a" if append else "w", encoding="utf-8")
+
+    def write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        # One write per chunk; appends of whole chunks never interleave partial lines
+        self._file.write("".join(json.dumps(row, default=str, separators=(",", ":")) + "\n" for row in rows))
+        self.rows += len(rows)
+
+    def _close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class CSVWriter(StreamingWriter):
+    """Header from the first chunk's columns; later rows must use the same columns"""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._file = open(self.target, "w", encoding="utf-8", newline="")
+        self._writer: Optional[csv.DictWriter] = None
+
+    def write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=list(rows[0].keys()))
+            self._writer.writeheader()
+        self._writer.writerows(rows)
+        self.rows += len(rows)
+
+    def _close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+def parse_schema(spec: Union[pa.Schema, Dict[str, str]]) -> pa.Schema:
+    """Arrow schema from {column: type name}, e.g. {"id": "int64", "at": "timestamp[us]"}"""
+    if isinstance(spec, pa.Schema):
+        return spec
+    if not isinstance(spec, dict) or not spec:
+        raise ValueError("schema must map column names to Arrow type names")
+    fields = []
+    for name, type_name in spec.items():
+        try:
+            fields.append(pa.field(name, pa.type_for_alias(str(type_name))))
+        except ValueError:
+            raise ValueError(f"Unknown Arrow type for column {name}: {type_name}")
+    return pa.schema(fields)
+
+
+def _conform(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """Cast table to schema, refusing casts that lose data (2.5 into an int column)"""
+    extra = [name for name in table.column_names if schema.get_field_index(name) == -1]
+    if extra:
+        raise ValueError(f"Columns not in the Parquet schema: {', '.join(extra)}")
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(table.num_rows, field.type))
+            continue
+        values = table.column(field.name)
+        if pa.types.is_null(field.type) and values.null_count < len(values):
+            raise ValueError(f"Column {field.name} was all null when its type was fixed; pass a schema")
+        try:
+            columns.append(values.cast(field.type, safe=True))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(f"Column {field.name} does not fit type {field.type}: {e}") from e
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class ParquetStreamWriter(StreamingWriter):
+    """Buffers rows into row groups of row_group_rows
+
+    With schema, every chunk is cast to it. Otherwise the schema is inferred
+    and widened across the buffered chunks (a column that was all null takes
+    the later type, int columns that receive floats become double) until the
+    first row group is written; after that it is fixed, and chunks that
+    would need a lossy cast or a new column raise ValueError.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        compression: str = "zstd",
+        row_group_rows: Optional[int] = None,
+        schema: Optional[Union[pa.Schema, Dict[str, str]]] = None
+    ):
+        # Parsed first, so a bad schema leaves no temporary file behind
+        self._schema: Optional[pa.Schema] = parse_schema(schema) if schema is not None else None
+        self._fixed = schema is not None
+        super().__init__(path)
+        self.compression = compression
+        self.row_group_rows = row_group_rows or DEFAULT_ROW_GROUP_ROWS
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._pending: List[pa.Table] = []
+        self._pending_rows = 0
+
+    def write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        if self._fixed:
+            table = _conform(pa.Table.from_pylist(rows), self._schema)
+        else:
+            try:
+                table = pa.Table.from_pylist(rows)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise ValueError(f"Rows do not fit one Parquet type per column; pass a schema: {e}") from e
+            if self._schema is None:
+                self._schema = table.schema
+            else:
+                try:
+                    self._schema = pa.unify_schemas([self._schema, table.schema], promote_options="permissive")
+                except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                    raise ValueError(f"Chunk types conflict with earlier rows; pass a schema: {e}") from e
+        self._pending.append(table)
+        self._pending_rows += table.num_rows
+        self.rows += table.num_rows
+        if self._pending_rows >= self.row_group_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.tmp_path, self._schema, compression=self.compression)
+            # Row groups already on disk pin the schema
+            self._fixed = True
+        table = pa.concat_tables([_conform(pending, self._schema) for pending in self._pending])
+        self._writer.write_table(table, row_group_size=self.row_group_rows)
+        self._pending = []
+        self._pending_rows = 0
+
+    def _close(self) -> None:
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        elif self.tmp_path is not None and os.path.getsize(self.tmp_path) == 0:
+            # No rows at all: still produce a valid (empty) Parquet file
+            pq.write_table(pa.table({}), self.tmp_path)
+
+
+def open_writer(path: Path, fmt: str, options: Optional[Dict[str, Any]] = None) -> StreamingWriter:
+    """Create a streaming writer for fmt (ndjson, csv or parquet)"""
+    options = options or {}
+    if fmt == "ndjson":
+        return NDJSONWriter(path, append=options.get("mode") == "append")
+    if fmt == "csv":
+        return CSVWriter(path)
+    if fmt == "parquet":
+        return ParquetStreamWriter(
+            path,
+            compression=options.get("compression") or "zstd",
+            row_group_rows=options.get("row_group_rows"),
+            schema=options.get("schema")
+        )
+    raise ValueError(f"Unsupported write format: {fmt}")
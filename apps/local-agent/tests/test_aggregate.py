@@ -0,0 +1,142 @@
+"""
+Local aggregation: grouping, metric merge across read chunks, nulls, ordering
+"""
+import asyncio
+import os
+import random
+import sys
+
+import pandas as pd
+import pytest
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+from phi_agent.aggregate import aggregate, metric_columns, validate_spec
+from phi_agent.tools import file as file_module
+from phi_agent.tools.file import FileTool
+
+METRICS = [
+    {"op": "count"},
+    {"op": "sum", "column": "qty"},
+    {"op": "min", "column": "qty"},
+    {"op": "max", "column": "qty"},
+    {"op": "mean", "column": "qty"},
+]
+
+
+def expected_groups(rows):
+    """Per-site count/sum/min/max/mean over non-null qty, computed by hand"""
+    groups = {}
+    for row in rows:
+        groups.setdefault(row["site"], []).append(row["qty"])
+    result = {}
+    for site, values in groups.items():
+        present = [value for value in values if value is not None]
+        result[site] = {
+            "count": len(values),
+            "qty_sum": sum(present),
+            "qty_min": min(present) if present else None,
+            "qty_max": max(present) if present else None,
+            "qty_mean": sum(present) / len(present) if present else None,
+        }
+    return result
+
+
+def by_site(result):
+    return {row.pop("site"): row for row in result}
+
+
+def test_grouped_metrics_with_nulls():
+    rows = [
+        {"site": "A", "qty": 1},
+        {"site": "A", "qty": None},
+        {"site": "A", "qty": 5},
+        {"site": "B", "qty": 2},
+        {"site": None, "qty": 7},
+        {"site": "C", "qty": None},
+    ]
+    result = by_site(aggregate(pd.DataFrame(rows), ["site"], METRICS))
+    assert result["A"] == {"count": 3, "qty_sum": 6.0, "qty_min": 1.0, "qty_max": 5.0, "qty_mean": 3.0}
+    # Null group keys form their own group
+    assert result[None]["count"] == 1
+    # A group with no values: counted, sums to 0, no min/max/mean
+    assert result["C"] == {"count": 1, "qty_sum": 0.0, "qty_min": None, "qty_max": None, "qty_mean": None}
+
+
+def test_ungrouped_metrics():
+    df = pd.DataFrame({"qty": [4, None, 2], "sku": ["x", "y", "x"]})
+    result = aggregate(df, None, METRICS + [
+        {"op": "nunique", "column": "sku"},
+        {"op": "median", "column": "qty"},
+        {"op": "percentile", "column": "qty", "q": 0.5, "as": "p50"},
+    ])
+    assert result == [{
+        "count": 3, "qty_sum": 6.0, "qty_min": 2.0, "qty_max": 4.0, "qty_mean": 3.0,
+        "sku_nunique": 2, "qty_median": 3.0, "p50": 3.0,
+    }]
+
+
+def test_order_by_and_top_n():
+    df = pd.DataFrame({"site": ["A", "B", "B", "C", "C", "C"], "qty": [9, 1, 1, 1, 1, 1]})
+    result = aggregate(df, ["site"], [{"op": "count"}, {"op": "sum", "column": "qty"}], top_n=2)
+    assert [row["site"] for row in result] == ["C", "B"]
+    result = aggregate(df, ["site"], [{"op": "count"}, {"op": "sum", "column": "qty"}], order_by="qty_sum", top_n=1)
+    assert result == [{"site": "A", "count": 1, "qty_sum": 9}]
+    with pytest.raises(ValueError):
+        aggregate(df, ["site"], [{"op": "count"}], order_by="missing")
+
+
+@pytest.mark.parametrize("group_by, metrics", [
+    ("site", [{"op": "count"}]),
+    (["site"], []),
+    (["site"], [{"op": "stddev", "column": "qty"}]),
+    (["site"], [{"op": "sum"}]),
+    (["site"], [{"op": "percentile", "column": "qty", "q": 1.5}]),
+])
+def test_invalid_specs(group_by, metrics):
+    with pytest.raises(ValueError):
+        validate_spec(group_by, metrics)
+
+
+def test_metric_columns_for_projection():
+    assert metric_columns(["site"], METRICS) == ["site", "qty"]
+    assert metric_columns(None, [{"op": "count"}]) == []
+
+
+@pytest.mark.parametrize("cache_enabled", [True, False])
+def test_file_aggregate_merges_groups_across_chunks(tmp_path, monkeypatch, cache_enabled):
+    # Small blocks so the file is read (and filtered) in many chunks
+    monkeypatch.setattr(file_module, "CSV_BLOCK_SIZE", 2048)
+    rng = random.Random(5)
+    rows = [
+        {"site": rng.choice("ABCD"), "qty": rng.choice([None, rng.randint(0, 50)])}
+        for _ in range(4000)
+    ]
+    with open(tmp_path / "orders.csv", "w") as f:
+        f.write("site,qty\n")
+        for row in rows:
+            f.write(f"{row['site']},{'' if row['qty'] is None else row['qty']}\n")
+
+    tool = FileTool({
+        "base_path": str(tmp_path),
+        "cache_enabled": cache_enabled,
+        "cache_dir": str(tmp_path / "cache"),
+    })
+    result = asyncio.run(tool.execute({
+        "action": "aggregate",
+        "path": "orders.csv",
+        "filters": [["site", "!=", "D"]],
+        "group_by": ["site"],
+        "metrics": METRICS,
+    }))
+
+    expected = expected_groups([row for row in rows if row["site"] != "D"])
+    actual = by_site(result)
+    assert set(actual) == set(expected)
+    for site, metrics in expected.items():
+        assert actual[site]["count"] == metrics["count"]
+        assert actual[site]["qty_sum"] == metrics["qty_sum"]
+        assert actual[site]["qty_min"] == metrics["qty_min"]
+        assert actual[site]["qty_max"] == metrics["qty_max"]
+        assert actual[site]["qty_mean"] == pytest.approx(metrics["qty_mean"])
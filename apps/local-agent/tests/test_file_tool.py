@@ -0,0 +1,86 @@
+"""
+FileTool reads of CSVs whose column types change after the first parsed block
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+from phi_agent.tools import file as file_module
+from phi_agent.tools.file import FileTool
+
+ROWS = 3000
+
+
+@pytest.fixture
+def orders_csv(tmp_path, monkeypatch):
+    # Small blocks so Arrow infers types from the first rows only
+    monkeypatch.setattr(file_module, "CSV_BLOCK_SIZE", 4096)
+    path = tmp_path / "orders.csv"
+    with open(path, "w") as f:
+        f.write("id,status,note,created\n")
+        for i in range(ROWS):
+            # status is numeric until the last rows; a quoted note spans two lines
+            status = "pending" if i >= ROWS - 5 else str(i % 3)
+            note = '"line one\nline two"' if i == 10 else "ok"
+            f.write(f"{i},{status},{note},2024-01-{i % 28 + 1:02d}\n")
+    return path
+
+
+def make_tool(tmp_path, cache_enabled):
+    return FileTool({
+        "base_path": str(tmp_path),
+        "cache_enabled": cache_enabled,
+        "cache_dir": str(tmp_path / "cache"),
+    })
+
+
+def read(tool, payload):
+    return asyncio.run(tool.execute({"path": "orders.csv", **payload}))
+
+
+@pytest.mark.parametrize("cache_enabled", [True, False])
+def test_type_change_gives_one_type_per_column(tmp_path, orders_csv, cache_enabled):
+    rows = read(make_tool(tmp_path, cache_enabled), {"columns": ["id", "status", "note"]})
+    assert len(rows) == ROWS
+    assert [row["id"] for row in rows] == list(range(ROWS))
+    assert {type(row["status"]) for row in rows} == {str}
+    assert rows[10]["note"] == "line one\nline two"
+    assert rows[-1]["status"] == "pending"
+
+
+def test_cached_and_uncached_reads_agree(tmp_path, orders_csv):
+    payload = {"filters": [["id", ">=", 5]], "limit": 100}
+    assert read(make_tool(tmp_path, True), payload) == read(make_tool(tmp_path, False), payload)
+
+
+@pytest.mark.parametrize("cache_enabled", [True, False])
+def test_filter_on_value_after_the_type_change(tmp_path, orders_csv, cache_enabled):
+    rows = read(make_tool(tmp_path, cache_enabled), {"filters": [["status", "==", "pending"]]})
+    assert [row["id"] for row in rows] == list(range(ROWS - 5, ROWS))
+
+
+@pytest.mark.parametrize("cache_enabled", [True, False])
+def test_aggregate_groups_across_the_type_change(tmp_path, orders_csv, cache_enabled):
+    result = read(make_tool(tmp_path, cache_enabled), {
+        "action": "aggregate",
+        "group_by": ["status"],
+        "metrics": [{"op": "count"}],
+    })
+    counts = {row["status"]: row["count"] for row in result}
+    assert counts == {"0": 999, "1": 998, "2": 998, "pending": 5}
+
+
+@pytest.mark.parametrize("cache_enabled", [True, False])
+def test_dates_come_back_as_iso_strings(tmp_path, cache_enabled):
+    # Consistent types, so Arrow parses the dates itself
+    (tmp_path / "orders.csv").write_text("id,created,shipped_at\n1,2024-01-01,2024-01-02 10:30:00\n2,2024-01-02,\n")
+    rows = read(make_tool(tmp_path, cache_enabled), {"columns": ["created", "shipped_at"]})
+    assert rows == [
+        {"created": "2024-01-01", "shipped_at": "2024-01-02T10:30:00"},
+        {"created": "2024-01-02", "shipped_at": None},
+    ]
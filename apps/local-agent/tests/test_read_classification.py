@@ -0,0 +1,65 @@
+"""
+Which queries count as reads (cached, streamed, sent to the replica)
+"""
+import os
+import sys
+
+import pytest
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+from phi_agent.tools.db import _is_read
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT 1",
+    "  select * from orders;",
+    "-- daily totals\nSELECT site, count(*) FROM orders GROUP BY site",
+    "/* report */ SELECT * FROM orders",
+    "WITH recent AS (SELECT * FROM orders) SELECT * FROM recent",
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 5) SELECT * FROM n",
+    "WITH a AS MATERIALIZED (SELECT 1), b AS NOT MATERIALIZED (SELECT 2) SELECT * FROM a, b",
+    "SELECT * FROM t WHERE note = 'insert into x; delete from y'",
+    "SELECT $$update t set x = 1$$",
+    "SELECT $tag$ for update $tag$",
+    'SELECT "update", "delete" FROM audit',
+    "SELECT * FROM t -- for update\n",
+    "SELECT substring(name for 3) FROM t",
+    "SELECT (SELECT max(id) FROM t) AS latest",
+])
+def test_reads(query):
+    assert _is_read(query)
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "-- nothing here",
+    "UPDATE orders SET status = 'x'",
+    "INSERT INTO t SELECT * FROM s",
+    "DELETE FROM t",
+    "CREATE TABLE t AS SELECT 1",
+    "(SELECT 1)",
+    # Writes behind a leading WITH
+    "WITH a AS (SELECT id FROM t) UPDATE t SET x = 1 WHERE id IN (SELECT id FROM a)",
+    "with a as (select id from t) delete from t using a where t.id = a.id",
+    "WITH a AS (SELECT 1) INSERT INTO t SELECT * FROM a",
+    "WITH a AS (SELECT 1) MERGE INTO t USING a ON true WHEN MATCHED THEN DELETE",
+    # Data-modifying CTEs
+    "WITH gone AS (DELETE FROM t RETURNING *) SELECT * FROM gone",
+    "WITH a AS (SELECT 1), b AS (UPDATE t SET x = 1 RETURNING x) SELECT * FROM b",
+    # SELECT INTO creates a table
+    "SELECT * INTO backup FROM orders",
+    "WITH a AS (SELECT 1) SELECT * INTO backup FROM a",
+    # Locking clauses
+    "SELECT * FROM jobs FOR UPDATE",
+    "SELECT * FROM jobs WHERE state = 'new' FOR UPDATE SKIP LOCKED LIMIT 1",
+    "SELECT * FROM jobs FOR NO KEY UPDATE",
+    "SELECT * FROM jobs FOR SHARE NOWAIT",
+    "SELECT * FROM jobs for key share",
+    "SELECT * FROM jobs j JOIN sites s ON s.id = j.site FOR UPDATE OF j",
+    "WITH next AS (SELECT id FROM jobs FOR UPDATE SKIP LOCKED) SELECT * FROM next",
+    "SELECT * FROM (SELECT * FROM jobs FOR SHARE) locked",
+])
+def test_not_reads(query):
+    assert not _is_read(query)
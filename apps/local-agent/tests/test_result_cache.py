@@ -0,0 +1,177 @@
+"""
+Read-result cache: TTL, LRU eviction by size, single-flight loads and bypass
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+from phi_agent import cache as cache_module
+from phi_agent.cache import ResultCache, cache_key, estimate_size, normalize_sql
+from phi_agent.tools.db import DBTool
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+class Loader:
+    """Counts calls; each call returns the next value, optionally after a gate opens"""
+
+    def __init__(self, gate=None):
+        self.calls = 0
+        self.gate = gate
+
+    async def __call__(self):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        return [{"n": self.calls}]
+
+
+def test_normalize_sql_keeps_literals():
+    assert normalize_sql("SELECT  *\n FROM t WHERE s = 'a  b';") == "SELECT * FROM t WHERE s = 'a  b'"
+    assert cache_key("SELECT 1", {"a": 1}) == cache_key(" SELECT   1 ;", {"a": 1})
+    assert cache_key("SELECT 1", {"a": 1}) != cache_key("SELECT 1", {"a": 2})
+    assert cache_key("SELECT 1", namespace="10:10") != cache_key("SELECT 1", namespace="20:10")
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResultCache(max_bytes=1024, default_ttl=60)
+    cache.put("k", [1], ttl=10)
+    assert cache.get("k") == (True, [1])
+    clock.now += 9.9
+    assert cache.get("k") == (True, [1])
+    clock.now += 0.2
+    assert cache.get("k") == (False, None)
+    assert cache.stats()["entries"] == 0
+    assert cache.total_bytes == 0
+
+
+def test_zero_ttl_and_oversized_values_are_not_cached(clock):
+    cache = ResultCache(max_bytes=16, default_ttl=60)
+    cache.put("zero", [1], ttl=0)
+    cache.put("big", ["x" * 100], ttl=60)
+    assert cache.get("zero") == (False, None)
+    assert cache.get("big") == (False, None)
+    assert cache.total_bytes == 0
+
+
+def test_least_recently_used_is_evicted_first(clock):
+    size = estimate_size(["aaaa"])
+    cache = ResultCache(max_bytes=size * 3, default_ttl=60)
+    for key in ("a", "b", "c"):
+        cache.put(key, [key * 4], ttl=60)
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a")[0]
+    cache.put("d", ["dddd"], ttl=60)
+    assert cache.get("b") == (False, None)
+    assert [cache.get(key)[0] for key in ("a", "c", "d")] == [True, True, True]
+    assert cache.total_bytes == size * 3
+
+
+def test_concurrent_misses_share_one_load(clock):
+    async def run():
+        cache = ResultCache(max_bytes=1024, default_ttl=60)
+        gate = asyncio.Event()
+        loader = Loader(gate)
+        tasks = [asyncio.create_task(cache.get_or_load("k", loader)) for _ in range(5)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*tasks)
+        return cache, loader, results
+
+    cache, loader, results = asyncio.run(run())
+    assert loader.calls == 1
+    assert results == [[{"n": 1}]] * 5
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 4
+
+
+def test_hit_within_ttl_and_reload_after(clock):
+    async def run():
+        cache = ResultCache(max_bytes=1024, default_ttl=60)
+        loader = Loader()
+        first = await cache.get_or_load("k", loader, ttl=5)
+        second = await cache.get_or_load("k", loader, ttl=5)
+        clock.now += 6
+        third = await cache.get_or_load("k", loader, ttl=5)
+        return first, second, third
+
+    assert asyncio.run(run()) == ([{"n": 1}], [{"n": 1}], [{"n": 2}])
+
+
+def test_bypass_reloads_and_refreshes(clock):
+    async def run():
+        cache = ResultCache(max_bytes=1024, default_ttl=60)
+        loader = Loader()
+        await cache.get_or_load("k", loader)
+        bypassed = await cache.get_or_load("k", loader, bypass=True)
+        cached = await cache.get_or_load("k", loader)
+        return loader.calls, bypassed, cached
+
+    assert asyncio.run(run()) == (2, [{"n": 2}], [{"n": 2}])
+
+
+def test_failed_load_reaches_waiters_and_is_not_cached(clock):
+    async def run():
+        cache = ResultCache(max_bytes=1024, default_ttl=60)
+        gate = asyncio.Event()
+
+        async def failing():
+            await gate.wait()
+            raise RuntimeError("boom")
+
+        tasks = [asyncio.create_task(cache.get_or_load("k", failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return cache, results
+
+    cache, results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.get("k") == (False, None)
+
+
+def test_use_primary_skips_results_cached_from_the_replica(clock):
+    tool = DBTool({
+        "dsn": "postgresql://agent@primary/db",
+        "replica_dsn": "postgresql://agent@replica/db",
+    })
+    served_by = []
+
+    async def run_cancellable(func, engine, cancel_engine, timeout, *args):
+        served_by.append(engine.url.host)
+        return [{"host": engine.url.host}]
+
+    tool._run_cancellable = run_cancellable
+
+    async def run():
+        payload = {"query": "SELECT * FROM orders"}
+        replica = await tool.execute(payload)
+        cached = await tool.execute(payload)
+        primary = await tool.execute({**payload, "use_primary": True})
+        return replica, cached, primary
+
+    try:
+        replica, cached, primary = asyncio.run(run())
+    finally:
+        tool.close()
+    assert replica == cached == [{"host": "replica"}]
+    assert primary == [{"host": "primary"}]
+    assert served_by == ["replica", "primary"]
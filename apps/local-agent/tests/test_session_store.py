@@ -0,0 +1,48 @@
+"""
+Encrypted web session states and where their key is kept
+"""
+import os
+import stat
+import sys
+
+import pytest
+from cryptography.fernet import Fernet
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+from phi_agent.session_store import SessionStore
+
+STATE = {"cookies": [{"name": "sid", "value": "abc"}], "origins": []}
+
+
+def test_generated_key_lives_outside_the_session_dir(tmp_path):
+    sessions = tmp_path / "sessions"
+    key_path = tmp_path / "config" / "web-state.key"
+    store = SessionStore(str(sessions), key_path=str(key_path))
+    store.save("https://shop.example", "ops", STATE)
+
+    assert stat.S_IMODE(os.stat(key_path).st_mode) == 0o600
+    assert all(name.endswith(".state") for name in os.listdir(sessions))
+    # A new store (e.g. after a restart) reuses the key
+    assert SessionStore(str(sessions), key_path=str(key_path)).load("https://shop.example", "ops") == STATE
+
+
+def test_key_path_inside_the_session_dir_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        SessionStore(str(tmp_path), key_path=str(tmp_path / "nested" / "state.key"))
+
+
+def test_states_from_another_key_are_dropped(tmp_path):
+    SessionStore(str(tmp_path), key=Fernet.generate_key().decode()).save("site", "ops", STATE)
+    other = SessionStore(str(tmp_path), key=Fernet.generate_key().decode())
+    assert other.load("site", "ops") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_expired_states_are_dropped(tmp_path, monkeypatch):
+    key = Fernet.generate_key().decode()
+    SessionStore(str(tmp_path), key=key).save("site", "ops", STATE)
+    later = SessionStore(str(tmp_path), key=key, max_age=60)
+    monkeypatch.setattr("cryptography.fernet.time.time", lambda: 4_000_000_000)
+    assert later.load("site", "ops") is None
@@ -0,0 +1,107 @@
+"""
+Direct downloads: session cookies across redirects, fallback on refusal, file modes
+"""
+import asyncio
+import os
+import stat
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+from phi_agent.tools.web import WebTool
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cookies = self.headers.get("Cookie") or ""
+        if self.path.startswith("/export"):
+            # Same-origin redirect to the file itself
+            self.send_response(302)
+            self.send_header("Location", "/files/orders.csv")
+            self.end_headers()
+        elif self.path == "/files/orders.csv" and "sid=abc" in cookies:
+            body = b"id,qty\n1,2\n"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_response(403 if self.path == "/files/orders.csv" else 404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ExportHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+
+
+class FakeContext:
+    def __init__(self, cookies):
+        self._cookies = cookies
+
+    async def cookies(self, *urls):
+        return self._cookies
+
+
+class FakePage:
+    def __init__(self, url, cookies):
+        self.url = url
+        self.context = FakeContext(cookies)
+
+    async def evaluate(self, expression):
+        return "Mozilla/5.0 (test)"
+
+
+def session_cookie(domain):
+    return {"name": "sid", "value": "abc", "domain": domain, "path": "/", "expires": -1, "secure": False}
+
+
+@pytest.fixture
+def tool():
+    tool = WebTool({"reuse_sessions": False})
+    yield tool
+    asyncio.run(tool.close())
+
+
+@pytest.mark.parametrize("host", ["127.0.0.1", "localhost"])
+def test_cookies_follow_same_origin_redirects(tmp_path, server, tool, host):
+    base = f"http://{host}:{server}"
+    page = FakePage(f"{base}/reports", [session_cookie(host)])
+    target = tmp_path / "orders.csv"
+    previous = os.umask(0o022)
+    try:
+        result = asyncio.run(tool._fetch(page, f"{base}/export?id=7", str(target)))
+    finally:
+        os.umask(previous)
+    assert result["direct"] is True
+    assert target.read_bytes() == b"id,qty\n1,2\n"
+    assert stat.S_IMODE(os.stat(target).st_mode) == 0o644
+
+
+@pytest.mark.parametrize("path", ["/export?id=7", "/missing"])
+def test_refused_requests_fall_back_to_clicking(tmp_path, server, tool, path):
+    base = f"http://127.0.0.1:{server}"
+    # No session cookie: the file answers 403; unknown paths 404
+    page = FakePage(f"{base}/reports", [])
+    assert asyncio.run(tool._fetch(page, f"{base}{path}", str(tmp_path / "orders.csv"))) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_cookies_for_other_hosts_are_not_sent(tmp_path, server, tool):
+    base = f"http://127.0.0.1:{server}"
+    page = FakePage(f"{base}/reports", [session_cookie("other.example")])
+    assert asyncio.run(tool._fetch(page, f"{base}/export?id=7", str(tmp_path / "orders.csv"))) is None
@@ -0,0 +1,102 @@
+"""
+Streaming writers: atomic commit, file modes and Parquet schema handling
+"""
+import json
+import os
+import stat
+import sys
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+from phi_agent.writers import WRITE_FORMATS, open_writer
+
+
+def mode_of(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+@pytest.fixture
+def umask_022():
+    previous = os.umask(0o022)
+    yield
+    os.umask(previous)
+
+
+def write(path, fmt, chunks, **options):
+    with open_writer(path, fmt, options) as writer:
+        for rows in chunks:
+            writer.write_rows(rows)
+        return writer.commit()
+
+
+@pytest.mark.parametrize("fmt", WRITE_FORMATS)
+def test_new_files_follow_the_umask(tmp_path, umask_022, fmt):
+    path = tmp_path / f"out.{fmt}"
+    result = write(path, fmt, [[{"a": 1}], [{"a": 2}]])
+    assert result["rows"] == 2
+    assert mode_of(path) == 0o644
+    # Nothing left behind but the output
+    assert os.listdir(tmp_path) == [path.name]
+
+
+@pytest.mark.parametrize("fmt", WRITE_FORMATS)
+def test_replaced_files_keep_their_mode(tmp_path, umask_022, fmt):
+    path = tmp_path / f"out.{fmt}"
+    path.write_text("old")
+    os.chmod(path, 0o640)
+    write(path, fmt, [[{"a": 1}]])
+    assert mode_of(path) == 0o640
+
+
+def test_failed_write_leaves_the_target_alone(tmp_path):
+    path = tmp_path / "out.ndjson"
+    path.write_text("old\n")
+    with pytest.raises(RuntimeError):
+        with open_writer(path, "ndjson") as writer:
+            writer.write_rows([{"a": 1}])
+            raise RuntimeError("upstream failed")
+    assert path.read_text() == "old\n"
+    assert os.listdir(tmp_path) == ["out.ndjson"]
+
+
+def test_ndjson_append(tmp_path):
+    path = tmp_path / "out.ndjson"
+    write(path, "ndjson", [[{"a": 1}]])
+    write(path, "ndjson", [[{"a": 2}]], mode="append")
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [{"a": 1}, {"a": 2}]
+
+
+def test_parquet_widens_types_before_the_first_row_group(tmp_path):
+    path = tmp_path / "out.parquet"
+    write(path, "parquet", [[{"a": None, "b": 1}], [{"a": "x", "b": 2.5}]])
+    table = pq.read_table(path)
+    assert table.schema.field("a").type == pa.string()
+    assert table.schema.field("b").type == pa.float64()
+    assert table.to_pylist() == [{"a": None, "b": 1.0}, {"a": "x", "b": 2.5}]
+
+
+def test_parquet_refuses_lossy_casts_after_the_first_row_group(tmp_path):
+    path = tmp_path / "out.parquet"
+    with pytest.raises(ValueError, match="truncated"):
+        write(path, "parquet", [[{"b": 1}], [{"b": 2.5}]], row_group_rows=1)
+    with pytest.raises(ValueError, match="all null"):
+        write(path, "parquet", [[{"a": None}], [{"a": "x"}]], row_group_rows=1)
+    assert not path.exists()
+
+
+def test_parquet_explicit_schema(tmp_path):
+    path = tmp_path / "out.parquet"
+    schema = {"a": "string", "b": "float64"}
+    write(path, "parquet", [[{"a": None, "b": 1}], [{"a": "x", "b": 2.5}]], row_group_rows=1, schema=schema)
+    table = pq.read_table(path)
+    assert table.schema.types == [pa.string(), pa.float64()]
+    assert table.num_rows == 2
+    with pytest.raises(ValueError):
+        write(path, "parquet", [[{"a": "x", "b": 2.5}]], schema={"a": "string", "b": "int64"})
+    with pytest.raises(ValueError):
+        write(path, "parquet", [[{"a": 1}]], schema={"a": "no-such-type"})
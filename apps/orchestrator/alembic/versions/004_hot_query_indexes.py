@@ -0,0 +1,42 @@
+"""Add indexes for tool task polling and callbacks
+
+Revision ID: 004_hot_query_indexes
+Revises: 003_add_task_progress
+Create Date: 2024-12-10 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_hot_query_indexes'
+down_revision = '003_add_task_progress'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_tool_tasks_local_agent_id_status', 'tool_tasks', ['local_agent_id', 'status']),
+    ('ix_tool_tasks_task_id_step_id', 'tool_tasks', ['task_id', 'step_id']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
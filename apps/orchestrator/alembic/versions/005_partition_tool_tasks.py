@@ -0,0 +1,91 @@
+"""Partition tool_tasks by month
+
+Revision ID: 005_partition_tool_tasks
+Revises: 004_hot_query_indexes
+Create Date: 2024-12-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from phi_utils.partitions import ensure_monthly_partitions
+
+# revision identifiers, used by Alembic.
+revision = '005_partition_tool_tasks'
+down_revision = '004_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_tool_tasks_local_agent_id_status', ['local_agent_id', 'status']),
+    ('ix_tool_tasks_task_id_step_id', ['task_id', 'step_id']),
+]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # Keep the old table aside while the partitioned one is built
+    op.execute("ALTER TABLE tool_tasks RENAME TO tool_tasks_legacy")
+    op.execute("ALTER TABLE tool_tasks_legacy RENAME CONSTRAINT tool_tasks_pkey TO tool_tasks_legacy_pkey")
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name.replace('tool_tasks', 'tool_tasks_legacy')}")
+
+    # The partition key must be part of the primary key
+    op.execute("""
+        CREATE TABLE tool_tasks (
+            id UUID NOT NULL DEFAULT uuid_generate_v4(),
+            task_id UUID NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+            local_agent_id UUID NOT NULL,
+            step_id VARCHAR NOT NULL,
+            tool_name VARCHAR NOT NULL,
+            payload JSONB NOT NULL,
+            status VARCHAR NOT NULL DEFAULT 'PENDING',
+            result JSONB,
+            error TEXT,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            completed_at TIMESTAMP WITH TIME ZONE,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    for name, columns in INDEXES:
+        op.create_index(name, 'tool_tasks', columns)
+    op.execute("CREATE TABLE tool_tasks_default PARTITION OF tool_tasks DEFAULT")
+
+    oldest = conn.execute(sa.text("SELECT min(created_at) FROM tool_tasks_legacy")).scalar()
+    ensure_monthly_partitions(conn, "tool_tasks", "created_at", months_ahead=3, since=oldest)
+
+    op.execute("""
+        INSERT INTO tool_tasks (id, task_id, local_agent_id, step_id, tool_name, payload,
+                                status, result, error, created_at, completed_at)
+        SELECT id, task_id, local_agent_id, step_id, tool_name, payload,
+               status, result, error, COALESCE(created_at, now()), completed_at
+        FROM tool_tasks_legacy
+    """)
+    op.execute("DROP TABLE tool_tasks_legacy")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE tool_tasks RENAME TO tool_tasks_partitioned")
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name.replace('tool_tasks', 'tool_tasks_partitioned')}")
+    op.create_table(
+        'tool_tasks',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('uuid_generate_v4()')),
+        sa.Column('task_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('local_agent_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('step_id', sa.String(), nullable=False),
+        sa.Column('tool_name', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='PENDING'),
+        sa.Column('result', postgresql.JSONB(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('completed_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+    )
+    op.execute("INSERT INTO tool_tasks SELECT * FROM tool_tasks_partitioned")
+    op.execute("DROP TABLE tool_tasks_partitioned CASCADE")
+    for name, columns in INDEXES:
+        op.create_index(name, 'tool_tasks', columns)
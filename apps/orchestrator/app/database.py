@@ -3,8 +3,10 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
+from phi_utils.db_pool import engine_kwargs, instrument_engine
 
-engine = create_engine(settings.database_url)
+engine = create_engine(settings.database_url, **engine_kwargs(settings))
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
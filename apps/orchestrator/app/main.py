@@ -7,24 +7,33 @@ shared_utils_path = os.path.join(base_dir, 'packages', 'shared-utils')
 if os.path.exists(shared_utils_path) and shared_utils_path not in sys.path:
     sys.path.insert(0, shared_utils_path)
 
-from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from uuid import UUID
+from typing import Optional
 from datetime import datetime, timedelta
 import asyncio
 
+from app.config import settings
 from app.database import get_db, engine, Base
-from app.models import Task, TaskEvent, LocalAgent, ToolTask, TaskMetrics
+from app.models import Task, TaskEvent, ToolTask, TaskMetrics
 from app.schemas import (
     TaskCreate, TaskResponse, TaskDetailResponse, TaskEventResponse,
-    HeartbeatRequest, HeartbeatResponse, ToolCallbackRequest,
+    HeartbeatRequest, HeartbeatResponse, ToolCallbackRequest, ToolChunkRequest,
     PendingTasksResponse, PendingTaskResponse
 )
 from app.services.core_api_client import core_api_client
+from app.services.blobs import get_blob_store, offload_large_fields
+from app.services.heartbeats import heartbeat_tracker
+from app.services.tool_router import tool_router, TERMINAL_STATUSES
+from app.services.tool_chunks import MissingChunksError, write_chunk, finalize_chunks, discard_chunks
 from app.workflows.warehouse_report import create_warehouse_report_workflow
 from phi_utils.logging import setup_logging, ContextLogger
 from phi_utils.retry import retry_async
+from phi_utils.db_pool import pool_stats, render_prometheus
+from phi_utils.blob_store import BlobNotFoundError, validate_digest
 
 # Set up structured logging
 logger = setup_logging("orchestrator")
@@ -135,7 +144,8 @@ async def execute_workflow(task_id: UUID, agent_id: UUID, org_id: UUID, task_typ
                 ctx_logger.error(f"Workflow failed: {final_state['error']}")
             else:
                 task.status = "SUCCESS"
-                task.output = final_state.get("report", {})
+                # Compression and blob writes stay off the event loop
+                task.output = await asyncio.to_thread(offload_large_fields, final_state.get("report", {}))
                 task.progress = 100  # Mark as complete
                 task.current_step = None
                 task.eta_seconds = None
@@ -338,7 +348,11 @@ async def get_task(
             detail="Task not found"
         )
     
-    events = db.query(TaskEvent).filter(TaskEvent.task_id == task_uuid).order_by(TaskEvent.timestamp).all()
+    # Lower bound on the partition key keeps the lookup to recent partitions
+    events = db.query(TaskEvent).filter(
+        TaskEvent.task_id == task_uuid,
+        TaskEvent.timestamp >= task.created_at
+    ).order_by(TaskEvent.timestamp).all()
     
     return TaskDetailResponse(
         id=task.id,
@@ -372,12 +386,100 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/internal/metrics/db-pool")
+async def db_pool_metrics(format: str = "json"):
+    """Connection pool gauges: checked out, overflow and checkout wait times
+    
+    The max wait is windowed per Prometheus scrape; JSON reads never reset it.
+    """
+    prometheus = format.lower() == "prometheus"
+    stats = {"sync": pool_stats(engine, reset_max=prometheus)}
+    if prometheus:
+        from fastapi.responses import PlainTextResponse
+        return PlainTextResponse(render_prometheus("orchestrator", stats))
+    return stats
+
+
+def _parse_range(header: str, size: int):
+    """Parse a single 'bytes=start-end' range; returns (start, end) inclusive or None if unsatisfiable"""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                return None
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+@app.get("/blobs/{digest}")
+async def get_blob(digest: str, request: Request):
+    """Stream an offloaded output or result (supports single byte-range requests)"""
+    from fastapi.responses import Response, StreamingResponse
+    
+    try:
+        validate_digest(digest)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid blob digest"
+        )
+    
+    store = get_blob_store()
+    try:
+        size = store.size(digest)
+    except BlobNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Blob not found"
+        )
+    
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{digest}"',
+        # Content-addressed, so a digest's bytes never change
+        "Cache-Control": "private, max-age=31536000, immutable",
+    }
+    range_header = request.headers.get("range")
+    if range_header:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+        start, end = byte_range
+        return StreamingResponse(
+            store.iter_range(digest, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type="application/octet-stream",
+            headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)}
+        )
+    
+    return StreamingResponse(
+        store.iter_range(digest),
+        media_type="application/octet-stream",
+        headers={**headers, "Content-Length": str(size)}
+    )
+
+
 @app.post("/local-agents/heartbeat", response_model=HeartbeatResponse)
-async def heartbeat(
-    request: HeartbeatRequest,
-    db: Session = Depends(get_db)
-):
-    """Register or update local agent heartbeat"""
+async def heartbeat(request: HeartbeatRequest):
+    """Register or update local agent heartbeat
+    
+    Absorbed in memory; local_agents is only written in periodic bulk flushes
+    when status or capabilities change (new registrations are written at once).
+    """
     ctx_logger = ContextLogger(
         logger,
         agent_id=request.agent_id,
@@ -394,49 +496,46 @@ async def heartbeat(
             detail="Invalid agent_id or org_id"
         )
     
-    # Find or create local agent
+    local_agent_uuid = None
     if request.local_agent_id:
         try:
             local_agent_uuid = UUID(request.local_agent_id)
-            local_agent = db.query(LocalAgent).filter(LocalAgent.id == local_agent_uuid).first()
         except ValueError:
-            local_agent = None
-    else:
-        local_agent = None
-    
-    if not local_agent:
-        # Create new local agent
-        local_agent = LocalAgent(
-            agent_id=agent_uuid,
-            org_id=org_uuid,
-            name=request.name,
-            status=request.status,
-            extra_metadata=request.capabilities
-        )
-        db.add(local_agent)
-    else:
-        # Update existing
-        local_agent.status = request.status
-        local_agent.last_heartbeat_at = datetime.utcnow()
-        local_agent.extra_metadata = request.capabilities
+            local_agent_uuid = None
     
-    db.commit()
-    db.refresh(local_agent)
+    entry, is_new = heartbeat_tracker.record(
+        local_agent_uuid,
+        agent_uuid,
+        org_uuid,
+        request.name,
+        request.status,
+        request.capabilities,
+        request.load
+    )
     
-    ctx_logger.info(f"Local agent heartbeat: {local_agent.status}")
+    if is_new:
+        await asyncio.to_thread(heartbeat_tracker.register_now, entry)
+        ctx_logger.info(f"Local agent registered: {entry.id}")
     
     return HeartbeatResponse(
-        id=str(local_agent.id),
-        status=local_agent.status
+        id=str(entry.id),
+        status=entry.status,
+        result_encodings=settings.tool_result_encodings
     )
 
 
 @app.get("/local-agents/{local_agent_id}/pending-tasks", response_model=PendingTasksResponse)
 async def get_pending_tasks(
     local_agent_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Claim at most this many (agent's free capacity)"),
     db: Session = Depends(get_db)
 ):
-    """Get pending tool tasks for a local agent"""
+    """Claim pending tool tasks for a local agent
+    
+    Returned tasks move to RUNNING so they are handed out once; the router
+    fails over tasks that stay PENDING past the ack timeout. Unclaimed tasks
+    beyond limit stay PENDING for the next poll (or another agent).
+    """
     try:
         local_agent_uuid = UUID(local_agent_id)
     except ValueError:
@@ -445,17 +544,36 @@ async def get_pending_tasks(
             detail="Invalid local agent ID"
         )
     
-    # Get pending tool tasks
-    tool_tasks = db.query(ToolTask).filter(
-        ToolTask.local_agent_id == local_agent_uuid,
-        ToolTask.status == "PENDING"
+    # Claim pending tool tasks atomically, oldest first
+    claimable = (
+        select(ToolTask.id)
+        .where(
+            ToolTask.local_agent_id == local_agent_uuid,
+            ToolTask.status == "PENDING"
+        )
+        .order_by(ToolTask.created_at)
+        .with_for_update(skip_locked=True)
+    )
+    if limit:
+        claimable = claimable.limit(limit)
+    tool_tasks = db.execute(
+        update(ToolTask)
+        .where(
+            ToolTask.id.in_(claimable),
+            ToolTask.local_agent_id == local_agent_uuid,
+            ToolTask.status == "PENDING"
+        )
+        .values(status="RUNNING")
+        .returning(ToolTask.id, ToolTask.task_id, ToolTask.step_id, ToolTask.tool_name, ToolTask.payload)
     ).all()
+    db.commit()
     
     return PendingTasksResponse(
         tasks=[
             PendingTaskResponse(
                 task_tool_id=str(tt.id),
                 task_id=str(tt.task_id),
+                step_id=tt.step_id,
                 tool=tt.tool_name,
                 payload=tt.payload
             )
@@ -464,6 +582,19 @@ async def get_pending_tasks(
     )
 
 
+def reject_foreign_sender(tool_task: ToolTask, local_agent_id: str) -> None:
+    """Only the agent a tool task is assigned to may report on it
+    
+    After a failover the previous agent may still be running the task; its
+    late results and chunks must not complete or mix into the new attempt.
+    """
+    if str(tool_task.local_agent_id) != local_agent_id:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Tool task is assigned to another local agent"
+        )
+
+
 @app.post("/tool-callbacks")
 async def tool_callback(
     callback: ToolCallbackRequest,
@@ -484,11 +615,20 @@ async def tool_callback(
             detail="Invalid task ID"
         )
     
-    # Find tool task
-    tool_task = db.query(ToolTask).filter(
-        ToolTask.task_id == task_uuid,
-        ToolTask.step_id == callback.step_id
-    ).first()
+    # Find tool task (by id when the agent sends it, else by step)
+    query = db.query(ToolTask).filter(ToolTask.task_id == task_uuid)
+    if callback.task_tool_id:
+        try:
+            query = query.filter(ToolTask.id == UUID(callback.task_tool_id))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid task tool ID"
+            )
+    else:
+        query = query.filter(ToolTask.step_id == callback.step_id)
+    # Row lock: a concurrent failover waits until this result is recorded (or rejected)
+    tool_task = query.with_for_update().first()
     
     if not tool_task:
         raise HTTPException(
@@ -496,16 +636,36 @@ async def tool_callback(
             detail="Tool task not found"
         )
     
+    if tool_task.status in TERMINAL_STATUSES:
+        # Late result from an agent the task was failed over from
+        ctx_logger.info(f"Ignoring duplicate callback for tool task {tool_task.id}")
+        return {"status": "ignored"}
+    reject_foreign_sender(tool_task, callback.local_agent_id)
+    
     # Update tool task
     if callback.error:
         tool_task.status = "FAILED"
         tool_task.error = callback.error
+        # Drop any chunks spilled before the failure, whether or not the agent counted them
+        await asyncio.to_thread(discard_chunks, tool_task.id)
+    elif callback.chunk_count is not None:
+        # Streamed result: the rows arrived as chunks and become one NDJSON blob
+        try:
+            rows_ref = await asyncio.to_thread(finalize_chunks, tool_task.id, tool_task.local_agent_id, callback.chunk_count)
+            tool_task.status = "COMPLETED"
+            summary = await asyncio.to_thread(offload_large_fields, callback.result or {})
+            tool_task.result = {**summary, "rows": rows_ref}
+        except MissingChunksError as e:
+            await asyncio.to_thread(discard_chunks, tool_task.id)
+            tool_task.status = "FAILED"
+            tool_task.error = str(e)
     else:
         tool_task.status = "COMPLETED"
-        tool_task.result = callback.result
+        tool_task.result = await asyncio.to_thread(offload_large_fields, callback.result)
     tool_task.completed_at = datetime.utcnow()
     
     db.commit()
+    tool_router.complete(tool_task.local_agent_id, tool_task.id)
     
     # Log event
     event = TaskEvent(
@@ -525,7 +685,50 @@ async def tool_callback(
     return {"status": "ok"}
 
 
+@app.post("/tool-callbacks/chunks")
+async def tool_callback_chunk(
+    chunk: ToolChunkRequest,
+    db: Session = Depends(get_db)
+):
+    """Receive one sequenced chunk of a streamed tool result"""
+    try:
+        task_uuid = UUID(chunk.task_id)
+        tool_task_uuid = UUID(chunk.task_tool_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid task or task tool ID"
+        )
+    if chunk.seq < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Chunk seq must be non-negative"
+        )
+    
+    tool_task = db.query(ToolTask).filter(
+        ToolTask.task_id == task_uuid,
+        ToolTask.id == tool_task_uuid
+    ).first()
+    if not tool_task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tool task not found"
+        )
+    if tool_task.status in TERMINAL_STATUSES:
+        return {"status": "ignored"}
+    reject_foreign_sender(tool_task, chunk.local_agent_id)
+    
+    rows = await asyncio.to_thread(write_chunk, tool_task.id, tool_task.local_agent_id, chunk.seq, chunk.rows)
+    return {"status": "ok", "seq": chunk.seq, "rows": rows}
+
+
+@app.on_event("startup")
+async def startup():
+    heartbeat_tracker.start()
+
+
 @app.on_event("shutdown")
 async def shutdown():
+    await heartbeat_tracker.stop()
     await core_api_client.close()
 
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, ForeignKey, TIMESTAMP, Integer, Float
+from sqlalchemy import Column, String, Text, ForeignKey, TIMESTAMP, Integer, Float, Index, DDL, event
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 
@@ -9,6 +9,14 @@ from app.database import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_status", "status"),
+        # Keyset pagination on (created_at, id), optionally behind an equality filter
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_org_id_created_at_id", "org_id", "created_at", "id"),
+        Index("ix_tasks_agent_id_created_at_id", "agent_id", "created_at", "id"),
+        Index("ix_tasks_status_created_at_id", "status", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     agent_id = Column(UUID(as_uuid=True), nullable=False)
@@ -30,11 +38,16 @@ class Task(Base):
 
 
 class TaskEvent(Base):
+    """Range-partitioned by month on timestamp (see core-api migration 008)"""
     __tablename__ = "task_events"
+    __table_args__ = (
+        Index("ix_task_events_task_id_timestamp", "task_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     task_id = Column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
-    timestamp = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    timestamp = Column(TIMESTAMP(timezone=True), primary_key=True, default=datetime.utcnow)
     event_type = Column(String, nullable=False)
     payload = Column(JSONB)
 
@@ -42,8 +55,18 @@ class TaskEvent(Base):
     task = relationship("Task", back_populates="events")
 
 
+event.listen(
+    TaskEvent.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS task_events_default PARTITION OF task_events DEFAULT")
+)
+
+
 class LocalAgent(Base):
     __tablename__ = "local_agents"
+    __table_args__ = (
+        Index("ix_local_agents_agent_id_status", "agent_id", "status"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     agent_id = Column(UUID(as_uuid=True), nullable=False)
@@ -55,8 +78,13 @@ class LocalAgent(Base):
 
 
 class ToolTask(Base):
-    """Pending tool tasks for local agents"""
+    """Pending tool tasks for local agents, range-partitioned by month on created_at"""
     __tablename__ = "tool_tasks"
+    __table_args__ = (
+        Index("ix_tool_tasks_local_agent_id_status", "local_agent_id", "status"),
+        Index("ix_tool_tasks_task_id_step_id", "task_id", "step_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     task_id = Column(UUID(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
@@ -67,13 +95,20 @@ class ToolTask(Base):
     status = Column(String, nullable=False, default="PENDING")  # PENDING, COMPLETED, FAILED
     result = Column(JSONB)
     error = Column(Text)
-    created_at = Column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    created_at = Column(TIMESTAMP(timezone=True), primary_key=True, default=datetime.utcnow)
     completed_at = Column(TIMESTAMP(timezone=True))
 
     # Relationships
     task = relationship("Task", back_populates="tool_tasks")
 
 
+event.listen(
+    ToolTask.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS tool_tasks_default PARTITION OF tool_tasks DEFAULT")
+)
+
+
 class TaskMetrics(Base):
     """Basic metrics table for task performance tracking"""
     __tablename__ = "task_metrics"
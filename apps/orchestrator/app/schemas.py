@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from uuid import UUID
 from pydantic import BaseModel
 
@@ -50,24 +50,43 @@ class HeartbeatRequest(BaseModel):
     name: str
     capabilities: Dict[str, Any]
     status: str = "ACTIVE"
+    # Optional load report: {"in_flight": int, "latency_ms": {tool: ewma_ms}}
+    load: Optional[Dict[str, Any]] = None
 
 
 class HeartbeatResponse(BaseModel):
     id: str
     status: str
+    # Encodings the agent may use for tabular tool results
+    result_encodings: List[str] = []
 
 
 class ToolCallbackRequest(BaseModel):
     task_id: str
+    # Preferred: identifies the exact tool task (a step may be retried on another agent)
+    task_tool_id: Optional[str] = None
     step_id: str
     tool_name: str
     result: Optional[Any] = None
     error: Optional[str] = None
+    # Set when the result rows were streamed via /tool-callbacks/chunks
+    chunk_count: Optional[int] = None
+    # Sender; must be the agent the tool task is currently assigned to
+    local_agent_id: str
+
+
+class ToolChunkRequest(BaseModel):
+    task_id: str
+    task_tool_id: str
+    local_agent_id: str
+    seq: int
+    rows: List[Any]
 
 
 class PendingTaskResponse(BaseModel):
     task_tool_id: str
     task_id: str
+    step_id: Optional[str] = None
     tool: str
     payload: Dict[str, Any]
 
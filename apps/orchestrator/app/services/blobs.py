@@ -0,0 +1,87 @@
+"""
+Blob store for oversized task outputs and tool results
+"""
+from typing import Any, Collection, Dict, Optional, Set
+
+from sqlalchemy import text
+
+from phi_utils.blob_store import BlobStore, create_blob_store, offload_fields, resolve_fields, sweep_blobs
+from phi_utils.logging import setup_logging
+
+from app.config import settings
+
+logger = setup_logging("orchestrator.blobs")
+
+_blob_store: Optional[BlobStore] = None
+
+# JSONB columns holding offload_fields values: the value itself or any top-level field may be a ref
+BLOB_COLUMNS = (("tasks", "output"), ("tool_tasks", "result"))
+
+
+def get_blob_store() -> BlobStore:
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = create_blob_store(settings.blob_store_backend, settings.blob_store_path)
+    return _blob_store
+
+
+def offload_large_fields(value: Any) -> Any:
+    """Move top-level fields above the size threshold out of the row into the blob store"""
+    if value is None:
+        return None
+    return offload_fields(value, get_blob_store(), settings.blob_offload_threshold_bytes)
+
+
+def digests_sql(table: str, column: str) -> str:
+    """SELECT of every blob digest referenced by table.column"""
+    return f"""
+        SELECT {column} -> 'blob_ref' ->> 'sha256' AS digest FROM {table}
+        WHERE jsonb_typeof({column}) = 'object' AND {column} ? 'blob_ref'
+        UNION
+        SELECT field.value -> 'blob_ref' ->> 'sha256' FROM {table},
+            jsonb_each(CASE WHEN jsonb_typeof({column}) = 'object' THEN {column} ELSE '{{}}'::jsonb END) AS field
+        WHERE jsonb_typeof(field.value) = 'object' AND field.value ? 'blob_ref'
+    """
+
+
+def referenced_digests(conn, digests: Optional[Collection[str]] = None) -> Set[str]:
+    """Digests still referenced by any row (limited to digests when given)"""
+    found: Set[str] = set()
+    for table, column in BLOB_COLUMNS:
+        query = f"SELECT digest FROM ({digests_sql(table, column)}) refs WHERE digest IS NOT NULL"
+        params = {}
+        if digests is not None:
+            query += " AND digest = ANY(:digests)"
+            params["digests"] = list(digests)
+        found.update(conn.execute(text(query), params).scalars())
+    return found
+
+
+def release_blobs(conn, digests: Collection[str]) -> int:
+    """Delete blobs whose referencing rows are gone; returns the number deleted"""
+    if not digests:
+        return 0
+    live = referenced_digests(conn, digests)
+    return sweep_blobs(get_blob_store(), digests, live, settings.blob_gc_grace_seconds)
+
+
+def run_blob_gc(conn) -> Dict[str, int]:
+    """Mark-and-sweep: delete every blob no task output or tool result references
+    
+    Covers blobs left behind by deleted tasks and dropped partitions. The
+    grace period protects blobs whose rows were not yet committed when the
+    references were read.
+    """
+    store = get_blob_store()
+    live = referenced_digests(conn)
+    candidates = list(store.iter_digests())
+    deleted = sweep_blobs(store, candidates, live, settings.blob_gc_grace_seconds)
+    logger.info(f"Blob GC: {len(candidates)} blobs, {len(live)} referenced, {deleted} deleted")
+    return {"blobs": len(candidates), "referenced": len(live), "deleted": deleted}
+
+
+def resolve_large_fields(value: Any) -> Any:
+    """Load blob references written by offload_large_fields back into the value"""
+    if value is None:
+        return None
+    return resolve_fields(value, get_blob_store())
@@ -0,0 +1,251 @@
+"""
+Write-coalescing heartbeat ingestion for local agents
+Heartbeats update an in-memory liveness table; a background loop flushes only
+changed agents to local_agents in one bulk UPSERT and marks stale agents OFFLINE
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import LocalAgent
+from phi_utils.logging import setup_logging
+
+logger = setup_logging("orchestrator.heartbeats")
+
+OFFLINE = "OFFLINE"
+
+
+def _capabilities_hash(capabilities: Optional[Dict[str, Any]]) -> str:
+    encoded = json.dumps(capabilities or {}, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()
+
+
+@dataclass
+class AgentLiveness:
+    id: UUID
+    agent_id: UUID
+    org_id: UUID
+    name: str
+    status: str
+    capabilities: Dict[str, Any]
+    capabilities_hash: str
+    last_seen: datetime
+    # Reported load; used for routing only, never persisted
+    in_flight: int = 0
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    # What local_agents currently holds, as far as this process knows
+    persisted_status: Optional[str] = None
+    persisted_capabilities_hash: Optional[str] = None
+    persisted_heartbeat_at: Optional[datetime] = None
+
+    def needs_write(self, now: datetime, persist_interval: timedelta) -> bool:
+        if self.status != self.persisted_status:
+            return True
+        if self.capabilities_hash != self.persisted_capabilities_hash:
+            return True
+        if self.status == OFFLINE:
+            return False
+        # last_heartbeat_at is only refreshed coarsely so readers still see a recent value
+        return self.persisted_heartbeat_at is None or now - self.persisted_heartbeat_at >= persist_interval
+
+
+class HeartbeatTracker:
+    """In-memory liveness for local agents with periodic bulk flushes
+
+    Each orchestrator replica tracks the agents that heartbeat to it. The
+    database-level sweep allows for the coarse last_heartbeat_at, so agents
+    owned by another replica are never marked OFFLINE early.
+    """
+
+    def __init__(self):
+        self._agents: Dict[UUID, AgentLiveness] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.flush_interval = settings.heartbeat_flush_interval_seconds
+        self.stale_after = timedelta(seconds=settings.heartbeat_stale_after_seconds)
+        self.persist_interval = timedelta(seconds=settings.heartbeat_persist_interval_seconds)
+
+    def record(
+        self,
+        local_agent_id: Optional[UUID],
+        agent_id: UUID,
+        org_id: UUID,
+        name: str,
+        status: str,
+        capabilities: Dict[str, Any],
+        load: Optional[Dict[str, Any]] = None
+    ) -> Tuple[AgentLiveness, bool]:
+        """Absorb a heartbeat; returns the entry and whether it is a new registration"""
+        now = datetime.now(timezone.utc)
+        capabilities_hash = _capabilities_hash(capabilities)
+        with self._lock:
+            entry = self._agents.get(local_agent_id) if local_agent_id else None
+            if entry is None:
+                is_new = local_agent_id is None
+                entry = AgentLiveness(
+                    id=local_agent_id or uuid.uuid4(),
+                    agent_id=agent_id,
+                    org_id=org_id,
+                    name=name,
+                    status=status,
+                    capabilities=capabilities,
+                    capabilities_hash=capabilities_hash,
+                    last_seen=now
+                )
+                self._agents[entry.id] = entry
+                self._apply_load(entry, load)
+                return entry, is_new
+
+            self._apply_load(entry, load)
+            entry.last_seen = now
+            entry.status = status
+            entry.name = name
+            if capabilities_hash != entry.capabilities_hash:
+                entry.capabilities = capabilities
+                entry.capabilities_hash = capabilities_hash
+            return entry, False
+
+    @staticmethod
+    def _apply_load(entry: AgentLiveness, load: Optional[Dict[str, Any]]) -> None:
+        if not load:
+            return
+        entry.in_flight = int(load.get("in_flight") or 0)
+        entry.latency_ms = dict(load.get("latency_ms") or {})
+
+    def get(self, local_agent_id: UUID) -> Optional[AgentLiveness]:
+        with self._lock:
+            return self._agents.get(local_agent_id)
+
+    def snapshot(self) -> List[AgentLiveness]:
+        with self._lock:
+            return list(self._agents.values())
+
+    def _sweep_stale(self, now: datetime) -> int:
+        stale = 0
+        with self._lock:
+            for entry_id, entry in list(self._agents.items()):
+                if entry.status == OFFLINE and entry.persisted_status == OFFLINE:
+                    # Already recorded as offline; a new heartbeat re-adds it
+                    del self._agents[entry_id]
+                elif entry.status != OFFLINE and now - entry.last_seen > self.stale_after:
+                    entry.status = OFFLINE
+                    stale += 1
+        return stale
+
+    def _pending_writes(self, now: datetime) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "id": entry.id,
+                    "agent_id": entry.agent_id,
+                    "org_id": entry.org_id,
+                    "name": entry.name,
+                    "status": entry.status,
+                    "extra_metadata": entry.capabilities,
+                    "last_heartbeat_at": entry.last_seen,
+                    "_capabilities_hash": entry.capabilities_hash,
+                }
+                for entry in self._agents.values()
+                if entry.needs_write(now, self.persist_interval)
+            ]
+
+    def _mark_persisted(self, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for row in rows:
+                entry = self._agents.get(row["id"])
+                if entry is None:
+                    continue
+                entry.persisted_status = row["status"]
+                entry.persisted_capabilities_hash = row["_capabilities_hash"]
+                entry.persisted_heartbeat_at = row["last_heartbeat_at"]
+
+    def write_rows(self, db, rows: List[Dict[str, Any]]) -> None:
+        """Bulk UPSERT the given liveness rows into local_agents"""
+        if not rows:
+            return
+        stmt = insert(LocalAgent)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LocalAgent.id],
+            set_={
+                "name": stmt.excluded.name,
+                "status": stmt.excluded.status,
+                "extra_metadata": stmt.excluded.extra_metadata,
+                "last_heartbeat_at": stmt.excluded.last_heartbeat_at,
+            }
+        )
+        db.execute(stmt, [{k: v for k, v in row.items() if not k.startswith("_")} for row in rows])
+        db.commit()
+        self._mark_persisted(rows)
+
+    def register_now(self, entry: AgentLiveness) -> None:
+        """Write a brand-new registration through immediately so its id is usable at once"""
+        now = datetime.now(timezone.utc)
+        rows = [row for row in self._pending_writes(now) if row["id"] == entry.id]
+        db = SessionLocal()
+        try:
+            self.write_rows(db, rows)
+        finally:
+            db.close()
+
+    def flush(self) -> Dict[str, int]:
+        """Sweep stale agents and write every changed entry in one statement"""
+        now = datetime.now(timezone.utc)
+        stale = self._sweep_stale(now)
+        rows = self._pending_writes(now)
+
+        db = SessionLocal()
+        try:
+            self.write_rows(db, rows)
+            # Agents no replica has heard from (e.g. after a restart). Live agents refresh
+            # last_heartbeat_at at least every persist interval, so they never fall behind this cutoff
+            cutoff = now - self.stale_after - self.persist_interval
+            swept = db.execute(
+                update(LocalAgent).where(
+                    LocalAgent.status != OFFLINE,
+                    LocalAgent.last_heartbeat_at < cutoff
+                ).values(status=OFFLINE)
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+
+        if rows or stale or swept:
+            logger.info(f"Heartbeat flush: {len(rows)} written, {stale} stale in memory, {swept} swept in database")
+        return {"written": len(rows), "stale": stale, "swept": swept}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Heartbeat flush failed: {e}", exc_info=True)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Persist whatever is still pending before shutdown
+        await asyncio.to_thread(self.flush)
+
+
+heartbeat_tracker = HeartbeatTracker()
@@ -0,0 +1,79 @@
+"""
+Retention for the time-partitioned tool_tasks table
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import text
+
+from phi_utils.logging import setup_logging
+from phi_utils.partitions import drop_partition, ensure_monthly_partitions, expired_partitions
+
+from app.config import settings
+from app.services.blobs import digests_sql, release_blobs
+
+logger = setup_logging("orchestrator.retention")
+
+TERMINAL_STATUSES = ("COMPLETED", "FAILED")
+
+
+def has_active_tool_tasks(conn, partition: str) -> bool:
+    return conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {partition} WHERE status <> ALL(:terminal))"),
+        {"terminal": list(TERMINAL_STATUSES)}
+    ).scalar()
+
+
+def partition_blob_digests(conn, partition: str) -> Set[str]:
+    rows = conn.execute(text(f"SELECT digest FROM ({digests_sql(partition, 'result')}) refs")).scalars()
+    return {digest for digest in rows if digest}
+
+
+def run_tool_tasks_retention(
+    conn,
+    retention_days: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Premake future tool_tasks partitions and drop the expired ones
+
+    A partition that still holds PENDING or RUNNING tool tasks is skipped until
+    a later run. Blobs referenced only by dropped rows are deleted afterwards.
+    """
+    now = now or datetime.now(timezone.utc)
+    retention_days = retention_days if retention_days is not None else settings.tool_tasks_retention_days
+    cutoff = now - timedelta(days=retention_days)
+    
+    with conn.begin():
+        created = ensure_monthly_partitions(
+            conn, "tool_tasks", "created_at",
+            months_ahead=settings.partition_premake_months, now=now
+        )
+    
+    dropped, skipped = [], []
+    orphaned: Set[str] = set()
+    with conn.begin():
+        expired = expired_partitions(conn, "tool_tasks", cutoff)
+    for partition in expired:
+        with conn.begin():
+            # Blocks writes to the partition until it is dropped
+            conn.execute(text(f"LOCK TABLE {partition} IN SHARE MODE"))
+            if has_active_tool_tasks(conn, partition):
+                logger.warning(f"Keeping tool_tasks partition {partition}: it still has unfinished tool tasks")
+                skipped.append(partition)
+                continue
+            digests = partition_blob_digests(conn, partition)
+            drop_partition(conn, "tool_tasks", partition)
+        orphaned.update(digests)
+        logger.info(f"Dropped tool_tasks partition {partition}")
+        dropped.append(partition)
+    
+    with conn.begin():
+        blobs_deleted = release_blobs(conn, orphaned)
+    
+    return {
+        "created": created,
+        "dropped": dropped,
+        "skipped": skipped,
+        "blobs_deleted": blobs_deleted,
+        "cutoff": cutoff.isoformat()
+    }
@@ -0,0 +1,87 @@
+"""
+Chunked delivery of large tool results
+Agents stream result rows in sequenced chunks; each chunk is spilled to disk as
+NDJSON and the completion callback concatenates them into one blob, so neither
+side ever holds the whole result in memory. Chunks are kept per sending
+agent, so a task failed over mid-stream never mixes rows from two attempts
+"""
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Iterator, List
+from uuid import UUID
+
+from phi_utils.blob_store import BLOB_REF_KEY, NDJSON_CONTENT_TYPE
+
+from app.config import settings
+from app.services.blobs import get_blob_store
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class MissingChunksError(ValueError):
+    pass
+
+
+def _spill_dir(tool_task_id: UUID) -> str:
+    return os.path.join(settings.tool_chunk_spill_path, str(tool_task_id))
+
+
+def _attempt_dir(tool_task_id: UUID, local_agent_id: UUID) -> str:
+    return os.path.join(_spill_dir(tool_task_id), str(local_agent_id))
+
+
+def _chunk_path(tool_task_id: UUID, local_agent_id: UUID, seq: int) -> str:
+    return os.path.join(_attempt_dir(tool_task_id, local_agent_id), f"{seq:08d}.ndjson")
+
+
+def write_chunk(tool_task_id: UUID, local_agent_id: UUID, seq: int, rows: List[Any]) -> int:
+    """Spill one chunk atomically; a retried chunk simply overwrites itself"""
+    if seq < 0:
+        raise ValueError("Chunk seq must be non-negative")
+    directory = _attempt_dir(tool_task_id, local_agent_id)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str))
+                f.write("\n")
+        os.replace(tmp_path, _chunk_path(tool_task_id, local_agent_id, seq))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(rows)
+
+
+def _iter_files(paths: List[str]) -> Iterator[bytes]:
+    for path in paths:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+
+def finalize_chunks(tool_task_id: UUID, local_agent_id: UUID, chunk_count: int) -> Dict[str, Any]:
+    """Concatenate local_agent_id's chunks 0..chunk_count-1 into one NDJSON blob
+    
+    Spill files of every attempt are dropped afterwards.
+    """
+    paths = [_chunk_path(tool_task_id, local_agent_id, seq) for seq in range(chunk_count)]
+    missing = [seq for seq, path in enumerate(paths) if not os.path.exists(path)]
+    if missing:
+        raise MissingChunksError(f"Missing result chunks {missing[:10]} of {chunk_count}")
+
+    size = sum(os.path.getsize(path) for path in paths)
+    digest = get_blob_store().put_stream(_iter_files(paths), size)
+    discard_chunks(tool_task_id)
+    return {BLOB_REF_KEY: {"sha256": digest, "size": size, "content_type": NDJSON_CONTENT_TYPE}}
+
+
+def discard_chunks(tool_task_id: UUID) -> None:
+    """Drop the spill files of every attempt at a tool task"""
+    shutil.rmtree(_spill_dir(tool_task_id), ignore_errors=True)
@@ -0,0 +1,57 @@
+"""
+Decoding of tool results sent in a compact wire encoding
+Results are stored as received and only expanded back into row dicts when a
+workflow reads them
+"""
+from typing import Any, Dict, Iterator, List
+
+COLUMNAR_V1 = "columnar/v1"
+
+
+def is_columnar(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("encoding") == COLUMNAR_V1
+
+
+def _column_values(entry: Dict[str, Any], values: List[Any]) -> List[Any]:
+    dictionary = entry.get("dictionary")
+    if dictionary is None:
+        return values
+    return [None if code is None else dictionary[code] for code in values]
+
+
+def iter_columnar_rows(value: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield row dicts from a columnar/v1 result without building the full list"""
+    names = [entry["name"] for entry in value["columns"]]
+    data = [_column_values(entry, values) for entry, values in zip(value["columns"], value["data"])]
+    for index in range(value["row_count"]):
+        yield {name: data[position][index] for position, name in enumerate(names)}
+
+
+def _decode_value(value: Any) -> Any:
+    if is_columnar(value):
+        return list(iter_columnar_rows(value))
+    if isinstance(value, dict) and is_columnar(value.get("rows")):
+        # Truncated results wrap their rows with the truncation flags
+        return {**value, "rows": list(iter_columnar_rows(value["rows"]))}
+    return value
+
+
+def decode_result(value: Any) -> Any:
+    """Expand columnar tables into row dicts; other results pass through unchanged
+
+    Handles a single table, a truncated wrapper, or a dict of them (batched statements).
+    """
+    decoded = _decode_value(value)
+    if decoded is value and isinstance(value, dict):
+        return {key: _decode_value(field) for key, field in value.items()}
+    return decoded
+
+
+def column(value: Any, name: str) -> List[Any]:
+    """One column of a result, read directly from the columnar form when possible"""
+    if is_columnar(value):
+        for position, entry in enumerate(value["columns"]):
+            if entry["name"] == name:
+                return _column_values(entry, value["data"][position])
+        raise KeyError(name)
+    return [row.get(name) for row in value or []]
@@ -0,0 +1,218 @@
+"""
+Load- and capability-aware routing of tool tasks across local agents
+Picks the least-loaded healthy local agent that advertises the tool, and moves
+a tool task to another agent when its agent stops acknowledging or goes stale
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import LocalAgent, ToolTask
+from app.services.heartbeats import HeartbeatTracker, heartbeat_tracker
+from app.services.tool_chunks import discard_chunks
+from phi_utils.logging import setup_logging
+
+logger = setup_logging("orchestrator.tool_router")
+
+TERMINAL_STATUSES = ("COMPLETED", "FAILED")
+
+
+@dataclass
+class RouteCandidate:
+    local_agent_id: UUID
+    in_flight: int
+    latency_ms: Optional[float]
+
+    def sort_key(self):
+        # Fewest in-flight tools first, then fastest recent latency (unknown sorts last)
+        return (self.in_flight, self.latency_ms if self.latency_ms is not None else float("inf"))
+
+
+def _advertises(capabilities: Optional[Dict[str, Any]], tool_name: str) -> bool:
+    return tool_name in ((capabilities or {}).get("tools") or [])
+
+
+class ToolRouter:
+    def __init__(self, tracker: HeartbeatTracker):
+        self.tracker = tracker
+        self._outstanding: Dict[UUID, Set[UUID]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def _outstanding_count(self, local_agent_id: UUID) -> int:
+        with self._lock:
+            return len(self._outstanding.get(local_agent_id, ()))
+
+    def _track(self, local_agent_id: UUID, tool_task_id: UUID) -> None:
+        with self._lock:
+            self._outstanding[local_agent_id].add(tool_task_id)
+
+    def complete(self, local_agent_id: UUID, tool_task_id: UUID) -> None:
+        """Forget a tool task once it reaches a terminal state (or moves agents)"""
+        with self._lock:
+            tasks = self._outstanding.get(local_agent_id)
+            if tasks is not None:
+                tasks.discard(tool_task_id)
+                if not tasks:
+                    del self._outstanding[local_agent_id]
+
+    def candidates(self, db: Session, agent_id: UUID, tool_name: str) -> List[RouteCandidate]:
+        """Healthy local agents for agent_id that advertise tool_name, best first"""
+        now = datetime.now(timezone.utc)
+        live = [
+            entry for entry in self.tracker.snapshot()
+            if entry.agent_id == agent_id
+            and entry.status == "ACTIVE"
+            and now - entry.last_seen <= self.tracker.stale_after
+            and _advertises(entry.capabilities, tool_name)
+        ]
+        if live:
+            found = [
+                RouteCandidate(
+                    local_agent_id=entry.id,
+                    # The agent's own count lags by a heartbeat; our dispatches cover the gap
+                    in_flight=max(entry.in_flight, self._outstanding_count(entry.id)),
+                    latency_ms=entry.latency_ms.get(tool_name)
+                )
+                for entry in live
+            ]
+        else:
+            # Heartbeats for this agent land on another replica; use the persisted view
+            cutoff = now - self.tracker.stale_after - self.tracker.persist_interval
+            rows = db.query(LocalAgent).filter(
+                LocalAgent.agent_id == agent_id,
+                LocalAgent.status == "ACTIVE",
+                LocalAgent.last_heartbeat_at >= cutoff
+            ).all()
+            found = [
+                RouteCandidate(
+                    local_agent_id=row.id,
+                    in_flight=self._outstanding_count(row.id),
+                    latency_ms=None
+                )
+                for row in rows
+                if _advertises(row.extra_metadata, tool_name)
+            ]
+        return sorted(found, key=RouteCandidate.sort_key)
+
+    def select(
+        self,
+        db: Session,
+        agent_id: UUID,
+        tool_name: str,
+        exclude: Iterable[UUID] = ()
+    ) -> Optional[UUID]:
+        excluded = set(exclude)
+        for candidate in self.candidates(db, agent_id, tool_name):
+            if candidate.local_agent_id not in excluded:
+                return candidate.local_agent_id
+        return None
+
+    def is_healthy(self, db: Session, local_agent_id: UUID, agent_id: UUID, tool_name: str) -> bool:
+        return any(c.local_agent_id == local_agent_id for c in self.candidates(db, agent_id, tool_name))
+
+    def dispatch(
+        self,
+        db: Session,
+        task_id: UUID,
+        agent_id: UUID,
+        step_id: str,
+        tool_name: str,
+        payload: Dict[str, Any]
+    ) -> Optional[ToolTask]:
+        """Create a PENDING tool task on the best local agent; None if no agent can take it"""
+        local_agent_id = self.select(db, agent_id, tool_name)
+        if local_agent_id is None:
+            return None
+
+        tool_task = ToolTask(
+            task_id=task_id,
+            local_agent_id=local_agent_id,
+            step_id=step_id,
+            tool_name=tool_name,
+            payload=payload,
+            status="PENDING"
+        )
+        db.add(tool_task)
+        db.commit()
+        db.refresh(tool_task)
+        self._track(local_agent_id, tool_task.id)
+        logger.info(f"Routed {tool_name} tool task {tool_task.id} to local agent {local_agent_id}")
+        return tool_task
+
+    def _reassign(self, db: Session, tool_task: ToolTask, agent_id: UUID, tried: Set[UUID]) -> bool:
+        """Move an unfinished tool task to another healthy agent"""
+        target = self.select(db, agent_id, tool_task.tool_name, exclude=tried)
+        if target is None:
+            return False
+
+        previous = tool_task.local_agent_id
+        # Conditional so a result that raced in is never overwritten
+        moved = db.execute(
+            update(ToolTask)
+            .where(
+                ToolTask.id == tool_task.id,
+                ToolTask.created_at == tool_task.created_at,
+                ToolTask.local_agent_id == previous,
+                ToolTask.status.notin_(TERMINAL_STATUSES)
+            )
+            .values(local_agent_id=target, status="PENDING")
+        ).rowcount
+        db.commit()
+        if not moved:
+            return False
+
+        db.refresh(tool_task)
+        # The previous attempt may have streamed some chunks; the new one starts over
+        discard_chunks(tool_task.id)
+        self.complete(previous, tool_task.id)
+        self._track(target, tool_task.id)
+        tried.add(target)
+        logger.warning(f"Failed over tool task {tool_task.id} from local agent {previous} to {target}")
+        return True
+
+    async def wait_for_result(
+        self,
+        db: Session,
+        tool_task: ToolTask,
+        agent_id: UUID,
+        timeout: Optional[float] = None
+    ) -> ToolTask:
+        """Poll until the tool task finishes or times out, failing over as needed
+
+        A task still PENDING after the ack timeout (never claimed), or claimed by
+        an agent that has since gone unhealthy, is moved to the next-best agent.
+        """
+        timeout = timeout if timeout is not None else settings.tool_result_timeout_seconds
+        ack_timeout = timedelta(seconds=settings.tool_dispatch_ack_timeout_seconds)
+        started = datetime.now(timezone.utc)
+        assigned_at = started
+        tried = {tool_task.local_agent_id}
+
+        try:
+            while (datetime.now(timezone.utc) - started).total_seconds() < timeout:
+                db.refresh(tool_task)
+                if tool_task.status in TERMINAL_STATUSES:
+                    return tool_task
+
+                now = datetime.now(timezone.utc)
+                unclaimed = tool_task.status == "PENDING" and now - assigned_at >= ack_timeout
+                if unclaimed or not self.is_healthy(db, tool_task.local_agent_id, agent_id, tool_task.tool_name):
+                    if self._reassign(db, tool_task, agent_id, tried):
+                        assigned_at = now
+
+                await asyncio.sleep(settings.tool_poll_interval_seconds)
+            return tool_task
+        finally:
+            # Stop counting it either way; a late callback completes it again harmlessly
+            self.complete(tool_task.local_agent_id, tool_task.id)
+
+
+tool_router = ToolRouter(heartbeat_tracker)
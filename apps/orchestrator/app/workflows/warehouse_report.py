@@ -4,6 +4,7 @@ Uses LangGraph to orchestrate the workflow
 """
 # Path to shared-utils is set in main.py before importing this module
 
+from contextlib import contextmanager
 from typing import TypedDict, Annotated
 from langgraph.graph import StateGraph, END
 from langchain_openai import ChatOpenAI
@@ -11,12 +12,36 @@ from langchain_core.messages import HumanMessage, SystemMessage
 
 from app.config import settings
 from app.services.core_api_client import core_api_client
+from app.services.blobs import resolve_large_fields
+from app.services.tool_results import decode_result
+from app.services.tool_router import tool_router
 from phi_utils.retry import retry_async
 from phi_utils.logging import setup_logging
 
 logger = setup_logging("orchestrator.workflow")
 
 
+@contextmanager
+def node_session(db=None):
+    """Yield the workflow's session, or a short-lived one when none was bound"""
+    if db is not None:
+        yield db
+        return
+    from app.database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def bind_db(node, db_session):
+    """Wrap a node so it reuses the workflow's session instead of opening its own"""
+    async def node_with_db(state: WorkflowState) -> WorkflowState:
+        return await node(state, db=db_session)
+    return node_with_db
+
+
 class WorkflowState(TypedDict):
     task_id: str
     agent_id: str
@@ -31,46 +56,38 @@ class WorkflowState(TypedDict):
     error: str
 
 
-async def load_agent_config_node(state: WorkflowState) -> WorkflowState:
+async def load_agent_config_node(state: WorkflowState, db=None) -> WorkflowState:
     """Node 1: Load agent config from core API"""
     from app.services.task_status import update_task_status
-    from app.database import SessionLocal
     from uuid import UUID
     
     # Update progress
-    db = SessionLocal()
-    try:
+    with node_session(db) as session:
         update_task_status(
-            db,
+            session,
             UUID(state["task_id"]),
             progress=10,
             current_step="Loading agent configuration"
         )
-    finally:
-        db.close()
     
     # Agent config is already loaded in execute_workflow and passed in state
     # This node just passes through
     return state
 
 
-async def fetch_docs_node(state: WorkflowState) -> WorkflowState:
+async def fetch_docs_node(state: WorkflowState, db=None) -> WorkflowState:
     """Node 2: Fetch relevant documents"""
     from app.services.task_status import update_task_status
-    from app.database import SessionLocal
     from uuid import UUID
     
     # Update progress
-    db = SessionLocal()
-    try:
+    with node_session(db) as session:
         update_task_status(
-            db,
+            session,
             UUID(state["task_id"]),
             progress=25,
             current_step="Fetching relevant documents"
         )
-    finally:
-        db.close()
     
     try:
         query = "warehouse daily performance SOP procedures"
@@ -100,14 +117,10 @@ async def fetch_docs_node(state: WorkflowState) -> WorkflowState:
 
 async def fetch_wms_data_node(state: WorkflowState, db=None) -> WorkflowState:
     """Node 3: Fetch WMS data via local agent"""
-    from app.models import LocalAgent, ToolTask
     from app.database import SessionLocal
     from uuid import UUID
-    import asyncio
-    from datetime import datetime, timedelta
     
     from app.services.task_status import update_task_status
-    from uuid import UUID as UUIDType
     
     # Update progress
     if db is None:
@@ -119,30 +132,22 @@ async def fetch_wms_data_node(state: WorkflowState, db=None) -> WorkflowState:
     try:
         update_task_status(
             db,
-            UUIDType(state["task_id"]),
+            UUID(state["task_id"]),
             progress=40,
             current_step="Fetching WMS data from local agent"
         )
-    except:
-        pass
+    except Exception:
+        db.rollback()
     
     try:
         agent_id = UUID(state["agent_id"])
         
         try:
-            local_agent = db.query(LocalAgent).filter(
-                LocalAgent.agent_id == agent_id,
-                LocalAgent.status == "ACTIVE"
-            ).first()
-            
-            if local_agent:
-                # Create tool task for database query
-                tool_task = ToolTask(
-                    task_id=UUID(state["task_id"]),
-                    local_agent_id=local_agent.id,
-                    step_id="fetch_wms_data",
-                    tool_name="db",
-                    payload={
+            # One snapshot for all metrics, so the numbers agree with each other
+            wms_payload = {
+                "statements": [
+                    {
+                        "name": "summary",
                         "query": """
                             SELECT 
                                 DATE(created_at) as date,
@@ -156,31 +161,50 @@ async def fetch_wms_data_node(state: WorkflowState, db=None) -> WorkflowState:
                             LIMIT 1
                         """
                     },
-                    status="PENDING"
+                    {
+                        "name": "hourly",
+                        "query": """
+                            SELECT 
+                                EXTRACT(HOUR FROM created_at) as hour,
+                                COUNT(*) as throughput
+                            FROM orders
+                            WHERE created_at >= CURRENT_DATE - INTERVAL '1 day'
+                            GROUP BY 1
+                            ORDER BY 1
+                        """
+                    }
+                ]
+            }
+            
+            # Least-loaded healthy local agent that advertises the db tool; sites without
+            # a WMS database can answer the same SQL from their exports with file_sql
+            tool_task = None
+            for tool_name in ("db", "file_sql"):
+                tool_task = tool_router.dispatch(
+                    db,
+                    task_id=UUID(state["task_id"]),
+                    agent_id=agent_id,
+                    step_id="fetch_wms_data",
+                    tool_name=tool_name,
+                    payload=wms_payload
                 )
-                db.add(tool_task)
-                db.commit()
-                db.refresh(tool_task)
-                
-                logger.info(f"Created tool task {tool_task.id} for local agent {local_agent.id}")
-                
-                # Wait for callback (poll for completion)
-                max_wait = 60  # Wait up to 60 seconds
-                start_wait = datetime.utcnow()
+                if tool_task:
+                    break
+            
+            if tool_task:
+                # Wait for callback; unclaimed or orphaned tasks fail over to another agent
+                tool_task = await tool_router.wait_for_result(db, tool_task, agent_id)
                 
-                while (datetime.utcnow() - start_wait).total_seconds() < max_wait:
-                    db.refresh(tool_task)
-                    if tool_task.status == "COMPLETED":
-                        state["wms_data"] = tool_task.result or {}
-                        logger.info("Received WMS data from local agent")
-                        break
-                    elif tool_task.status == "FAILED":
-                        logger.warning(f"Tool task failed: {tool_task.error}")
-                        # Fall back to simulated data
-                        break
-                    await asyncio.sleep(2)  # Poll every 2 seconds
+                if tool_task.status == "COMPLETED":
+                    results = decode_result(resolve_large_fields(tool_task.result)) or {}
+                    summary = results.get("summary") or [{}]
+                    state["wms_data"] = {**summary[0], "hourly": results.get("hourly") or []}
+                    logger.info("Received WMS data from local agent")
                 else:
-                    logger.warning("Timeout waiting for tool task, using simulated data")
+                    if tool_task.status == "FAILED":
+                        logger.warning(f"Tool task failed: {tool_task.error}, using simulated data")
+                    else:
+                        logger.warning("Timeout waiting for tool task, using simulated data")
                     # Fall back to simulated data
                     state["wms_data"] = {
                         "date": "2024-01-15",
@@ -228,23 +252,19 @@ async def fetch_wms_data_node(state: WorkflowState, db=None) -> WorkflowState:
     return state
 
 
-async def llm_analysis_node(state: WorkflowState) -> WorkflowState:
+async def llm_analysis_node(state: WorkflowState, db=None) -> WorkflowState:
     """Node 4: LLM analysis with retry"""
     from app.services.task_status import update_task_status
-    from app.database import SessionLocal
     from uuid import UUID
     
     # Update progress
-    db = SessionLocal()
-    try:
+    with node_session(db) as session:
         update_task_status(
-            db,
+            session,
             UUID(state["task_id"]),
             progress=60,
             current_step="Analyzing data with LLM"
         )
-    finally:
-        db.close()
     
     try:
         llm = ChatOpenAI(
@@ -304,23 +324,19 @@ Provide a structured analysis."""
     return state
 
 
-async def format_report_node(state: WorkflowState) -> WorkflowState:
+async def format_report_node(state: WorkflowState, db=None) -> WorkflowState:
     """Node 5: Format report"""
     from app.services.task_status import update_task_status
-    from app.database import SessionLocal
     from uuid import UUID
     
     # Update progress
-    db = SessionLocal()
-    try:
+    with node_session(db) as session:
         update_task_status(
-            db,
+            session,
             UUID(state["task_id"]),
             progress=85,
             current_step="Formatting report"
         )
-    finally:
-        db.close()
     
     try:
         state["report"] = {
@@ -342,25 +358,21 @@ async def format_report_node(state: WorkflowState) -> WorkflowState:
     return state
 
 
-async def send_notification_node(state: WorkflowState) -> WorkflowState:
+async def send_notification_node(state: WorkflowState, db=None) -> WorkflowState:
     """Node 6: Send notifications (email/slack) if configured"""
     from app.services.communication import email_tool, slack_tool
     from app.models import Agent
     from app.services.task_status import update_task_status
-    from app.database import SessionLocal
     from uuid import UUID
     
     # Update progress
-    db = SessionLocal()
-    try:
+    with node_session(db) as session:
         update_task_status(
-            db,
+            session,
             UUID(state["task_id"]),
             progress=95,
             current_step="Sending notifications"
         )
-    finally:
-        db.close()
     
     try:
         # Get agent config to check communication settings
@@ -411,18 +423,13 @@ def create_warehouse_report_workflow(db_session=None):
     """Create the LangGraph workflow for daily warehouse report"""
     workflow = StateGraph(WorkflowState)
     
-    # Add nodes - pass db_session to nodes that need it
-    workflow.add_node("load_agent_config", load_agent_config_node)
-    workflow.add_node("fetch_docs", fetch_docs_node)
-    
-    # Create a wrapper for fetch_wms_data_node that includes db_session
-    async def fetch_wms_data_with_db(state: WorkflowState) -> WorkflowState:
-        return await fetch_wms_data_node(state, db=db_session)
-    
-    workflow.add_node("fetch_wms_data", fetch_wms_data_with_db)
-    workflow.add_node("llm_analysis", llm_analysis_node)
-    workflow.add_node("format_report", format_report_node)
-    workflow.add_node("send_notification", send_notification_node)
+    # Add nodes - every node reuses db_session rather than checking out its own connection
+    workflow.add_node("load_agent_config", bind_db(load_agent_config_node, db_session))
+    workflow.add_node("fetch_docs", bind_db(fetch_docs_node, db_session))
+    workflow.add_node("fetch_wms_data", bind_db(fetch_wms_data_node, db_session))
+    workflow.add_node("llm_analysis", bind_db(llm_analysis_node, db_session))
+    workflow.add_node("format_report", bind_db(format_report_node, db_session))
+    workflow.add_node("send_notification", bind_db(send_notification_node, db_session))
     
     # Define edges
     workflow.set_entry_point("load_agent_config")
@@ -0,0 +1,20 @@
+"""
+Garbage-collect blobs no task output or tool result references any more
+Run from cron, e.g. daily after run_retention.py: python scripts/run_blob_gc.py
+"""
+import sys
+import os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+sys.path.insert(0, os.path.join(base_dir, '..', '..', 'packages', 'shared-utils'))
+
+from app.database import engine
+from app.services.blobs import run_blob_gc
+
+
+if __name__ == "__main__":
+    with engine.connect() as conn:
+        with conn.begin():
+            result = run_blob_gc(conn)
+
+    print(f"Blobs: {result['blobs']}, referenced: {result['referenced']}, deleted: {result['deleted']}")
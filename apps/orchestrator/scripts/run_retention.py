@@ -0,0 +1,28 @@
+"""
+Partition maintenance and retention for tool_tasks
+Run from cron at least monthly: python scripts/run_retention.py
+"""
+import argparse
+import sys
+import os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+sys.path.insert(0, os.path.join(base_dir, '..', '..', 'packages', 'shared-utils'))
+
+from app.database import engine
+from app.services.retention import run_tool_tasks_retention
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drop expired tool_tasks partitions")
+    parser.add_argument("--retention-days", type=int, default=None, help="Override TOOL_TASKS_RETENTION_DAYS")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        result = run_tool_tasks_retention(conn, retention_days=args.retention_days)
+
+    print(f"Created partitions: {', '.join(result['created']) or 'none'}")
+    print(f"Dropped partitions (older than {result['cutoff']}): {', '.join(result['dropped']) or 'none'}")
+    if result["skipped"]:
+        print(f"Kept partitions with unfinished tool tasks: {', '.join(result['skipped'])}")
+    print(f"Deleted {result['blobs_deleted']} blobs referenced only by dropped rows")
@@ -0,0 +1,123 @@
+"""
+columnar/v1 results encoded by the local agent must decode back to the same rows
+"""
+import json
+import math
+import os
+import sys
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+# The encoder lives in the local agent; this is the contract between the two
+sys.path.insert(0, os.path.join(base_dir, '..', 'local-agent'))
+
+from app.services.tool_results import column, decode_result
+from phi_agent.encoding import COLUMNAR_V1, encode_result, negotiate
+
+
+def over_the_wire(value):
+    return json.loads(json.dumps(value))
+
+
+def round_trip(result):
+    return decode_result(over_the_wire(encode_result(result, COLUMNAR_V1)))
+
+
+ROWS = [
+    {"site": "A", "sku": "X-1", "qty": 3, "price": 1.5, "ok": True, "meta": {"tags": ["a"]}},
+    {"site": "A", "sku": "X-2", "qty": None, "price": 2.25, "ok": False, "meta": None},
+    {"site": "B", "sku": "X-1", "qty": 7, "price": None, "ok": None, "meta": {"tags": []}},
+    {"site": "A", "sku": "X-3", "qty": 0, "price": 0.0, "ok": True, "meta": {}},
+]
+
+
+def test_plain_rows_round_trip():
+    encoded = encode_result(ROWS, COLUMNAR_V1)
+    assert encoded["encoding"] == COLUMNAR_V1
+    assert encoded["row_count"] == len(ROWS)
+    # Repetitive text is dictionary-encoded
+    site = next(entry for entry in encoded["columns"] if entry["name"] == "site")
+    assert site["dictionary"] == ["A", "B"]
+    assert round_trip(ROWS) == ROWS
+
+
+def test_nulls_nan_and_missing_keys():
+    rows = [{"a": 1, "b": float("nan")}, {"b": 2.0, "c": None}, {"a": None}]
+    assert round_trip(rows) == [
+        {"a": 1, "b": None, "c": None},
+        {"a": None, "b": 2.0, "c": None},
+        {"a": None, "b": None, "c": None},
+    ]
+
+
+def test_non_json_types_become_text():
+    rows = [
+        {
+            "amount": Decimal("10.50"),
+            "day": date(2024, 1, 2),
+            "at": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        },
+        {"amount": Decimal("10.50"), "day": date(2024, 1, 2), "at": None},
+        {"amount": None, "day": date(2024, 1, 3), "at": datetime(2024, 1, 3)},
+    ]
+    encoded = encode_result(rows, COLUMNAR_V1)
+    assert [entry["type"] for entry in encoded["columns"]] == ["decimal", "date", "timestamp"]
+    assert round_trip(rows) == [
+        {"amount": "10.50", "day": "2024-01-02", "at": "2024-01-02T03:04:05+00:00"},
+        {"amount": "10.50", "day": "2024-01-02", "at": None},
+        {"amount": None, "day": "2024-01-03", "at": "2024-01-03T00:00:00"},
+    ]
+
+
+def test_truncated_result_round_trip():
+    result = {"rows": ROWS, "row_count": len(ROWS), "truncated": True, "truncated_by": "max_rows"}
+    encoded = encode_result(result, COLUMNAR_V1)
+    assert encoded["rows"]["encoding"] == COLUMNAR_V1
+    assert encoded["truncated_by"] == "max_rows"
+    assert round_trip(result) == result
+
+
+def test_keyed_batch_result_round_trip():
+    # Batched statements return {name: rows}; empty and truncated tables included
+    result = {
+        "summary": [{"orders": 12, "revenue": Decimal("99.90")}],
+        "hourly": ROWS,
+        "empty": [],
+        "capped": {"rows": ROWS[:2], "row_count": 2, "truncated": True, "truncated_by": "max_bytes"},
+    }
+    encoded = encode_result(result, COLUMNAR_V1)
+    assert encoded["hourly"]["encoding"] == COLUMNAR_V1
+    assert encoded["empty"] == []
+    assert round_trip(result) == {**result, "summary": [{"orders": 12, "revenue": "99.90"}]}
+
+
+@pytest.mark.parametrize("result", [None, "done", 3, [], [1, 2], {"status": "success", "path": "/tmp/x"}])
+def test_non_tabular_results_pass_through(result):
+    assert round_trip(result) == result
+
+
+def test_without_negotiation_rows_are_sent_as_is():
+    assert negotiate(None) is None
+    assert negotiate(["arrow/v9"]) is None
+    assert negotiate(["arrow/v9", COLUMNAR_V1]) == COLUMNAR_V1
+    assert encode_result(ROWS, negotiate(None)) is ROWS
+
+
+def test_column_reads_encoded_and_plain_results():
+    encoded = over_the_wire(encode_result(ROWS, COLUMNAR_V1))
+    assert column(encoded, "sku") == [row["sku"] for row in ROWS]
+    assert column(ROWS, "qty") == [row["qty"] for row in ROWS]
+    with pytest.raises(KeyError):
+        column(encoded, "missing")
+
+
+def test_large_float_values_survive():
+    rows = [{"v": 1e300}, {"v": -0.0}, {"v": 123456789012345678}]
+    decoded = round_trip(rows)
+    assert decoded[0]["v"] == 1e300
+    assert math.copysign(1, decoded[1]["v"]) == -1
+    assert decoded[2]["v"] == 123456789012345678
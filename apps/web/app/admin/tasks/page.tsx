@@ -1,8 +1,8 @@
 'use client'
 
 import { useState } from 'react'
-import { useQuery } from '@tanstack/react-query'
-import { adminApi } from '@/lib/api'
+import { useInfiniteQuery, useQuery } from '@tanstack/react-query'
+import { adminApi, tasksApi } from '@/lib/api'
 import { Button } from '@/components/ui/button'
 import { Input } from '@/components/ui/input'
 import { Select } from '@/components/ui/select'
@@ -14,14 +14,31 @@ export default function AdminTasksPage() {
   const [statusFilter, setStatusFilter] = useState('')
   const [selectedTaskId, setSelectedTaskId] = useState<string | null>(null)
 
-  const { data: tasks, isLoading } = useQuery({
+  const {
+    data: taskPages,
+    isLoading,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
     queryKey: ['admin-tasks', orgId, agentId, statusFilter],
-    queryFn: () => adminApi.listTasks({
+    queryFn: ({ pageParam }) => adminApi.listTasks({
       org_id: orgId || undefined,
       agent_id: agentId || undefined,
-      status: statusFilter || undefined,
+      status_filter: statusFilter || undefined,
       limit: 100,
+      cursor: pageParam || undefined,
     }),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.nextCursor,
+  })
+  const tasks = taskPages?.pages.flatMap((page) => page.tasks)
+
+  // The listing omits input/output; load them for the selected task only
+  const { data: selectedTask } = useQuery({
+    queryKey: ['task', selectedTaskId],
+    queryFn: () => tasksApi.get(selectedTaskId!),
+    enabled: !!selectedTaskId,
   })
 
   const { data: events } = useQuery({
@@ -145,6 +162,16 @@ export default function AdminTasksPage() {
                       </div>
                     </div>
                   ))}
+                  {hasNextPage && (
+                    <Button
+                      variant="outline"
+                      className="w-full"
+                      onClick={() => fetchNextPage()}
+                      disabled={isFetchingNextPage}
+                    >
+                      {isFetchingNextPage ? 'Loading...' : 'Load more'}
+                    </Button>
+                  )}
                 </div>
               ) : (
                 <p className="text-gray-500">No tasks found</p>
@@ -165,7 +192,7 @@ export default function AdminTasksPage() {
                   {tasks && (
                     <>
                       {(() => {
-                        const task = tasks.find((t: any) => t.id === selectedTaskId)
+                        const task = selectedTask || tasks.find((t: any) => t.id === selectedTaskId)
                         if (!task) return null
                         return (
                           <div className="space-y-3">
@@ -3,6 +3,8 @@
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '@/components/ui/card'
 import { CheckCircle2, XCircle, Loader2, Database, FileText, Globe, Mail, BarChart3 } from 'lucide-react'
 import { motion, AnimatePresence } from 'framer-motion'
+import { useQuery } from '@tanstack/react-query'
+import { blobsApi, isBlobRef } from '@/lib/api'
 
 interface TaskEvent {
   id: string
@@ -41,6 +43,16 @@ const toolIcons: Record<string, any> = {
 }
 
 export function TaskExecutionView({ task }: TaskExecutionViewProps) {
+  // The full report may be offloaded to the blob store; fetch it only when shown
+  const reportField = task.output?.full_report_md
+  const { data: fetchedReport, isLoading: reportLoading } = useQuery({
+    queryKey: ['blob', reportField?.blob_ref?.sha256],
+    queryFn: () => blobsApi.get(reportField),
+    enabled: task.status === 'SUCCESS' && isBlobRef(reportField),
+    staleTime: Infinity,
+  })
+  const fullReport = isBlobRef(reportField) ? fetchedReport : reportField
+
   const getStatusIcon = (status: string) => {
     switch (status) {
       case 'SUCCESS':
@@ -234,9 +246,13 @@ export function TaskExecutionView({ task }: TaskExecutionViewProps) {
         {task.output && task.status === 'SUCCESS' && (
           <div className="space-y-3">
             <h4 className="font-semibold text-sm">Results</h4>
-            {task.output.full_report_md ? (
+            {reportLoading ? (
+              <div className="flex items-center gap-2 text-sm text-gray-500">
+                <Loader2 className="h-4 w-4 animate-spin" /> Loading report...
+              </div>
+            ) : fullReport ? (
               <div className="prose prose-sm max-w-none bg-gray-50 p-4 rounded-lg">
-                <pre className="whitespace-pre-wrap text-sm">{task.output.full_report_md}</pre>
+                <pre className="whitespace-pre-wrap text-sm">{fullReport}</pre>
               </div>
             ) : (
               <pre className="text-sm bg-gray-50 p-4 rounded-lg overflow-auto">
@@ -165,7 +165,29 @@ export const tasksApi = {
   listByAgent: async (agentId: string) => {
     // Use admin API to list tasks for this agent
     const response = await api.get('/admin/tasks', {
-      params: { agent_id: agentId, limit: 50 }
+      params: { agent_id: agentId, limit: 50, include_payloads: true }
+    })
+    return response.data
+  },
+}
+
+// Large output fields are stored out of row and replaced by { blob_ref: {...} }
+export interface BlobRef {
+  blob_ref: {
+    sha256: string
+    size: number
+    content_type: string
+  }
+}
+
+export const isBlobRef = (value: any): value is BlobRef =>
+  !!value && typeof value === 'object' && 'blob_ref' in value
+
+export const blobsApi = {
+  get: async (ref: BlobRef) => {
+    const isText = ref.blob_ref.content_type.startsWith('text/')
+    const response = await orchestratorApi.get(`/blobs/${ref.blob_ref.sha256}`, {
+      responseType: isText ? 'text' : 'json',
     })
     return response.data
   },
@@ -173,14 +195,20 @@ export const tasksApi = {
 
 // Admin API
 export const adminApi = {
+  // Keyset-paginated: pass the returned nextCursor back as cursor for the next page
   listTasks: async (params?: {
     org_id?: string
     agent_id?: string
-    status?: string
+    status_filter?: string
     limit?: number
+    cursor?: string
+    include_payloads?: boolean
   }) => {
     const response = await api.get('/admin/tasks', { params })
-    return response.data
+    return {
+      tasks: response.data,
+      nextCursor: (response.headers['x-next-cursor'] as string | undefined) || null,
+    }
   },
   getTaskEvents: async (taskId: string) => {
     const response = await api.get(`/admin/tasks/${taskId}/events`)
@@ -0,0 +1,300 @@
+"""
+Content-addressed blob storage for large task outputs and tool results
+Blobs are keyed by the sha256 of their uncompressed bytes and stored zstd-compressed;
+JSONB columns keep only a small reference in their place
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, see the "blobs" extra
+    zstandard = None
+
+BLOB_REF_KEY = "blob_ref"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+_CHUNK_SIZE = 64 * 1024
+_MAX_FRAME_HEADER_SIZE = 18
+
+
+class BlobNotFoundError(KeyError):
+    pass
+
+
+def validate_digest(digest: str) -> str:
+    """Reject anything that is not a lowercase sha256 hex digest"""
+    if not _DIGEST.match(digest or ""):
+        raise ValueError(f"Invalid blob digest: {digest!r}")
+    return digest
+
+
+class BlobStore(ABC):
+    """Write-once storage of byte blobs addressed by their sha256"""
+
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        """Store data (no-op if already present) and return its digest"""
+
+    @abstractmethod
+    def exists(self, digest: str) -> bool:
+        ...
+
+    @abstractmethod
+    def size(self, digest: str) -> int:
+        """Uncompressed size in bytes"""
+
+    @abstractmethod
+    def iter_range(self, digest: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield uncompressed bytes [start, end] (inclusive, end=None for the rest)"""
+
+    @abstractmethod
+    def delete(self, digest: str) -> bool:
+        """Remove a blob; returns False if it did not exist"""
+
+    @abstractmethod
+    def last_written(self, digest: str) -> Optional[float]:
+        """Unix time the blob was last stored (or re-stored), None if missing"""
+
+    @abstractmethod
+    def iter_digests(self) -> Iterator[str]:
+        ...
+
+    def put_stream(self, chunks: Iterable[bytes], size: int) -> str:
+        """Store data given as chunks totalling size bytes and return its digest"""
+        return self.put(b"".join(chunks))
+
+    def get(self, digest: str) -> bytes:
+        return b"".join(self.iter_range(digest))
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as <root>/ab/cd/<digest>.zst files, written atomically"""
+
+    def __init__(self, root: str, compression_level: int = 3):
+        if zstandard is None:
+            raise ImportError("zstandard is required for the blob store (pip install zstandard)")
+        self.root = root
+        self.compression_level = compression_level
+
+    def _path(self, digest: str) -> str:
+        validate_digest(digest)
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}.zst")
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            # A new reference to an existing blob: refresh it so GC's grace period covers it
+            os.utime(path)
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # compress() records the content size in the frame header, which size() relies on
+        compressed = zstandard.ZstdCompressor(level=self.compression_level).compress(data)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest
+
+    def put_stream(self, chunks: Iterable[bytes], size: int) -> str:
+        """Compress and hash chunks on the fly, so memory does not grow with size"""
+        os.makedirs(self.root, exist_ok=True)
+        hasher = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # Passing size records it in the frame header, which size() relies on
+                writer = zstandard.ZstdCompressor(level=self.compression_level).stream_writer(
+                    f, size=size, closefd=False
+                )
+                written = 0
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    writer.write(chunk)
+                    written += len(chunk)
+                writer.close()
+            if written != size:
+                raise ValueError(f"Expected {size} bytes, got {written}")
+
+            digest = hasher.hexdigest()
+            path = self._path(digest)
+            if os.path.exists(path):
+                os.unlink(tmp_path)
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self._path(digest))
+
+    def delete(self, digest: str) -> bool:
+        try:
+            os.unlink(self._path(digest))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def last_written(self, digest: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self._path(digest))
+        except FileNotFoundError:
+            return None
+
+    def iter_digests(self) -> Iterator[str]:
+        if not os.path.isdir(self.root):
+            return
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                digest = name[:-len(".zst")] if name.endswith(".zst") else None
+                if digest and _DIGEST.match(digest):
+                    yield digest
+
+    def size(self, digest: str) -> int:
+        path = self._path(digest)
+        if not os.path.exists(path):
+            raise BlobNotFoundError(digest)
+        with open(path, "rb") as f:
+            header = f.read(_MAX_FRAME_HEADER_SIZE)
+        content_size = zstandard.frame_content_size(header)
+        if content_size < 0:
+            # Frame written without a content size; fall back to a full pass
+            return sum(len(chunk) for chunk in self.iter_range(digest))
+        return content_size
+
+    def iter_range(self, digest: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        path = self._path(digest)
+        if not os.path.exists(path):
+            raise BlobNotFoundError(digest)
+
+        remaining = None if end is None else end - start + 1
+        with open(path, "rb") as f:
+            reader = zstandard.ZstdDecompressor().stream_reader(f)
+            # zstd frames are not seekable; skip forward by decompressing
+            to_skip = start
+            while to_skip > 0:
+                skipped = reader.read(min(to_skip, _CHUNK_SIZE))
+                if not skipped:
+                    return
+                to_skip -= len(skipped)
+            while remaining is None or remaining > 0:
+                chunk = reader.read(_CHUNK_SIZE if remaining is None else min(remaining, _CHUNK_SIZE))
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+
+def create_blob_store(backend: str, path: str) -> BlobStore:
+    """Build the configured blob store backend"""
+    if backend == "local":
+        return LocalBlobStore(path)
+    raise ValueError(f"Unknown blob store backend: {backend}")
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and set(value) == {BLOB_REF_KEY}
+
+
+def blob_digests(value: Any) -> Set[str]:
+    """Digests referenced by a value written with offload_fields"""
+    if is_blob_ref(value):
+        return {value[BLOB_REF_KEY]["sha256"]}
+    if isinstance(value, dict):
+        return {field[BLOB_REF_KEY]["sha256"] for field in value.values() if is_blob_ref(field)}
+    return set()
+
+
+def sweep_blobs(store: BlobStore, candidates: Iterable[str], live: Set[str], grace_seconds: float) -> int:
+    """Delete candidate blobs that are not live; returns the number deleted
+
+    Blobs (re)written within grace_seconds are kept: their referencing row may
+    not be committed yet, and put() refreshes an existing blob it deduplicates.
+    """
+    cutoff = time.time() - grace_seconds
+    deleted = 0
+    for digest in set(candidates) - live:
+        written = store.last_written(digest)
+        if written is not None and written < cutoff and store.delete(digest):
+            deleted += 1
+    return deleted
+
+
+def offload(value: Any, store: BlobStore, threshold: int) -> Any:
+    """Replace value with a blob reference if its encoded size exceeds threshold
+
+    Strings are stored as UTF-8 text so they can be served as-is; anything else
+    is stored as JSON.
+    """
+    if isinstance(value, str):
+        data, content_type = value.encode("utf-8"), "text/plain; charset=utf-8"
+    else:
+        data, content_type = json.dumps(value, default=str).encode("utf-8"), "application/json"
+    if len(data) <= threshold:
+        return value
+
+    digest = store.put(data)
+    return {BLOB_REF_KEY: {"sha256": digest, "size": len(data), "content_type": content_type}}
+
+
+def offload_fields(value: Optional[Dict[str, Any]], store: BlobStore, threshold: int) -> Optional[Dict[str, Any]]:
+    """Offload each oversized top-level field, keeping small fields inline
+
+    Small fields such as summaries and URLs stay queryable in the row while
+    bulky ones (full reports, result rows) move to the blob store.
+    """
+    if not isinstance(value, dict):
+        return offload(value, store, threshold) if value is not None else None
+    return {key: offload(field, store, threshold) for key, field in value.items()}
+
+
+def resolve(value: Any, store: BlobStore) -> Any:
+    """Load a blob reference back into its original value (other values pass through)"""
+    if not is_blob_ref(value):
+        return value
+    ref = value[BLOB_REF_KEY]
+    if ref.get("content_type") == NDJSON_CONTENT_TYPE:
+        return list(iter_ndjson(value, store))
+    data = store.get(ref["sha256"])
+    if ref.get("content_type", "").startswith("text/"):
+        return data.decode("utf-8")
+    return json.loads(data)
+
+
+def iter_ndjson(value: Dict[str, Any], store: BlobStore) -> Iterator[Any]:
+    """Yield the records of an NDJSON blob one at a time (for large streamed results)"""
+    pending = b""
+    for chunk in store.iter_range(value[BLOB_REF_KEY]["sha256"]):
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line:
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+def resolve_fields(value: Any, store: BlobStore) -> Any:
+    """Inverse of offload_fields"""
+    if isinstance(value, dict) and not is_blob_ref(value):
+        return {key: resolve(field, store) for key, field in value.items()}
+    return resolve(value, store)
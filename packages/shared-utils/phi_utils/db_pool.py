@@ -0,0 +1,162 @@
+"""
+Connection pool configuration and telemetry shared by the services
+Builds engine kwargs from service settings and tracks checkout wait times
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+POOL_PROFILES = ("default", "pgbouncer")
+
+
+class PoolMetrics:
+    """Checkout counters and wait-time stats for one engine's pool"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.checkouts = 0
+        self.wait_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+    
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_count += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+    
+    def on_checkout(self, *args) -> None:
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+    
+    def on_checkin(self, *args) -> None:
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+    
+    def snapshot(self, reset_max: bool = False) -> Dict[str, Any]:
+        """Return current values
+        
+        reset_max starts a new window for the max wait. Only one reader (the
+        Prometheus scrape) should reset it, or each reader sees a partial max.
+        """
+        with self._lock:
+            data = {
+                "checked_out": self.checked_out,
+                "checkouts_total": self.checkouts,
+                "wait_count_total": self.wait_count,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.wait_count, 6) if self.wait_count else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "timeouts_total": self.timeouts,
+            }
+            if reset_max:
+                self.wait_seconds_max = 0.0
+        return data
+
+
+class _TimedGetMixin:
+    """Times how long each checkout waits for a connection"""
+    
+    metrics: Optional[PoolMetrics] = None
+    
+    def _do_get(self):
+        if self.metrics is None:
+            return super()._do_get()
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception as e:
+            # QueuePool raises TimeoutError once pool_timeout elapses with no free slot
+            self.metrics.record_wait(time.perf_counter() - start, timed_out="TimeoutError" in type(e).__name__)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+
+class InstrumentedQueuePool(_TimedGetMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedGetMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(_TimedGetMixin, NullPool):
+    pass
+
+
+def engine_kwargs(settings: Any, is_async: bool = False) -> Dict[str, Any]:
+    """Build create_engine kwargs from db_pool_* settings
+    
+    The pgbouncer profile targets PgBouncer in transaction mode: PgBouncer owns
+    the pooling, so the app holds no idle connections, and asyncpg's prepared
+    statement caches are disabled because server sessions are not sticky.
+    """
+    profile = getattr(settings, "db_pool_profile", "default")
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Unknown db_pool_profile: {profile}. Must be one of: {', '.join(POOL_PROFILES)}")
+    
+    if profile == "pgbouncer":
+        kwargs: Dict[str, Any] = {"poolclass": InstrumentedNullPool, "pool_pre_ping": False}
+        if is_async:
+            kwargs["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return kwargs
+    
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def instrument_engine(engine: Any) -> PoolMetrics:
+    """Attach a PoolMetrics collector to an engine (sync or async)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    metrics = PoolMetrics()
+    pool.metrics = metrics
+    event.listen(pool, "checkout", metrics.on_checkout)
+    event.listen(pool, "checkin", metrics.on_checkin)
+    return metrics
+
+
+def pool_stats(engine: Any, reset_max: bool = False) -> Dict[str, Any]:
+    """Gauges for an engine's pool: size, checked out, overflow and wait times"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "pool_size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+        })
+    metrics: Optional[PoolMetrics] = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot(reset_max=reset_max))
+    return stats
+
+
+def render_prometheus(service: str, stats_by_engine: Dict[str, Dict[str, Any]]) -> str:
+    """Render pool stats in the Prometheus text exposition format"""
+    lines = []
+    for engine_name, stats in stats_by_engine.items():
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines.append(
+                f'db_pool_{key}{{service="{service}",engine="{engine_name}"}} {value}'
+            )
+    return "\n".join(lines) + "\n"
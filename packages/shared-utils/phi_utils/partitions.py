@@ -0,0 +1,126 @@
+"""
+Monthly range-partition maintenance for time-partitioned tables
+Partitions are named <table>_pYYYYMM and cover [month start, next month start)
+"""
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+_PARTITION_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def month_start(value: datetime) -> datetime:
+    """First instant of the month containing value, in UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Shift a month-start datetime by a number of months"""
+    index = value.year * 12 + (value.month - 1) + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start.year:04d}{start.month:02d}"
+
+
+def list_partitions(conn, table: str) -> List[Tuple[str, datetime, datetime]]:
+    """Monthly partitions of table as (name, start, end), oldest first"""
+    rows = conn.execute(
+        text("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:table AS regclass)
+        """),
+        {"table": table}
+    ).scalars().all()
+
+    partitions = []
+    for name in rows:
+        match = _PARTITION_SUFFIX.search(name)
+        if not match:
+            continue  # default partition or foreign naming
+        start = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+        partitions.append((name, start, add_months(start, 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def create_monthly_partition(conn, table: str, column: str, start: datetime) -> Optional[str]:
+    """Create the partition for the month starting at start, if missing
+
+    Rows that already landed in the default partition for that month are moved
+    into the new partition before it is attached, so ATTACH never conflicts.
+    Writes to the table are locked out from the move until the caller's
+    transaction commits, so no row can reach the default partition in between.
+    Partitions are normally premade months ahead, so the default is empty and
+    the lock is brief. Returns the partition name when one was created.
+    """
+    start = month_start(start)
+    end = add_months(start, 1)
+    name = partition_name(table, start)
+
+    exists = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+    if exists:
+        return None
+
+    bounds = {"start": start, "end": end}
+    conn.execute(text(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    default_name = f"{table}_default"
+    has_default = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": default_name}).scalar()
+    if has_default:
+        conn.execute(text(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE"))
+        conn.execute(
+            text(f"""
+                WITH moved AS (
+                    DELETE FROM {default_name}
+                    WHERE "{column}" >= :start AND "{column}" < :end
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """),
+            bounds
+        )
+    conn.execute(
+        text(f"ALTER TABLE {table} ATTACH PARTITION {name} "
+             f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')")
+    )
+    return name
+
+
+def ensure_monthly_partitions(
+    conn,
+    table: str,
+    column: str,
+    months_ahead: int = 3,
+    since: Optional[datetime] = None,
+    now: Optional[datetime] = None
+) -> List[str]:
+    """Make sure partitions exist from since (default: this month) through months_ahead"""
+    current = month_start(now or datetime.now(timezone.utc))
+    month = month_start(since) if since else current
+    created = []
+    while month <= add_months(current, months_ahead):
+        name = create_monthly_partition(conn, table, column, month)
+        if name:
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def expired_partitions(conn, table: str, cutoff: datetime) -> List[str]:
+    """Partitions whose whole range is older than cutoff"""
+    if cutoff.tzinfo is None:
+        cutoff = cutoff.replace(tzinfo=timezone.utc)
+    return [name for name, _, end in list_partitions(conn, table) if end <= cutoff]
+
+
+def drop_partition(conn, table: str, name: str) -> None:
+    """Detach and drop a partition (cheap compared to DELETE + VACUUM)"""
+    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    conn.execute(text(f"DROP TABLE {name}"))